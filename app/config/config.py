@@ -1,9 +1,121 @@
+from typing import Dict, List, Optional
+
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     MAX_UPLOAD_SIZE: int = 100 * 1024 * 1024  # 100MB
     CHUNK_SIZE: int = 1024 * 1024  # 1MB chunks
     BOUNDARY_BUFFER_SIZE: int = 100 * 1024  # 100KB
+
+    # On-demand request profiling
+    PROFILE_SAMPLE_RATE: float = 0.0  # fraction of requests profiled without the header
+    PROFILE_ADMIN_TOKEN: Optional[str] = None  # value expected in the X-Profile header
+    PROFILE_INTERVAL: float = 0.005  # 5ms between stack samples
+    PROFILE_OUTPUT_DIR: str = "profiles"
+    PROFILE_MAX_PROFILES: int = 200  # newest profiles kept in PROFILE_OUTPUT_DIR; 0 keeps all
+
+    # Startup warm-up and readiness
+    STARTUP_WARMUP_TIMEOUT: float = 10.0  # seconds startup waits for warm-ups before serving anyway
+    CRITICAL_DEPENDENCIES: List[str] = ["mongo", "s3"]  # must be warm for /ready to pass
+    RECONNECT_BASE_DELAY: float = 0.5
+    RECONNECT_MAX_DELAY: float = 30.0
+    MONGO_MIN_POOL_SIZE: int = 5
+    MONGO_MAX_POOL_SIZE: int = 100
+
+    # User lookups: concurrent identical lookups are always coalesced;
+    # results are additionally cached in-process when the TTL is above zero
+    USER_CACHE_TTL: float = 0.0
+    USER_CACHE_MAX_ENTRIES: int = 10000
+    COMPANY_CACHE_TTL: float = 0.0  # nearby-company results, same idea
+    COMPANY_CACHE_MAX_ENTRIES: int = 10000
+    # With any cache enabled, a change stream (replica sets only) drops entries other workers wrote;
+    # while it is down entries live at most the fallback TTL
+    CACHE_INVALIDATION_ENABLED: bool = True
+    CACHE_INVALIDATION_FALLBACK_TTL: float = 5.0
+
+    # Read routing per named read (see app/db/read_routing.py): "<mode>" or "<mode>:<maxStalenessSeconds>".
+    # Unlisted routes read the primary, and so do reads right after a write.
+    READ_ROUTES: Dict[str, str] = {
+        "users.get": "primary",  # internal lookups by id
+        "users.read": "primary",  # GET /api/users/{id}
+        "users.list": "secondaryPreferred",  # GET /api/users
+        "companies.nearby": "secondaryPreferred",  # GET /api/users/{id}/nearby-companies
+        "journey.history": "secondaryPreferred",  # GET /api/users/{id}/carbon-journey
+    }
+    READ_MAX_STALENESS_SECONDS: int = 90  # the server minimum; -1 for no bound
+
+    # Buffered user updates (status, thread ids) of the same user within the window become one write;
+    # every user pending is written in one bulk_write. 0 writes each update through at once.
+    USER_WRITE_BUFFER_WINDOW: float = 0.05
+    USER_WRITE_BUFFER_MAX_USERS: int = 500  # flush early once this many users are pending
+
+    # Batch registration
+    BATCH_REGISTRATION_MAX_USERS: int = 200
+
+    # Admission control: per-client token buckets, then an adaptive concurrency limit
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_CLIENT_RATE: float = 50.0  # sustained requests per second per client IP
+    ADMISSION_CLIENT_BURST: float = 100.0
+    ADMISSION_MAX_CLIENTS: int = 10000  # token buckets kept in memory (least recently seen dropped)
+    ADMISSION_INITIAL_LIMIT: int = 64  # concurrent requests per worker
+    ADMISSION_MIN_LIMIT: int = 4
+    ADMISSION_MAX_LIMIT: int = 512
+    ADMISSION_LATENCY_TARGET: float = 2.0  # p99 seconds above which the limit shrinks
+    ADMISSION_EXEMPT_PATHS: List[str] = ["/health", "/ready", "/metrics"]
+    # Path regexes of long-running routes (streaming uploads, up to MAX_UPLOAD_SIZE): they take a slot,
+    # but their duration says nothing about overload and would drag the limit down
+    ADMISSION_UNSAMPLED_PATHS: List[str] = [r"/api/users/[^/]+/photos/[^/]+/upload"]
+
+    # Background jobs (python -m app.jobs.worker)
+    WORKER_QUEUES: Dict[str, int] = {"ai_dispatch": 4, "ai_results": 4, "email": 2, "previews": 2}  # queue -> concurrent jobs
+    JOB_LEASE_SECONDS: float = 60.0  # a job is reclaimed if its worker stops heartbeating for this long
+    JOB_MAX_ATTEMPTS: int = 5  # then the job is dead-lettered
+    JOB_RETRY_BASE_DELAY: float = 5.0
+    JOB_RETRY_MAX_DELAY: float = 600.0
+    JOB_POLL_INTERVAL: float = 1.0  # idle wait before polling an empty queue again
+    JOB_RETENTION_SECONDS: int = 7 * 24 * 3600  # succeeded jobs are deleted after this
+    # ai_results polls a dispatched run: first after this delay, then with the usual backoff while it is running
+    VERIFICATION_RESULT_DELAY: float = 30.0
+    VERIFICATION_RESULT_MAX_ATTEMPTS: int = 12  # about 50 minutes of polling with the default backoff
+
+    # Authentication: bcrypt passwords, HS256 access tokens
+    # Unset: a random per-process key, so app.server refuses to start more than one worker without it
+    JWT_SECRET_KEY: Optional[str] = None
+    JWT_ALGORITHM: str = "HS256"
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
+    PASSWORD_BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_EXECUTOR: str = "thread"  # "thread" (bcrypt releases the GIL) or "process"
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 64  # hash/verify calls waiting beyond this are refused with 503
+    TOKEN_CACHE_MAX_ENTRIES: int = 10000  # verified tokens kept until they expire
+
+    # Geospatial matching
+    GAZETTEER_PATH: str = "migration-scripts/data/gazetteer.tsv"  # offline place -> coordinates file
+    SEED_DATA_PATH: str = "migration-scripts/data/seed_data.py"
+    NEARBY_COMPANIES_MAX_DISTANCE_KM: float = 500.0
+    NEARBY_COMPANIES_MAX_LIMIT: int = 100
+
+    # Aerial GeoTIFF inspection: only the header and IFDs are read, with ranged GETs
+    GEOTIFF_READ_BLOCK_SIZE: int = 64 * 1024  # bytes per ranged GET; holds a typical (COG) header whole
+    GEOTIFF_MAX_RANGE_REQUESTS: int = 8  # a header needing more reads is rejected
+    GEOTIFF_MAX_IFDS: int = 32  # directories followed when counting overviews
+    GEOTIFF_REQUIRE_GEOREFERENCE: bool = True
+    GEOTIFF_REQUIRE_CRS: bool = True
+
+    # Photo previews, rendered by the "previews" job in a process pool and stored under previews/<key>/
+    PREVIEW_SIZES: Dict[str, int] = {"thumbnail": 256, "preview": 1024}  # name -> longest side in pixels
+    PREVIEW_TILE_SIZE: int = 256
+    PREVIEW_PYRAMID_MAX_SIZE: int = 4096  # longest side of the most detailed pyramid level; bounds memory
+    PREVIEW_MAX_SOURCE_PIXELS: int = 400_000_000  # larger sources are refused (decompression bombs)
+    PREVIEW_JPEG_QUALITY: int = 85
+    PREVIEW_WORKERS: int = 2  # processes per job worker
+    PREVIEW_UPLOAD_CONCURRENCY: int = 16
+
+    # Carbon journey history: a time-series collection, with a summary embedded on the user
+    JOURNEY_GRANULARITY: str = "hours"  # time-series bucketing; entries are typically daily
+    JOURNEY_MAX_POINTS: int = 1000  # per history response; downsample with interval= for longer ranges
+    JOURNEY_MAX_APPEND: int = 1000  # entries per append request
+    JOURNEY_MIGRATION_BATCH_SIZE: int = 500  # users moved per batch by app.utils.migrate_carbon_journey
     
     # SQLAlchemy configuration
     SQLALCHEMY_CONFIG: dict = {"__allow_unmapped__": True}
@@ -1,3 +1,3 @@
-from app.db.database import connect_to_mongo,db,close_mongo_connection
+from app.db.database import connect_to_mongo, warm_mongo_pool, db, close_mongo_connection
 
-__all__ = ["connect_to_mongo", "db", "close_mongo_connection"]
+__all__ = ["connect_to_mongo", "warm_mongo_pool", "db", "close_mongo_connection"]
@@ -0,0 +1,178 @@
+# cache_invalidation.py
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from app.config.config import settings
+from app.db.database import db
+from app.utils.cache import TTLCache
+from app.utils.metrics import registry
+from app.utils.retry import backoff_delays
+
+logger = logging.getLogger("cache_invalidation")
+
+CHANGE_EVENTS = registry.counter(
+    "cache_invalidation_events_total", "Change stream events applied to local caches", ("collection", "operation")
+)
+STREAM_OPEN = registry.gauge(
+    "cache_invalidation_stream_open", "1 while the change stream feeding cache invalidation is open"
+)
+STREAM_OPENS = registry.counter(
+    "cache_invalidation_stream_opens_total",
+    "Change stream (re)opens; resumed ones replay what was missed, fresh ones cleared the caches first",
+    ("mode",),
+)
+
+# The resume token is too old for the oplog, or can't be used to resume any more
+HISTORY_LOST_CODES = {260, 280, 286}
+# $changeStream on a standalone server
+NOT_REPLICA_SET_CODES = {40573}
+
+# Events that say nothing about single documents: the collection's caches are cleared
+COLLECTION_EVENTS = {"drop", "rename", "dropDatabase", "invalidate"}
+
+ChangeHandler = Callable[[dict], None]
+
+
+@dataclass
+class _Subscription:
+    handler: ChangeHandler  # called with each change event of the collection
+    caches: List[TTLCache] = field(default_factory=list)  # capped while the stream is down, cleared if events were lost
+
+
+class CacheInvalidationListener:
+    """
+    One change stream over the watched collections, handing each change to
+    the handlers subscribed for its collection, so caches in this process drop
+    what other workers wrote. After an error the stream resumes from the last
+    resume token, so nothing is missed. While it is down, entries of the
+    subscribed caches live at most `fallback_ttl` seconds; if the token fell
+    off the oplog, those caches are cleared and the stream starts fresh.
+    """
+
+    def __init__(self, fallback_ttl: float = settings.CACHE_INVALIDATION_FALLBACK_TTL,
+                 base_delay: float = settings.RECONNECT_BASE_DELAY, max_delay: float = settings.RECONNECT_MAX_DELAY):
+        self.fallback_ttl = fallback_ttl
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.resume_token: Optional[dict] = None
+        self.is_open = False
+        self._subscriptions: Dict[str, List[_Subscription]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self, collection: str, handler: ChangeHandler, caches: List[TTLCache] = ()):
+        self._subscriptions.setdefault(collection, []).append(_Subscription(handler, list(caches)))
+        if not self.is_open:
+            # Nothing invalidates them until the stream is open
+            for cache in caches:
+                cache.cap_ttl(self.fallback_ttl)
+
+    @property
+    def collections(self) -> List[str]:
+        return list(self._subscriptions)
+
+    def _caches(self, collection: Optional[str] = None) -> List[TTLCache]:
+        return [cache for name, subscriptions in self._subscriptions.items() if collection in (None, name)
+                for subscription in subscriptions for cache in subscription.caches]
+
+    def start(self) -> Optional[asyncio.Task]:
+        """Run the listener in the background; None if no collection is subscribed"""
+        if not self._subscriptions:
+            return None
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run(), name="cache-invalidation")
+        return self._task
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self._closed()
+
+    def _closed(self):
+        self.is_open = False
+        STREAM_OPEN.set(0)
+        for cache in self._caches():
+            cache.cap_ttl(self.fallback_ttl)
+
+    def _opened(self):
+        STREAM_OPENS.labels("resumed" if self.resume_token is not None else "fresh").inc()
+        self.is_open = True
+        STREAM_OPEN.set(1)
+        for cache in self._caches():
+            cache.cap_ttl(None)
+
+    def _reset(self, collection: Optional[str] = None):
+        """Events may have been missed: nothing cached can be trusted"""
+        for cache in self._caches(collection):
+            cache.clear()
+
+    def apply(self, event: dict):
+        """Hand one change event to its collection's subscribers"""
+        operation = event.get("operationType")
+        collection = (event.get("ns") or {}).get("coll")
+        CHANGE_EVENTS.labels(collection or "", operation or "").inc()
+        if operation in COLLECTION_EVENTS:
+            self._reset(None if operation in ("dropDatabase", "invalidate") else collection)
+        for subscription in self._subscriptions.get(collection, ()):
+            try:
+                subscription.handler(event)
+            except Exception as e:
+                logger.error(f"Invalidation handler for {collection} failed: {e}")
+
+    def _pipeline(self) -> List[dict]:
+        # Only what the handlers need: the stream carries ids, not documents
+        return [
+            {"$match": {"ns.coll": {"$in": self.collections}}},
+            {"$project": {"operationType": 1, "ns": 1, "documentKey": 1}},
+        ]
+
+    async def _watch(self):
+        async with db.db.watch(self._pipeline(), resume_after=self.resume_token) as stream:
+            self._opened()
+            async for event in stream:
+                self.apply(event)
+                self.resume_token = stream.resume_token
+                if event.get("operationType") == "invalidate":
+                    # The stream is closed after an invalidate; start over
+                    self.resume_token = None
+                    return
+
+    async def run(self):
+        """Keep the stream open until cancelled, resuming with backoff after errors"""
+        self._closed()
+        delays = backoff_delays(self.base_delay, self.max_delay)
+        while True:
+            try:
+                if db.is_connected and db.db is not None:
+                    await self._watch()
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                if e.code in NOT_REPLICA_SET_CODES:
+                    logger.error("Change streams need a replica set; cached entries expire after "
+                                 f"{self.fallback_ttl}s instead of being invalidated")
+                    self._closed()
+                    return
+                if e.code in HISTORY_LOST_CODES:
+                    logger.warning(f"Change stream can't resume ({e}); clearing caches and starting fresh")
+                    self.resume_token = None
+                    self._reset()
+                else:
+                    logger.warning(f"Change stream failed: {e}")
+            except PyMongoError as e:
+                logger.warning(f"Change stream failed: {e}")
+            if self.is_open:
+                # It had been open: retry from the shortest delay again
+                delays = backoff_delays(self.base_delay, self.max_delay)
+                self._closed()
+            await asyncio.sleep(next(delays))
+
+
+# Repositories subscribe their caches at import; the app starts it in its lifespan
+cache_invalidation = CacheInvalidationListener()
@@ -0,0 +1,99 @@
+# company_repository.py
+from typing import List, Optional, Tuple
+
+from pymongo import ASCENDING, GEOSPHERE
+
+from app.config.config import settings
+from app.db.cache_invalidation import cache_invalidation
+from app.db.database import db
+from app.db.read_routing import routed_collection
+from app.utils.cache import TTLCache
+from app.utils.projection import mongo_projection
+
+COMPANIES_COLLECTION = "companies"
+
+# Nearby-company results, when COMPANY_CACHE_TTL is set. Any company write can
+# change any result, so every change clears the whole cache.
+nearby_cache = (
+    TTLCache("nearby_companies", settings.COMPANY_CACHE_TTL, settings.COMPANY_CACHE_MAX_ENTRIES)
+    if settings.COMPANY_CACHE_TTL > 0 else None
+)
+
+if nearby_cache is not None and settings.CACHE_INVALIDATION_ENABLED:
+    cache_invalidation.subscribe(COMPANIES_COLLECTION, lambda event: nearby_cache.clear(), [nearby_cache])
+
+
+def _companies():
+    return db.get_collection(COMPANIES_COLLECTION)
+
+
+async def ensure_company_indexes():
+    """
+    The 2dsphere index $geoNear requires. The score bounds are part of it, so
+    the score filter is checked against index keys instead of fetched documents.
+    """
+    await _companies().create_index([("geo", GEOSPHERE), ("minimum_score", ASCENDING), ("maximum_score", ASCENDING)])
+
+
+async def count_companies() -> int:
+    return await _companies().estimated_document_count()
+
+
+async def insert_companies(companies: List[dict]) -> int:
+    if not companies:
+        return 0
+    result = await _companies().insert_many(companies, ordered=False)
+    if nearby_cache is not None:
+        nearby_cache.clear()
+    return len(result.inserted_ids)
+
+
+async def find_nearby_companies(
+        point: dict,
+        max_distance_km: float,
+        limit: int,
+        score: Optional[float] = None,
+        status: Optional[str] = None,
+        fields: Optional[Tuple[str, ...]] = None,
+        route: str = "companies.nearby"
+) -> List[dict]:
+    """
+    Companies nearest to a GeoJSON point, closest first, within max_distance_km.
+    With a score, only companies whose [minimum_score, maximum_score] range
+    accepts it are returned. Each result carries distance_km.
+    """
+    cache_key = (tuple(point["coordinates"]), max_distance_km, limit, score, status, fields)
+    if nearby_cache is not None:
+        cached = nearby_cache.get(cache_key)
+        if cached is not None:
+            return [dict(company) for company in cached]
+
+    query = {}
+    if score is not None:
+        query["minimum_score"] = {"$lte": score}
+        query["maximum_score"] = {"$gte": score}
+    if status:
+        query["status"] = status
+
+    pipeline = [
+        {"$geoNear": {
+            "near": point,
+            "key": "geo",
+            "distanceField": "distance_m",
+            "maxDistance": max_distance_km * 1000,
+            "query": query,
+            "spherical": True,
+        }},
+        {"$limit": limit},
+    ]
+    projection = mongo_projection(tuple(field for field in fields or () if field != "distance_km"))
+    if projection:
+        pipeline.append({"$project": dict(projection, distance_m=1)})
+
+    companies = await routed_collection(COMPANIES_COLLECTION, route).aggregate(pipeline).to_list(length=limit)
+    for company in companies:
+        company["id"] = str(company.pop("_id"))
+        company["distance_km"] = round(company.pop("distance_m") / 1000, 3)
+    if nearby_cache is not None:
+        nearby_cache.set(cache_key, [dict(company) for company in companies])
+    return companies
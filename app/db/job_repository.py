@@ -0,0 +1,155 @@
+# job_repository.py
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.config.config import settings
+from app.db.database import db
+
+JOBS_COLLECTION = "jobs"
+
+# Job lifecycle: queued -> running -> succeeded, or back to queued for a retry,
+# or dead once max_attempts is used up. Dead jobs stay in the collection as the
+# dead-letter queue until requeued or deleted.
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+DEAD = "dead"
+
+
+def _jobs():
+    return db.get_collection(JOBS_COLLECTION)
+
+
+async def ensure_job_indexes():
+    """Indexes the claim query and the dead-letter listing rely on"""
+    jobs = _jobs()
+    await jobs.create_index([("queue", ASCENDING), ("status", ASCENDING), ("run_at", ASCENDING)])
+    await jobs.create_index([("status", ASCENDING), ("lease_expires_at", ASCENDING)])
+    await jobs.create_index("dedupe_key", unique=True, sparse=True)
+    # Finished jobs expire on their own; dead ones are kept for inspection
+    await jobs.create_index(
+        "finished_at",
+        expireAfterSeconds=settings.JOB_RETENTION_SECONDS,
+        partialFilterExpression={"status": SUCCEEDED},
+    )
+
+
+async def enqueue_job(queue: str, payload: Dict[str, Any], delay: float = 0.0,
+                      max_attempts: int = settings.JOB_MAX_ATTEMPTS, dedupe_key: Optional[str] = None) -> str:
+    """
+    Add a job to a queue, runnable after `delay` seconds. With a dedupe_key, enqueuing
+    the same work twice returns the existing job's id instead of a second job.
+    """
+    now = datetime.utcnow()
+    job = {
+        "_id": ObjectId(),
+        "queue": queue,
+        "payload": payload,
+        "status": QUEUED,
+        "attempts": 0,
+        "max_attempts": max_attempts,
+        "run_at": now + timedelta(seconds=delay),
+        "lease_owner": None,
+        "lease_expires_at": None,
+        "last_error": None,
+        "created_at": now,
+        "updated_at": now,
+    }
+    if dedupe_key is not None:
+        job["dedupe_key"] = dedupe_key
+    try:
+        await _jobs().insert_one(job)
+    except DuplicateKeyError:
+        existing = await _jobs().find_one({"dedupe_key": dedupe_key}, {"_id": 1})
+        return str(existing["_id"])
+    return str(job["_id"])
+
+
+async def claim_job(queue: str, worker_id: str, lease_seconds: float) -> Optional[dict]:
+    """
+    Atomically take the next runnable job: a queued one that is due, or a running
+    one whose lease expired because its worker died. Counts as an attempt.
+    """
+    now = datetime.utcnow()
+    return await _jobs().find_one_and_update(
+        {
+            "queue": queue,
+            "$or": [
+                {"status": QUEUED, "run_at": {"$lte": now}},
+                {"status": RUNNING, "lease_expires_at": {"$lt": now}},
+            ],
+        },
+        {
+            "$set": {
+                "status": RUNNING,
+                "lease_owner": worker_id,
+                "lease_expires_at": now + timedelta(seconds=lease_seconds),
+                "updated_at": now,
+            },
+            "$inc": {"attempts": 1},
+        },
+        sort=[("run_at", ASCENDING)],
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+def _owned(job_id, worker_id: str) -> dict:
+    return {"_id": ObjectId(job_id), "status": RUNNING, "lease_owner": worker_id}
+
+
+async def extend_lease(job_id, worker_id: str, lease_seconds: float) -> bool:
+    """Heartbeat. False means the lease was lost and another worker may own the job now."""
+    now = datetime.utcnow()
+    result = await _jobs().update_one(
+        _owned(job_id, worker_id),
+        {"$set": {"lease_expires_at": now + timedelta(seconds=lease_seconds), "updated_at": now}},
+    )
+    return result.matched_count == 1
+
+
+async def complete_job(job_id, worker_id: str, result: Any = None) -> bool:
+    now = datetime.utcnow()
+    outcome = await _jobs().update_one(
+        _owned(job_id, worker_id),
+        {"$set": {"status": SUCCEEDED, "result": result, "lease_owner": None, "lease_expires_at": None,
+                  "finished_at": now, "updated_at": now}},
+    )
+    return outcome.matched_count == 1
+
+
+async def fail_job(job_id, worker_id: str, error: str, retry_delay: Optional[float]) -> bool:
+    """Requeue the job after retry_delay seconds, or dead-letter it when retry_delay is None"""
+    now = datetime.utcnow()
+    update = {"last_error": error, "lease_owner": None, "lease_expires_at": None, "updated_at": now}
+    if retry_delay is None:
+        update.update(status=DEAD, finished_at=now)
+    else:
+        update.update(status=QUEUED, run_at=now + timedelta(seconds=retry_delay))
+    outcome = await _jobs().update_one(_owned(job_id, worker_id), {"$set": update})
+    return outcome.matched_count == 1
+
+
+async def get_dead_jobs(queue: Optional[str] = None, limit: int = 100) -> List[dict]:
+    query = {"status": DEAD}
+    if queue:
+        query["queue"] = queue
+    return await _jobs().find(query).sort("updated_at", -1).limit(limit).to_list(length=limit)
+
+
+async def requeue_dead_jobs(queue: str, job_ids: Optional[List[str]] = None) -> int:
+    """Give dead-lettered jobs a fresh set of attempts"""
+    query = {"queue": queue, "status": DEAD}
+    if job_ids:
+        query["_id"] = {"$in": [ObjectId(job_id) for job_id in job_ids]}
+    now = datetime.utcnow()
+    result = await _jobs().update_many(
+        query,
+        {"$set": {"status": QUEUED, "attempts": 0, "run_at": now, "updated_at": now},
+         "$unset": {"finished_at": ""}},
+    )
+    return result.modified_count
+
@@ -0,0 +1,174 @@
+# journey_repository.py
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import ASCENDING
+from pymongo.errors import CollectionInvalid
+
+from app.config.config import settings
+from app.db.database import db
+from app.db.read_routing import routed_collection
+
+logger = logging.getLogger("journey_repository")
+
+# Time-series collection: one measurement per journey entry, meta {"user_id", "source"}
+JOURNEY_COLLECTION = "carbon_journey"
+
+# Fields of an entry stored as measurement fields; anything else goes under "data"
+ENTRY_FIELDS = ("carbon_score", "credits", "note")
+
+# $dateTrunc units of the downsampling intervals
+_BUCKET_UNITS = {"hour": "hour", "day": "day", "week": "week", "month": "month"}
+
+
+def _journey():
+    return db.get_collection(JOURNEY_COLLECTION)
+
+
+async def ensure_journey_collection():
+    """
+    Create the time-series collection (MongoDB 5.0+) if it doesn't exist yet,
+    and the index history queries use. Servers from 6.3 create an equivalent
+    meta/time index on their own; creating it again is a no-op.
+    """
+    try:
+        await db.db.create_collection(JOURNEY_COLLECTION, timeseries={
+            "timeField": "timestamp",
+            "metaField": "meta",
+            "granularity": settings.JOURNEY_GRANULARITY,
+        })
+    except CollectionInvalid:
+        pass  # already exists
+    await _journey().create_index([("meta.user_id", ASCENDING), ("timestamp", ASCENDING)])
+
+
+def _utc(timestamp: datetime) -> datetime:
+    """Naive UTC, like every other timestamp the app stores"""
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+
+def journey_measurement(user_id: str, entry: dict, source: str = "api") -> dict:
+    """The time-series document of one entry ({"timestamp", "carbon_score", "credits", "note", "data"})"""
+    measurement = {"timestamp": _utc(entry["timestamp"]), "meta": {"user_id": str(user_id), "source": source}}
+    for field in ENTRY_FIELDS:
+        if entry.get(field) is not None:
+            measurement[field] = entry[field]
+    if entry.get("data"):
+        measurement["data"] = entry["data"]
+    return measurement
+
+
+def legacy_entries(journey: Optional[Dict[str, Any]]) -> Tuple[List[dict], List[str]]:
+    """
+    Entries of a carbon_journey dict as it used to be embedded on users:
+    ISO date (or datetime) -> {"carbon_score", "credits", "note", ...}, or
+    date -> score. Returns (entries, keys that aren't dates and were skipped).
+    """
+    entries, skipped = [], []
+    for key, value in (journey or {}).items():
+        try:
+            timestamp = datetime.fromisoformat(str(key))
+        except ValueError:
+            skipped.append(key)
+            continue
+        entry = {"timestamp": timestamp}
+        if isinstance(value, dict):
+            for field in ENTRY_FIELDS:
+                entry[field] = value.get(field)
+            entry["data"] = {k: v for k, v in value.items() if k not in ENTRY_FIELDS}
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            entry["carbon_score"] = value
+        else:
+            entry["data"] = {"value": value}
+        if entry.get("note") == "":
+            entry["note"] = None
+        entries.append(entry)
+    return entries, skipped
+
+
+async def insert_measurements(measurements: List[dict]) -> int:
+    if not measurements:
+        return 0
+    result = await _journey().insert_many(measurements, ordered=False)
+    return len(result.inserted_ids)
+
+
+async def delete_measurements(user_ids: List[str], source: Optional[str] = None) -> int:
+    """Deletes on a time-series collection may only filter on the meta field"""
+    query = {"meta.user_id": {"$in": [str(user_id) for user_id in user_ids]}}
+    if source:
+        query["meta.source"] = source
+    result = await _journey().delete_many(query)
+    return result.deleted_count
+
+
+async def summarize_journeys(user_ids: List[str]) -> Dict[str, dict]:
+    """CarbonJourneySummary fields per user, computed from the collection; users without entries are left out"""
+    pipeline = [
+        {"$match": {"meta.user_id": {"$in": [str(user_id) for user_id in user_ids]}}},
+        {"$sort": {"timestamp": 1}},
+        {"$group": {
+            "_id": "$meta.user_id",
+            "entries": {"$sum": 1},
+            "first_at": {"$min": "$timestamp"},
+            "last_at": {"$max": "$timestamp"},
+            "latest_carbon_score": {"$last": "$carbon_score"},
+            "latest_credits": {"$last": "$credits"},
+            "total_credits": {"$sum": "$credits"},
+        }},
+    ]
+    summaries = {}
+    async for summary in _journey().aggregate(pipeline):
+        summaries[summary.pop("_id")] = summary
+    return summaries
+
+
+async def find_journey(user_id: str, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                       interval: str = "raw", limit: int = settings.JOURNEY_MAX_POINTS,
+                       route: str = "journey.history") -> Tuple[List[dict], bool]:
+    """
+    A user's journey in [start, end), oldest first: every entry, or with an
+    interval (hour/day/week/month) one point per bucket, grouped server-side.
+    Returns (points, whether more than `limit` matched).
+    """
+    match: dict = {"meta.user_id": str(user_id)}
+    if start or end:
+        match["timestamp"] = {}
+        if start:
+            match["timestamp"]["$gte"] = _utc(start)
+        if end:
+            match["timestamp"]["$lt"] = _utc(end)
+
+    if interval == "raw":
+        pipeline = [
+            {"$match": match},
+            {"$sort": {"timestamp": 1}},
+            {"$limit": limit + 1},
+            {"$project": {"_id": 0, "timestamp": 1, "carbon_score": 1, "credits": 1, "note": 1}},
+        ]
+    else:
+        bucket = {"date": "$timestamp", "unit": _BUCKET_UNITS[interval]}
+        if interval == "week":
+            bucket["startOfWeek"] = "monday"
+        pipeline = [
+            {"$match": match},
+            {"$group": {
+                "_id": {"$dateTrunc": bucket},
+                "carbon_score": {"$avg": "$carbon_score"},
+                "carbon_score_min": {"$min": "$carbon_score"},
+                "carbon_score_max": {"$max": "$carbon_score"},
+                "credits": {"$sum": "$credits"},
+                "count": {"$sum": 1},
+            }},
+            {"$sort": {"_id": 1}},
+            {"$limit": limit + 1},
+        ]
+
+    points = await routed_collection(JOURNEY_COLLECTION, route).aggregate(pipeline).to_list(length=limit + 1)
+    for point in points:
+        if "_id" in point:
+            point["timestamp"] = point.pop("_id")
+    return points[:limit], len(points) > limit
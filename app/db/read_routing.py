@@ -0,0 +1,66 @@
+# read_routing.py
+from functools import lru_cache
+
+from pymongo.read_preferences import Nearest, Primary, PrimaryPreferred, Secondary, SecondaryPreferred
+
+from app.config.config import settings
+from app.db.database import db
+from app.utils.metrics import registry
+
+ROUTED_READS = registry.counter(
+    "mongo_routed_reads_total", "Repository reads by route and the read preference it resolved to", ("route", "mode")
+)
+
+# Reads that must see this process's own writes; never configurable
+PRIMARY = "primary"
+
+_MODES = {
+    "primary": Primary,
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+# The smallest maxStalenessSeconds servers accept
+MIN_MAX_STALENESS_SECONDS = 90
+
+
+@lru_cache(maxsize=None)
+def read_preference(route: str):
+    """
+    Read preference for a named read (e.g. "users.list"), from READ_ROUTES:
+    "<mode>" or "<mode>:<maxStalenessSeconds>". Unlisted routes read the primary;
+    non-primary modes default to READ_MAX_STALENESS_SECONDS.
+    """
+    if route == PRIMARY:
+        return Primary()
+    mode, _, staleness = settings.READ_ROUTES.get(route, PRIMARY).partition(":")
+    if mode not in _MODES:
+        raise ValueError(f"Unknown read preference {mode!r} for route {route!r}; expected one of {', '.join(_MODES)}")
+    if mode == PRIMARY:
+        return Primary()
+    max_staleness = int(staleness) if staleness else settings.READ_MAX_STALENESS_SECONDS
+    if max_staleness != -1 and max_staleness < MIN_MAX_STALENESS_SECONDS:
+        raise ValueError(f"maxStalenessSeconds for route {route!r} must be -1 (none) or at least "
+                         f"{MIN_MAX_STALENESS_SECONDS}, got {max_staleness}")
+    return _MODES[mode](max_staleness=max_staleness)
+
+
+def reads_primary(route: str) -> bool:
+    return isinstance(read_preference(route), Primary)
+
+
+def routed_collection(name: str, route: str):
+    """The collection, reading with the preference configured for `route`"""
+    preference = read_preference(route)
+    ROUTED_READS.labels(route, preference.mongos_mode).inc()
+    collection = db.get_collection(name)
+    if isinstance(preference, Primary):
+        return collection
+    return collection.with_options(read_preference=preference)
+
+
+# A misconfigured route fails at startup rather than on its first request
+for _route in settings.READ_ROUTES:
+    read_preference(_route)
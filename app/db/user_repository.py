@@ -1,21 +1,72 @@
 # user_repository.py
 import logging
 from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 
 from bson import ObjectId
 from fastapi import HTTPException, status
-from passlib.context import CryptContext
+from pymongo import GEOSPHERE, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 from pydantic import EmailStr
 
+from app.config.config import settings
+from app.db.cache_invalidation import cache_invalidation
 from app.db.database import connect_to_mongo, db
-from app.models.user import UserBaseDB, VerificationStatusEnum
+from app.db.journey_repository import (
+    delete_measurements, insert_measurements, journey_measurement, legacy_entries, summarize_journeys,
+)
+from app.db.read_routing import PRIMARY, reads_primary, routed_collection
+from app.db.write_buffer import WriteBuffer
+from app.models.user import UserBaseDB
 from app.requests.user import UserUpdate, UserCreate, UserResponseCreation
+from app.utils.cache import TTLCache
+from app.utils.codec import codec_for
+from app.utils.projection import mongo_projection, project
+from app.utils.singleflight import SingleFlight
 
 # Configure logging
 logger = logging.getLogger("user_repository")
 
-# Password handling
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+user_document_codec = codec_for(UserBaseDB)
+
+# Concurrent lookups of the same user share one query; results are also cached
+# in-process when USER_CACHE_TTL is set
+user_lookups = SingleFlight("user")
+user_cache = (
+    TTLCache("user", settings.USER_CACHE_TTL, settings.USER_CACHE_MAX_ENTRIES)
+    if settings.USER_CACHE_TTL > 0 else None
+)
+
+
+def _on_user_change(event: dict):
+    """A user changed, possibly on another worker: drop its cached and in-flight lookups"""
+    document_key = event.get("documentKey")
+    if not document_key:
+        # Collection-level event; the listener already cleared the cache
+        user_lookups.forget_where(lambda inflight: True)
+        return
+    user_id = str(document_key["_id"])
+    invalidate_user(user_id)
+    # The event doesn't carry the email, so find the user's email-keyed entries by id
+    user_cache.delete_where(lambda key, user: key[0] == "email" and user.get("id") == user_id)
+    user_lookups.forget_where(lambda inflight: inflight[0] == "email")
+
+
+if user_cache is not None and settings.CACHE_INVALIDATION_ENABLED:
+    cache_invalidation.subscribe("users", _on_user_change, [user_cache])
+
+
+async def ensure_user_indexes():
+    """
+    2dsphere index on the users' location, and unique email and username
+    indexes: a registration racing another with the same email or username
+    gets a DuplicateKeyError, which registration reports as already registered.
+    Creating them fails while duplicates are stored; those must be merged first.
+    """
+    users_collection = db.get_collection("users")
+    await users_collection.create_index([("geo", GEOSPHERE)])
+    await users_collection.create_index("email", unique=True)
+    await users_collection.create_index("username", unique=True)
 
 
 # Helper to convert MongoDB ObjectId to string
@@ -27,23 +78,60 @@ def serialize_user(user):
     return user
 
 
-async def get_user(user_id: str):
-    """Get user by ID"""
+async def _find_user(query: dict, fields: Optional[Tuple[str, ...]] = None, route: str = PRIMARY):
+    users_collection = routed_collection("users", route)
+    user = await users_collection.find_one(query, mongo_projection(fields))
+    return serialize_user(user)
+
+
+async def _lookup_user(key: tuple, query: dict, fields: Optional[Tuple[str, ...]] = None, route: str = PRIMARY):
+    """
+    Serve from the result cache if configured, else join or start the shared query.
+    Only full documents are cached; a projected lookup can still be answered from one.
+    Lookups routed to secondaries are neither cached nor shared with primary ones,
+    so a lagging secondary can't hand an old version to a read-your-writes caller.
+    """
+    if user_cache is not None:
+        cached = user_cache.get(key)
+        if cached is not None:
+            return project(dict(cached), fields)
+    if not reads_primary(route):
+        return await user_lookups.do(key + (fields, route), lambda: _find_user(query, fields, route))
+    if fields:
+        return await user_lookups.do(key + (fields,), lambda: _find_user(query, fields))
+    return await user_lookups.do(key, lambda: _find_user(query), cache=user_cache)
+
+
+def invalidate_user(user_id: str, *emails):
+    """Drop cached and in-flight lookups (every projection) for a user after a write"""
+    keys = [("id", str(user_id))] + [("email", email) for email in emails if email]
+    user_lookups.forget_where(lambda inflight: inflight[:2] in keys)
+    if user_cache is not None:
+        for key in keys:
+            user_cache.delete(key)
+
+
+# High-frequency field updates (see buffer_user_update); the app and the job worker close it on shutdown
+user_writes = WriteBuffer("users", settings.USER_WRITE_BUFFER_WINDOW, settings.USER_WRITE_BUFFER_MAX_USERS,
+                          on_written=invalidate_user, max_fields=("updated_at",))
+
+# Need update_user: an email change must invalidate the old address, the journey has its own collection
+UNBUFFERED_FIELDS = ("email", "carbon_journey")
+
+
+async def get_user(user_id: str, fields: Optional[Tuple[str, ...]] = None, route: str = "users.get"):
+    """Get user by ID, optionally fetching only the given fields; `route` picks the read preference"""
     try:
-        users_collection = db.get_collection("users")
-        user = await users_collection.find_one({"_id": ObjectId(user_id)})
-        return serialize_user(user)
+        return await _lookup_user(("id", str(user_id)), {"_id": ObjectId(user_id)}, fields, route)
     except Exception as e:
         logger.error(f"Error getting user by ID: {e}")
         return None
 
 
-async def get_user_by_email(email: EmailStr):
-    """Get user by email"""
+async def get_user_by_email(email: EmailStr, fields: Optional[Tuple[str, ...]] = None):
+    """Get user by email, optionally fetching only the given fields"""
     try:
-        users_collection = db.get_collection("users")
-        user = await users_collection.find_one({"email": email})
-        return serialize_user(user)
+        return await _lookup_user(("email", email), {"email": email}, fields)
     except Exception as e:
         logger.error(f"Error getting user by email: {e}")
         return None
@@ -60,11 +148,12 @@ async def get_user_by_username(username: str):
         return None
 
 
-async def get_users(skip: int = 0, limit: int = 100):
-    """Get all users with pagination"""
+async def get_users(skip: int = 0, limit: int = 100, fields: Optional[Tuple[str, ...]] = None,
+                    route: str = "users.list"):
+    """Get all users with pagination, optionally fetching only the given fields"""
     try:
-        users_collection = db.get_collection("users")
-        cursor = users_collection.find().skip(skip).limit(limit)
+        users_collection = routed_collection("users", route)
+        cursor = users_collection.find({}, mongo_projection(fields)).skip(skip).limit(limit)
         users = []
         async for user in cursor:
             users.append(serialize_user(user))
@@ -74,6 +163,59 @@ async def get_users(skip: int = 0, limit: int = 100):
         return []
 
 
+def _new_user_document(user_data: UserCreate, verification_thread_id: Optional[str] = None,
+                       hashed_password: Optional[str] = None) -> dict:
+    # user_data is already validated; the codec fills in UserBaseDB's defaults without a second validation
+    return user_document_codec.new_document(
+        email=user_data.email,
+        username=user_data.username,
+        ground_photo="",
+        aerial_photo="",
+        avatar_url=user_data.avatar_url or "",
+        verification_thread_id=verification_thread_id,
+        hashed_password=hashed_password,
+        geo=user_data.geo.model_dump() if user_data.geo else None
+    )
+
+
+async def find_registration_conflict(email: EmailStr, username: str) -> Optional[str]:
+    """Which of email/username is already registered, in one query; None if neither"""
+    users_collection = db.get_collection("users")
+    existing = await users_collection.find_one(
+        {"$or": [{"email": email}, {"username": username}]},
+        {"email": 1, "username": 1}
+    )
+    if existing is None:
+        return None
+    return "email" if existing.get("email") == email else "username"
+
+
+async def insert_user(user_data: UserCreate, user_id: ObjectId, verification_thread_id: Optional[str] = None,
+                      hashed_password: Optional[str] = None) -> dict:
+    """
+    Insert a new user under an id chosen by the caller, so work keyed by the id
+    (presigned keys, the LangGraph thread, the password hash) can start before
+    the insert and be written with it. No re-read: the inserted document is returned.
+    """
+    if not db.is_connected and not await connect_to_mongo():
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Could not connect to database"
+        )
+
+    user_doc = dict(_new_user_document(user_data, verification_thread_id, hashed_password), _id=user_id)
+    try:
+        await db.get_collection("users").insert_one(user_doc)
+    except DuplicateKeyError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email or username already registered"
+        )
+    finally:
+        invalidate_user(user_id, user_data.email)
+    return serialize_user(user_doc)
+
+
 async def create_user(user_data: UserCreate) -> UserResponseCreation:
     """Create a new user"""
     try:
@@ -105,32 +247,11 @@ async def create_user(user_data: UserCreate) -> UserResponseCreation:
             )
 
         # Prepare user document
-        user_doc = {
-            "email": user_data.email,
-            "username": user_data.username,
-            "avatar_url": user_data.avatar_url,
-            "created_at": datetime.utcnow(),
-            "is_active": True
-        }
-
-        user_doc = UserBaseDB(
-            email=user_data.email,
-            username=user_data.username,
-            ground_photo="",
-            aerial_photo="",
-            avatar_url=user_data.avatar_url or "",
-            carbon_score=0,
-            potential_earnings=None,
-            interested_companies=0,
-            verification_status=VerificationStatusEnum.PENDING,
-            notification_preferences={},
-            carbon_journey=None,
-            is_verified=False,
-            is_active=True
-        ).model_dump()
+        user_doc = _new_user_document(user_data)
 
         # Insert the user
         result = await users_collection.insert_one(user_doc)
+        invalidate_user(result.inserted_id, user_data.email)
         # Get the created user
         created_user = await users_collection.find_one({"_id": result.inserted_id})
         return serialize_user(created_user)
@@ -146,42 +267,230 @@ async def create_user(user_data: UserCreate) -> UserResponseCreation:
         )
 
 
-async def update_user(user_id: str, user_update: UserUpdate):
-    """Update user information"""
+async def create_users(users: List[UserCreate], hashed_passwords: Optional[List[Optional[str]]] = None
+                       ) -> List[Tuple[Optional[dict], Optional[str]]]:
+    """
+    Create many users with one duplicate check and one unordered insert_many.
+    Returns a (user, error) pair per input, in input order; a duplicate only
+    fails its own entry. hashed_passwords, if given, lines up with users.
+    """
+    if not db.is_connected and not await connect_to_mongo():
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Could not connect to database"
+        )
+
+    users_collection = db.get_collection("users")
+    outcomes: List[Tuple[Optional[dict], Optional[str]]] = [(None, None)] * len(users)
+
+    existing = users_collection.find(
+        {"$or": [{"email": {"$in": [user.email for user in users]}},
+                 {"username": {"$in": [user.username for user in users]}}]},
+        {"email": 1, "username": 1}
+    )
+    taken_emails, taken_usernames = set(), set()
+    async for user in existing:
+        taken_emails.add(user.get("email"))
+        taken_usernames.add(user.get("username"))
+
+    pending = []  # (input index, document)
+    for index, user_data in enumerate(users):
+        if user_data.email in taken_emails:
+            outcomes[index] = (None, "Email already registered")
+        elif user_data.username in taken_usernames:
+            outcomes[index] = (None, "Username already taken")
+        else:
+            # Later duplicates inside the same batch fail the same way
+            taken_emails.add(user_data.email)
+            taken_usernames.add(user_data.username)
+            hashed_password = hashed_passwords[index] if hashed_passwords else None
+            pending.append((index, dict(_new_user_document(user_data, hashed_password=hashed_password), _id=ObjectId())))
+
+    failed = {}
+    if pending:
+        try:
+            await users_collection.insert_many([document for _, document in pending], ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                if error.get("code") == 11000:
+                    # Lost a race with a concurrent registration
+                    failed[error["index"]] = "Email or username already registered"
+                else:
+                    failed[error["index"]] = f"Registration failed: {error.get('errmsg', 'write failed')}"
+
+    for position, (index, document) in enumerate(pending):
+        invalidate_user(document["_id"], document["email"])
+        if position in failed:
+            outcomes[index] = (None, failed[position])
+        else:
+            outcomes[index] = (serialize_user(document), None)
+    return outcomes
+
+
+async def set_photo_hashes(user_id: str, hashes: Dict[str, dict]):
+    """Record content hashes of uploaded photos (photo field -> hash) without touching the others"""
+    if not hashes:
+        return
+    update = {f"photo_hashes.{field}": content_hash for field, content_hash in hashes.items()}
+    update["updated_at"] = datetime.utcnow()
+    await db.get_collection("users").update_one({"_id": ObjectId(user_id)}, {"$set": update, "$inc": {"version": 1}})
+    invalidate_user(user_id)
+
+
+async def append_carbon_journey(user_id: str, entries: List[dict], source: str = "api") -> Optional[dict]:
+    """
+    Add entries to the user's journey in the time-series collection and fold
+    them into the embedded carbon_summary, in one update unless they are the
+    user's first. Returns the new summary.
+    """
+    measurements = [journey_measurement(user_id, entry, source) for entry in entries]
+    if not measurements:
+        return None
+    await insert_measurements(measurements)
+
+    newest = max(measurements, key=lambda measurement: measurement["timestamp"])
+    update = {
+        "$inc": {
+            "carbon_summary.entries": len(measurements),
+            "carbon_summary.total_credits": sum(measurement.get("credits") or 0 for measurement in measurements),
+            "version": 1,
+        },
+        "$min": {"carbon_summary.first_at": min(measurement["timestamp"] for measurement in measurements)},
+        "$max": {"carbon_summary.last_at": newest["timestamp"]},
+        "$set": {"updated_at": datetime.utcnow()},
+    }
+    latest = dict(update, **{"$set": dict(
+        update["$set"],
+        **{"carbon_summary.latest_carbon_score": newest.get("carbon_score"),
+           "carbon_summary.latest_credits": newest.get("credits")}
+    )})
+    # A summary with entries has both timestamps, so $min/$max never compare against null
+    query = {"_id": ObjectId(user_id), "carbon_summary.entries": {"$gt": 0}}
+    users_collection = db.get_collection("users")
+    try:
+        user = await users_collection.find_one_and_update(
+            dict(query, **{"carbon_summary.last_at": {"$lte": newest["timestamp"]}}), latest,
+            projection={"carbon_summary": 1}, return_document=ReturnDocument.AFTER
+        )
+        if user is None:
+            # Backfilled entries, older than the latest one
+            user = await users_collection.find_one_and_update(
+                query, update, projection={"carbon_summary": 1}, return_document=ReturnDocument.AFTER
+            )
+        if user is not None:
+            return user["carbon_summary"]
+        # The user's first entries (or a migrated user without any): build the summary from the collection
+        return (await refresh_carbon_summaries([user_id])).get(str(user_id))
+    finally:
+        invalidate_user(user_id)
+
+
+async def refresh_carbon_summaries(user_ids: List[str]) -> Dict[str, dict]:
+    """Recompute the users' carbon_summary from the time-series collection, in one bulk write"""
+    if not user_ids:
+        return {}
+    summaries = await summarize_journeys(user_ids)
+    now = datetime.utcnow()
+    await db.get_collection("users").bulk_write([
+        UpdateOne({"_id": ObjectId(user_id)},
+                  {"$set": {"carbon_summary": summaries.get(str(user_id)), "updated_at": now}, "$inc": {"version": 1}})
+        for user_id in user_ids
+    ], ordered=False)
+    for user_id in user_ids:
+        invalidate_user(user_id)
+    return summaries
+
+
+async def delete_users(user_ids: List[str]) -> int:
+    """Delete many users in one round trip, e.g. to roll back part of a batch"""
+    if not user_ids:
+        return 0
+    result = await db.get_collection("users").delete_many({"_id": {"$in": [ObjectId(user_id) for user_id in user_ids]}})
+    for user_id in user_ids:
+        invalidate_user(user_id)
+    return result.deleted_count
+
+
+def _version_filter(expected: dict) -> dict:
+    """Match a user only while it still has the version fields of `expected`"""
+    if expected.get("version") is not None:
+        return {"version": expected["version"]}
+    # Written before versioning: compare the timestamps the ETag was derived from
+    return {
+        "version": {"$exists": False},
+        "updated_at": expected["updated_at"] if expected.get("updated_at") is not None else {"$exists": False},
+    }
+
+
+async def update_user(user_id: str, user_update: UserUpdate, expected_version: Optional[dict] = None):
+    """
+    Update user information. With `expected_version` (the version fields the
+    client's ETag was computed from) the write only applies if the stored user
+    is unchanged, otherwise 412 is raised.
+    """
     try:
         users_collection = db.get_collection("users")
 
         # Convert user_update to dict, excluding unset fields
         update_data = user_update.model_dump(exclude_unset=True)
+        # Journey entries go to their time-series collection; the user only keeps the summary
+        journey = update_data.pop("carbon_journey", None)
 
-        if not update_data:
+        if not update_data and not journey:
             # Nothing to update
-            return await get_user(user_id)
+            return await get_user(user_id, route=PRIMARY)
 
         # Check if user exists
-        existing_user = await get_user(user_id)
+        existing_user = await get_user(user_id, route=PRIMARY)
         if not existing_user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="User not found"
             )
 
+        # Every write bumps the version the ETags are derived from
+        update_data.setdefault("updated_at", user_update.updated_at)
+        update_filter = {"_id": ObjectId(user_id)}
+        if expected_version is not None:
+            update_filter.update(_version_filter(expected_version))
+
+        # A buffered update of the same fields must not land after this write
+        await user_writes.supersede(str(ObjectId(user_id)), update_data)
+
         # Update the user
         result = await users_collection.update_one(
-            {"_id": ObjectId(user_id)},
-            {"$set": update_data}
+            update_filter,
+            {"$set": update_data, "$inc": {"version": 1}}
         )
+        invalidate_user(user_id, existing_user.get("email"), update_data.get("email"))
+
+        if expected_version is not None and result.matched_count == 0:
+            raise HTTPException(
+                status_code=status.HTTP_412_PRECONDITION_FAILED,
+                detail="User was modified by another request"
+            )
 
         if result.modified_count == 0 and result.matched_count > 0:
             # User found but not modified (might be the same data)
             logger.info(f"User {user_id} found but not modified")
 
-        # Return the updated user
-        return await get_user(user_id)
+        if journey:
+            entries, skipped = legacy_entries(journey)
+            if skipped:
+                logger.warning(f"Ignored carbon_journey keys of user {user_id} that aren't dates: {skipped}")
+            await append_carbon_journey(user_id, entries)
+
+        # Return the updated user, from the primary so it includes this write
+        return await get_user(user_id, route=PRIMARY)
 
     except HTTPException as e:
         # Re-raise HTTP exceptions
         raise
+    except DuplicateKeyError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email or username already registered"
+        )
     except Exception as e:
         logger.error(f"Error updating user: {e}")
         raise HTTPException(
@@ -190,6 +499,26 @@ async def update_user(user_id: str, user_update: UserUpdate):
         )
 
 
+async def buffer_user_update(user_id: str, user_update: UserUpdate, wait: bool = False):
+    """
+    Update fields of a user through the write buffer: updates of the same user
+    within USER_WRITE_BUFFER_WINDOW are merged into one write, and all pending
+    users are written in one bulk_write. Returns at once unless `wait` is set,
+    then once the write is acknowledged by a majority (raising if it failed).
+    Unlike update_user there is no existence check; updates of a missing user
+    are dropped. update_user drops pending buffered values of the fields it
+    writes, so the direct write always wins.
+    """
+    update_data = user_update.model_dump(exclude_unset=True)
+    unbuffered = [field for field in UNBUFFERED_FIELDS if field in update_data]
+    if unbuffered:
+        raise ValueError(f"{', '.join(unbuffered)} can't be buffered; use update_user")
+    if not update_data:
+        return
+    update_data.setdefault("updated_at", user_update.updated_at)
+    await user_writes.update(str(ObjectId(user_id)), update_data, wait=wait)
+
+
 async def delete_user(user_id: str):
     """Delete a user"""
     try:
@@ -205,6 +534,8 @@ async def delete_user(user_id: str):
 
         # Delete the user
         result = await users_collection.delete_one({"_id": ObjectId(user_id)})
+        invalidate_user(user_id, user.get("email"))
+        await delete_measurements([user_id])
 
         if result.deleted_count == 0:
             raise HTTPException(
@@ -0,0 +1,75 @@
+# verification_repository.py
+from datetime import datetime
+from typing import Optional
+
+from pymongo import ASCENDING
+
+from app.db.database import db
+
+# One document per verified (ground photo, aerial photo) content hash pair
+VERIFIED_UPLOADS_COLLECTION = "verified_uploads"
+AI_RESULTS_COLLECTION = "ai_results"
+
+
+def _verified_uploads():
+    return db.get_collection(VERIFIED_UPLOADS_COLLECTION)
+
+
+def pair_key(ground_sha256: str, aerial_sha256: str) -> str:
+    return f"{ground_sha256}:{aerial_sha256}"
+
+
+async def ensure_verification_indexes():
+    """Single-photo lookups; the pair itself is the _id"""
+    await _verified_uploads().create_index([("ground_sha256", ASCENDING)])
+    await _verified_uploads().create_index([("aerial_sha256", ASCENDING)])
+
+
+async def record_verified_upload(ground_sha256: str, aerial_sha256: str, user_id: str, thread_id: str,
+                                 result: dict):
+    """Remember the AI result for a photo pair. The first verification of a pair is kept."""
+    now = datetime.utcnow()
+    await _verified_uploads().update_one(
+        {"_id": pair_key(ground_sha256, aerial_sha256)},
+        {"$setOnInsert": {
+            "ground_sha256": ground_sha256,
+            "aerial_sha256": aerial_sha256,
+            "user_id": user_id,
+            "thread_id": thread_id,
+            "result": result,
+            "reuse_count": 0,
+            "created_at": now,
+        }},
+        upsert=True
+    )
+
+
+async def find_verified_upload(ground_sha256: str, aerial_sha256: str) -> Optional[dict]:
+    return await _verified_uploads().find_one({"_id": pair_key(ground_sha256, aerial_sha256)})
+
+
+async def find_photo_owner(sha256: str, field: str, exclude_user_id: str) -> Optional[dict]:
+    """A verified upload by another user whose `field` ("ground" or "aerial") photo has this hash"""
+    return await _verified_uploads().find_one(
+        {f"{field}_sha256": sha256, "user_id": {"$ne": exclude_user_id}},
+        {"user_id": 1, "thread_id": 1}
+    )
+
+
+async def mark_reused(ground_sha256: str, aerial_sha256: str):
+    await _verified_uploads().update_one(
+        {"_id": pair_key(ground_sha256, aerial_sha256)},
+        {"$inc": {"reuse_count": 1}, "$set": {"last_reused_at": datetime.utcnow()}}
+    )
+
+
+async def save_reused_result(user_id: str, thread_id: str, result: dict):
+    """
+    Store a result copied from an earlier verification as the user's. Kept
+    apart from the ingested results, which are keyed by their own thread_id.
+    """
+    await db.get_collection(AI_RESULTS_COLLECTION).update_one(
+        {"user_id": user_id, "reused_thread_id": thread_id},
+        {"$set": {"result": result, "updated_at": datetime.utcnow()}},
+        upsert=True
+    )
@@ -0,0 +1,231 @@
+# write_buffer.py
+import asyncio
+import logging
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, ConnectionFailure
+from pymongo.write_concern import WriteConcern
+
+from app.db.database import db
+from app.utils.metrics import registry
+
+logger = logging.getLogger("write_buffer")
+
+BUFFERED_UPDATES = registry.counter(
+    "write_buffer_updates_total", "Updates handed to a write buffer", ("collection",)
+)
+BUFFERED_WRITES = registry.counter(
+    "write_buffer_writes_total", "Document updates the buffered updates were merged into", ("collection",)
+)
+BUFFER_FLUSHES = registry.counter(
+    "write_buffer_flushes_total", "bulk_write round trips of a write buffer by outcome", ("collection", "outcome")
+)
+COALESCING_RATIO = registry.gauge(
+    "write_buffer_coalescing_ratio", "Buffered updates per document write since startup", ("collection",)
+)
+FLUSH_SIZE = registry.histogram(
+    "write_buffer_flush_documents", "Documents written per flush", ("collection",),
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000),
+)
+
+
+class Superseded(Exception):
+    """A waited-for buffered update was dropped: a direct write replaced every field it set"""
+
+
+class _Pending:
+    """The merged $set of one document, and the callers waiting for it to be written"""
+
+    def __init__(self):
+        self.fields: dict = {}
+        self.updates = 0
+        # (future, names of the fields that caller set)
+        self.waiters: List[Tuple[asyncio.Future, frozenset]] = []
+        self.durable = False
+
+
+class WriteBuffer:
+    """
+    Write-behind buffer of $set updates by document id. Updates of the same
+    document within `window` seconds are merged (later values win) and every
+    pending document is written in one unordered bulk_write, bumping its
+    version once. Callers normally don't wait; with wait=True they get the
+    write's outcome once it is acknowledged by a majority, or Superseded. `close()` flushes
+    what is left; after it updates are written through at once. Fields in
+    `max_fields` (timestamps) are written with $max, so they never move back.
+    Direct writes of buffered fields must call `supersede()` first.
+    """
+
+    def __init__(self, collection: str, window: float, max_documents: int,
+                 on_written: Optional[Callable[[str], None]] = None, retry_delay: float = 1.0,
+                 max_fields: Iterable[str] = ()):
+        self.collection = collection
+        self.window = window
+        self.max_documents = max_documents
+        self.on_written = on_written
+        self.retry_delay = retry_delay
+        self.max_fields = frozenset(max_fields)
+        self.closed = False
+        self._pending: Dict[str, _Pending] = {}
+        self._timer: Optional[asyncio.Task] = None
+        # flush task -> ids of the documents it writes
+        self._flushes: Dict[asyncio.Task, frozenset] = {}
+        self._updates = 0
+        self._writes = 0
+
+    def __len__(self):
+        return len(self._pending)
+
+    async def update(self, document_id: str, fields: dict, wait: bool = False):
+        """Buffer a $set of `fields`; with `wait`, return once it is written (or raise why it wasn't)"""
+        pending = self._pending.get(document_id)
+        if pending is None:
+            pending = self._pending[document_id] = _Pending()
+        pending.fields.update(fields)
+        pending.updates += 1
+        BUFFERED_UPDATES.labels(self.collection).inc()
+        waiter = None
+        if wait:
+            waiter = asyncio.get_running_loop().create_future()
+            pending.waiters.append((waiter, frozenset(fields)))
+            pending.durable = True
+
+        if self.closed or self.window <= 0 or len(self._pending) >= self.max_documents:
+            self._start_flush()
+        elif self._timer is None:
+            self._timer = asyncio.create_task(self._flush_later(self.window))
+        if waiter is not None:
+            await waiter
+
+    async def _flush_later(self, delay: float):
+        await asyncio.sleep(delay)
+        self._timer = None
+        self._start_flush()
+
+    def _start_flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+        task = asyncio.create_task(self._write(batch))
+        self._flushes[task] = frozenset(batch)
+        task.add_done_callback(lambda done: self._flushes.pop(done, None))
+
+    def _update_document(self, fields: dict) -> dict:
+        update = {"$inc": {"version": 1}}
+        set_fields = {name: value for name, value in fields.items() if name not in self.max_fields}
+        max_fields = {name: value for name, value in fields.items() if name in self.max_fields}
+        if set_fields:
+            update["$set"] = set_fields
+        if max_fields:
+            update["$max"] = max_fields
+        return update
+
+    async def _write(self, batch: Dict[str, _Pending]):
+        ids = list(batch)
+        collection = db.get_collection(self.collection)
+        if any(pending.durable for pending in batch.values()):
+            collection = collection.with_options(write_concern=WriteConcern("majority"))
+        errors: Dict[str, Exception] = {}
+        try:
+            await collection.bulk_write([
+                UpdateOne({"_id": ObjectId(document_id)}, self._update_document(batch[document_id].fields))
+                for document_id in ids
+            ], ordered=False)
+            outcome = "ok"
+        except BulkWriteError as e:
+            # The other documents were written
+            for error in e.details.get("writeErrors", ()):
+                errors[ids[error["index"]]] = Exception(error.get("errmsg", "write failed"))
+            outcome = "partial"
+        except Exception as e:
+            errors = {document_id: e for document_id in ids}
+            outcome = "failed"
+            if isinstance(e, ConnectionFailure) and not self.closed:
+                self._requeue(batch)
+
+        BUFFER_FLUSHES.labels(self.collection, outcome).inc()
+        if outcome != "failed":
+            FLUSH_SIZE.labels(self.collection).observe(len(ids))
+            self._updates += sum(pending.updates for pending in batch.values())
+            self._writes += len(ids)
+            BUFFERED_WRITES.labels(self.collection).inc(len(ids))
+            COALESCING_RATIO.labels(self.collection).set(self._updates / self._writes)
+        if errors:
+            logger.error(f"Buffered writes to {self.collection} failed for {len(errors)} of {len(ids)} documents: "
+                         f"{next(iter(errors.values()))}")
+
+        for document_id, pending in batch.items():
+            error = errors.get(document_id)
+            if error is None and self.on_written is not None:
+                self.on_written(document_id)
+            for waiter, _ in pending.waiters:
+                if waiter.done():
+                    continue
+                if error is None:
+                    waiter.set_result(None)
+                else:
+                    waiter.set_exception(error)
+
+    def _requeue(self, batch: Dict[str, _Pending]):
+        """
+        Mongo was unreachable: keep the updates nobody waits for (waiting
+        callers get the error) for the next flush, under newer ones
+        """
+        for document_id, pending in batch.items():
+            if pending.waiters:
+                continue
+            newer = self._pending.get(document_id)
+            if newer is None:
+                self._pending[document_id] = pending
+            else:
+                newer.fields = {**pending.fields, **newer.fields}
+                newer.updates += pending.updates
+        if self._pending and self._timer is None:
+            self._timer = asyncio.create_task(self._flush_later(max(self.window, self.retry_delay)))
+
+    async def supersede(self, document_id: str, fields: Iterable[str]):
+        """
+        Before a direct write of `fields` to the document: wait out buffered
+        writes of it already in flight (a failed one may requeue), then drop its
+        pending values of those fields, so no older value lands after the
+        direct write. Waiters of an update left with nothing to write get Superseded.
+        """
+        while True:
+            writing = [task for task, ids in self._flushes.items() if document_id in ids]
+            if not writing:
+                break
+            await asyncio.gather(*writing, return_exceptions=True)
+        pending = self._pending.get(document_id)
+        if pending is None:
+            return
+        dropped = frozenset(fields) - self.max_fields
+        for name in dropped:
+            pending.fields.pop(name, None)
+        if set(pending.fields) <= self.max_fields:
+            del self._pending[document_id]
+        waiting = []
+        for waiter, names in pending.waiters:
+            own = names - self.max_fields
+            if document_id in self._pending and not (own and own <= dropped):
+                waiting.append((waiter, names))
+            elif not waiter.done():
+                waiter.set_exception(Superseded(
+                    f"Buffered update of {self.collection} {document_id} superseded by a direct write"
+                ))
+        pending.waiters = waiting
+
+    async def flush(self):
+        """Write everything pending now and wait for every flush in progress"""
+        self._start_flush()
+        if self._flushes:
+            await asyncio.gather(*list(self._flushes), return_exceptions=True)
+
+    async def close(self):
+        """On shutdown: flush, and write later updates through"""
+        self.closed = True
+        await self.flush()
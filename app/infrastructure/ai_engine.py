@@ -1,11 +1,12 @@
 import logging
 import os
+from functools import lru_cache
 
 import httpx
-from langgraph_sdk import get_client
 
 from app.requests import AIRequest
 from app.requests.ai import AIResponse, AerialResult
+from app.utils.metrics import timed, track_dependency
 
 logging.basicConfig(
     level=logging.INFO,
@@ -15,38 +16,66 @@ logger = logging.getLogger("ai-engine")
 
 
 class AIEngine:
-    client = get_client(
-        url=os.environ.get("LANGGRAPH_URL", "http://localhost:8123"),
-        api_key=os.environ.get("LANGGRAPH_API_KEY")
-    )
+    _client = None
+    _default_assistant = None
+
+    @classmethod
+    def get_client(cls):
+        """LangGraph client, created (and langgraph_sdk imported) on first use"""
+        if cls._client is None:
+            from langgraph_sdk import get_client
+
+            cls._client = get_client(
+                url=os.environ.get("LANGGRAPH_URL", "http://localhost:8123"),
+                api_key=os.environ.get("LANGGRAPH_API_KEY")
+            )
+        return cls._client
+
+    # Only the calls that reach LangGraph are timed: methods built from other
+    # methods (send_message, send_and_get_id) would count their time twice
 
     @classmethod
     async def get_default_assistant(cls):
-        assistants = await cls.client.assistants.search(
-            metadata=None,
-            offset=0,
-            limit=1
-        )
-        return assistants[0]
+        """Default assistant, looked up once and cached (reset if a run reports it missing)"""
+        if cls._default_assistant is None:
+            with track_dependency("langgraph", "get_default_assistant"):
+                assistants = await cls.get_client().assistants.search(
+                    metadata=None,
+                    offset=0,
+                    limit=1
+                )
+            cls._default_assistant = assistants[0]
+        return cls._default_assistant
 
     @classmethod
+    @timed("langgraph")
     async def create_thread(cls):
         try:
-            return await cls.client.threads.create()
+            return await cls.get_client().threads.create()
         except Exception as error:
             print(f"Error creating thread: {error}")
             raise error
 
     @classmethod
+    @timed("langgraph")
+    async def delete_thread(cls, thread_id: str):
+        try:
+            return await cls.get_client().threads.delete(thread_id)
+        except Exception as error:
+            print(f"Error deleting thread: {error}")
+            raise error
+
+    @classmethod
+    @timed("langgraph")
     async def list_runs(cls, thread_id: str):
         try:
-            return await cls.client.runs.list(thread_id)
+            return await cls.get_client().runs.list(thread_id)
         except Exception as error:
             print(f"Error listing runs: {error}")
             raise error
 
     @classmethod
-    async def send_and_get_id(cls, thread_id: str, message) -> str:
+    async def send_and_get_id(cls, thread_id: str, message: AIRequest) -> str:
         """
         Get a complete response from the assistant without streaming.
         Waits for the full response before returning.
@@ -64,16 +93,20 @@ class AIEngine:
                 thread = await cls.create_thread()
                 thread_id = thread["thread_id"]
 
-            await cls.client.runs.create(
-                thread_id,
-                assistant["assistant_id"],
-                input=message
-            )
+            with track_dependency("langgraph", "create_run"):
+                await cls.get_client().runs.create(
+                    thread_id,
+                    assistant["assistant_id"],
+                    input=message.model_dump()
+                )
 
             return thread_id
 
             # Rest of your existing code...
         except httpx.HTTPStatusError as error:
+            if error.response.status_code == 404:
+                # The cached assistant may have been redeployed; look it up again next time
+                cls._default_assistant = None
             if error.response.status_code == 409:
                 logging.error(
                     "Thread is already running. Try creating a new thread or wait for current run to complete.")
@@ -97,10 +130,11 @@ class AIEngine:
             raise error
 
     @classmethod
+    @timed("langgraph")
     async def get_thread_info(cls, thread_id: str):
         try:
             # Get the thread information
-            thread_response = await cls.client.threads.get(thread_id)
+            thread_response = await cls.get_client().threads.get(thread_id)
 
 
             values = thread_response.get("values")
@@ -126,7 +160,11 @@ class AIEngine:
             logger.error(f"Error retrieving thread information: {error}")
             raise error
 
-ai_engine = AIEngine()
+@lru_cache(maxsize=None)
+def get_ai_engine() -> AIEngine:
+    """FastAPI dependency returning the shared AIEngine"""
+    return AIEngine()
+
 
 # Example of how to use with send_message (assuming it's from ai_engine.py)
 async def test_send_message():
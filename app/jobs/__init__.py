@@ -0,0 +1,4 @@
+from app.db.job_repository import enqueue_job
+from app.jobs.handlers import JOB_HANDLERS, PermanentJobError, job_handler
+
+__all__ = ["enqueue_job", "JOB_HANDLERS", "PermanentJobError", "job_handler"]
@@ -0,0 +1,150 @@
+import logging
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict
+
+from app.config.config import settings
+from app.db.database import db
+from app.db.job_repository import enqueue_job
+from app.db.user_repository import buffer_user_update, get_user, update_user
+from app.db.write_buffer import Superseded
+from app.db.verification_repository import AI_RESULTS_COLLECTION
+from app.infrastructure.ai_engine import get_ai_engine
+from app.requests import AIRequest
+from app.requests.user import InternalUserUpdate, UserUpdate
+from app.services.dedup_service import record_verification, reuse_verified_result
+from app.services.email_service import enqueue_email, get_email_service
+from app.services.preview_service import generate_previews
+from app.services.raster_service import inspect_and_record
+from app.services.s3_service import get_storage_service
+from app.utils.Enums import VerificationStatusEnum
+
+logger = logging.getLogger("jobs")
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+# LangGraph run statuses
+RUN_ACTIVE = ("pending", "running", "queued", "in_progress")
+RUN_FAILED = ("error", "timeout", "interrupted")
+
+# queue name -> handler; a handler receives the job payload and its return value
+# is stored on the job as its result
+JOB_HANDLERS: Dict[str, JobHandler] = {}
+
+
+class PermanentJobError(Exception):
+    """Raised by a handler when retrying cannot help; the job is dead-lettered at once"""
+
+
+def job_handler(queue: str):
+    def register(handler: JobHandler) -> JobHandler:
+        JOB_HANDLERS[queue] = handler
+        return handler
+
+    return register
+
+
+@job_handler("ai_dispatch")
+async def dispatch_verification(payload: Dict[str, Any]):
+    """
+    payload: user_id, aerial_key, ground_key. The aerial photo's GeoTIFF header
+    is inspected first (unless that already happened on upload); an invalid
+    one is rejected here instead of being sent to LangGraph. Photos already
+    verified together (same content hashes) reuse that result instead of a
+    new run. A photo that hasn't been uploaded yet fails the attempt, so it is
+    retried with backoff. A started run gets an ai_results job polling for its
+    result, and the user the registration-complete email.
+    """
+    user = await get_user(payload["user_id"], fields=("email", "aerial_metadata", "verification_thread_id"))
+    if user is None:
+        raise PermanentJobError(f"User {payload['user_id']} no longer exists")
+    if user.get("verification_thread_id"):
+        # An earlier attempt got as far as the run; only what follows it is left
+        return await _after_dispatch(user, user["verification_thread_id"])
+    metadata = user.get("aerial_metadata")
+    if metadata is None:
+        metadata = (await inspect_and_record(payload["user_id"], payload["aerial_key"], get_storage_service())).model_dump()
+    if not metadata.get("valid"):
+        await buffer_user_update(payload["user_id"], UserUpdate(verification_status=VerificationStatusEnum.REJECTED))
+        raise PermanentJobError(f"Invalid aerial photo: {metadata.get('error')}")
+
+    reused = await reuse_verified_result(
+        payload["user_id"], payload["ground_key"], payload["aerial_key"], get_storage_service()
+    )
+    if reused is not None:
+        await _enqueue_completion_email(user)
+        return {"reused": True, "carbon_credits": reused.carbon_credits}
+
+    thread_id = await get_ai_engine().send_message(AIRequest(**payload))
+    # Waited for: the thread is the only link to the LangGraph run
+    try:
+        await buffer_user_update(payload["user_id"], UserUpdate(verification_thread_id=thread_id), wait=True)
+    except Superseded:
+        # A direct update set the user's thread meanwhile; resending would only orphan another run
+        logger.warning(f"Thread {thread_id} of user {payload['user_id']} was superseded before it was recorded")
+        return {"thread_id": thread_id, "superseded": True}
+    return await _after_dispatch(user, thread_id)
+
+
+async def _after_dispatch(user: dict, thread_id: str) -> dict:
+    """Poll the run for its result, and tell the user their registration is complete"""
+    await enqueue_job(
+        "ai_results", {"user_id": user["id"], "thread_id": thread_id},
+        delay=settings.VERIFICATION_RESULT_DELAY,
+        max_attempts=settings.VERIFICATION_RESULT_MAX_ATTEMPTS,
+        dedupe_key=f"ai_results:{thread_id}",
+    )
+    await _enqueue_completion_email(user)
+    return {"thread_id": thread_id}
+
+
+async def _enqueue_completion_email(user: dict):
+    await enqueue_email("registration_complete", user["email"], dedupe_key=f"email:registration_complete:{user['id']}")
+
+
+@job_handler("ai_results")
+async def ingest_verification_result(payload: Dict[str, Any]):
+    """
+    payload: user_id, thread_id. While the run is still going the attempt fails
+    and is retried with backoff; a failed run is dead-lettered.
+    """
+    runs = await get_ai_engine().list_runs(payload["thread_id"])
+    if any(run["status"] in RUN_ACTIVE for run in runs):
+        raise RuntimeError(f"Run of thread {payload['thread_id']} is still in progress")
+    if runs and all(run["status"] in RUN_FAILED for run in runs):
+        raise PermanentJobError(f"Run of thread {payload['thread_id']} ended with {runs[0]['status']}")
+    result = await get_ai_engine().get_thread_info(payload["thread_id"])
+    await db.get_collection(AI_RESULTS_COLLECTION).update_one(
+        {"thread_id": payload["thread_id"]},
+        {"$set": {"user_id": payload["user_id"], "result": result.model_dump(), "updated_at": datetime.utcnow()}},
+        upsert=True
+    )
+    # The result itself is stored above; the status only needs to follow
+    await buffer_user_update(payload["user_id"], UserUpdate(verification_status=VerificationStatusEnum.IN_REVIEW))
+    # Later submissions of the same photos reuse this result
+    await record_verification(payload["user_id"], payload["thread_id"], result, get_storage_service())
+    return {"carbon_credits": result.carbon_credits}
+
+
+@job_handler("email")
+async def send_email(payload: Dict[str, Any]):
+    """payload: template ("signed_urls" or "registration_complete"), email, and urls for signed_urls"""
+    email_service = get_email_service()
+    template = payload.get("template")
+    if template == "signed_urls":
+        await email_service.send_signed_urls_email(payload["email"], payload["urls"])
+    elif template == "registration_complete":
+        await email_service.send_registration_completion_email(payload["email"])
+    else:
+        raise PermanentJobError(f"Unknown email template: {template}")
+
+
+@job_handler("previews")
+async def render_photo_previews(payload: Dict[str, Any]):
+    """payload: user_id, photo_field (ground_photo or aerial_photo), key"""
+    try:
+        previews = await generate_previews(get_storage_service(), payload["key"])
+    except ValueError as e:
+        raise PermanentJobError(str(e))
+    update = InternalUserUpdate(**{f"{payload['photo_field']}_previews": previews.model_dump()})
+    await update_user(payload["user_id"], update)
+    return {"levels": previews.levels, "width": previews.width, "height": previews.height}
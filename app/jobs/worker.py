@@ -0,0 +1,196 @@
+# Background job worker: python -m app.jobs.worker --queues ai_dispatch=4 email=2
+import argparse
+import asyncio
+import logging
+import os
+import random
+import signal
+import socket
+import time
+import uuid
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
+from fastapi import HTTPException
+
+from app.config.config import settings
+from app.db.database import close_mongo_connection, connect_to_mongo
+from app.db.job_repository import claim_job, complete_job, ensure_job_indexes, extend_lease, fail_job
+from app.db.user_repository import user_writes
+from app.jobs.handlers import JOB_HANDLERS, PermanentJobError, JobHandler
+from app.services.preview_service import shutdown_preview_executor
+from app.utils.metrics import registry
+from app.utils.retry import backoff_delay, retry_with_backoff
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("worker")
+
+JOBS_PROCESSED = registry.counter(
+    "jobs_processed_total",
+    "Jobs finished by this worker; outcome is succeeded, retried, dead, lost_lease or released",
+    ("queue", "outcome"),
+)
+JOB_DURATION = registry.histogram("job_duration_seconds", "Handler run time per job attempt", ("queue",))
+JOBS_RUNNING = registry.gauge("jobs_running", "Jobs currently being handled by this worker", ("queue",))
+
+
+class Worker:
+    """
+    Runs `concurrency` claim loops per queue. A job is claimed atomically with a
+    lease that a heartbeat keeps extending while the handler runs; if the worker
+    dies the lease runs out and another worker reclaims the job. Failures are
+    retried with backoff until max_attempts, then dead-lettered.
+    """
+
+    def __init__(self, queues: Dict[str, int], handlers: Dict[str, JobHandler] = None,
+                 worker_id: Optional[str] = None, lease_seconds: float = settings.JOB_LEASE_SECONDS,
+                 poll_interval: float = settings.JOB_POLL_INTERVAL):
+        self.handlers = handlers if handlers is not None else JOB_HANDLERS
+        missing = [queue for queue in queues if queue not in self.handlers]
+        if missing:
+            raise ValueError(f"No handler registered for queue(s): {', '.join(missing)}")
+        self.queues = queues
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.stopping = asyncio.Event()
+
+    async def run(self):
+        slots = [
+            asyncio.create_task(self._slot(queue))
+            for queue, concurrency in self.queues.items()
+            for _ in range(concurrency)
+        ]
+        logger.info(f"Worker {self.worker_id} polling {self.queues}")
+        await asyncio.gather(*slots)
+
+    def stop(self):
+        """Stop claiming; jobs already running are finished"""
+        self.stopping.set()
+
+    async def _idle(self, seconds: float):
+        try:
+            await asyncio.wait_for(self.stopping.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _slot(self, queue: str):
+        while not self.stopping.is_set():
+            try:
+                job = await claim_job(queue, self.worker_id, self.lease_seconds)
+            except Exception as e:
+                logger.error(f"Claiming from {queue} failed: {e}")
+                job = None
+            if job is None:
+                # Jitter keeps idle workers from polling in lockstep
+                await self._idle(self.poll_interval * random.uniform(0.5, 1.5))
+                continue
+            await self._process(queue, job)
+
+    async def _heartbeat(self, job: dict, work: asyncio.Task, lost: list):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                if await extend_lease(job["_id"], self.worker_id, self.lease_seconds):
+                    continue
+            except Exception as e:
+                # Keep going; the lease has some slack left before anyone can reclaim it
+                logger.warning(f"Heartbeat for job {job['_id']} failed: {e}")
+                continue
+            # Someone else reclaimed the job; stop working on it
+            lost.append(True)
+            work.cancel()
+            return
+
+    async def _process(self, queue: str, job: dict):
+        job_id = job["_id"]
+        attempts = job["attempts"]
+        if attempts > job["max_attempts"]:
+            # Reclaimed after its worker vanished during the last attempt
+            await fail_job(job_id, self.worker_id, job.get("last_error") or "lease expired", retry_delay=None)
+            JOBS_PROCESSED.labels(queue, "dead").inc()
+            return
+
+        lost = []
+        work = asyncio.ensure_future(self.handlers[queue](job["payload"]))
+        heartbeat = asyncio.ensure_future(self._heartbeat(job, work, lost))
+        running = JOBS_RUNNING.labels(queue)
+        running.inc()
+        start = time.perf_counter()
+        try:
+            result = await asyncio.shield(work)
+        except asyncio.CancelledError:
+            if lost:
+                logger.warning(f"Lost the lease on job {job_id} ({queue}); abandoned it")
+                JOBS_PROCESSED.labels(queue, "lost_lease").inc()
+                return
+            # Worker shutting down: hand the job back right away instead of waiting out the lease
+            work.cancel()
+            await asyncio.shield(fail_job(job_id, self.worker_id, "worker shut down", retry_delay=0))
+            JOBS_PROCESSED.labels(queue, "released").inc()
+            raise
+        except Exception as e:
+            permanent = isinstance(e, PermanentJobError) or (isinstance(e, HTTPException) and e.status_code < 500)
+            retry_delay = None if permanent or attempts >= job["max_attempts"] else backoff_delay(
+                attempts - 1, settings.JOB_RETRY_BASE_DELAY, settings.JOB_RETRY_MAX_DELAY)
+            await fail_job(job_id, self.worker_id, f"{type(e).__name__}: {e}", retry_delay)
+            JOBS_PROCESSED.labels(queue, "dead" if retry_delay is None else "retried").inc()
+            logger.error(f"Job {job_id} ({queue}) attempt {attempts} failed: {e}")
+        else:
+            await complete_job(job_id, self.worker_id, result)
+            JOBS_PROCESSED.labels(queue, "succeeded").inc()
+        finally:
+            JOB_DURATION.labels(queue).observe(time.perf_counter() - start)
+            running.dec()
+            heartbeat.cancel()
+
+
+def parse_queues(specs) -> Dict[str, int]:
+    """["ai_dispatch=4", "email"] -> {"ai_dispatch": 4, "email": 1}"""
+    queues = {}
+    for spec in specs:
+        name, _, concurrency = spec.partition("=")
+        queues[name] = max(int(concurrency or 1), 1)
+    return queues
+
+
+async def run_worker(queues: Dict[str, int], drain_timeout: float):
+    await retry_with_backoff(connect_to_mongo, "MongoDB", settings.RECONNECT_BASE_DELAY, settings.RECONNECT_MAX_DELAY)
+    await ensure_job_indexes()
+
+    worker = Worker(queues)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, worker.stop)
+
+    running = asyncio.create_task(worker.run())
+    await worker.stopping.wait()
+    logger.info(f"🛑 Draining worker {worker.worker_id} (up to {drain_timeout}s)...")
+    done, _ = await asyncio.wait([running], timeout=drain_timeout)
+    if not done:
+        # Jobs still running are handed back to the queue
+        running.cancel()
+        await asyncio.gather(running, return_exceptions=True)
+    shutdown_preview_executor()
+    # Status updates handlers buffered without waiting
+    await user_writes.close()
+    await close_mongo_connection()
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Process background jobs from the Mongo job queue")
+    parser.add_argument("--queues", nargs="+", help="queue=concurrency pairs (default: WORKER_QUEUES)")
+    parser.add_argument("--drain-timeout", type=float, default=float(os.getenv("GRACEFUL_SHUTDOWN_TIMEOUT", "30")),
+                        help="seconds running jobs get to finish after SIGTERM")
+    args = parser.parse_args()
+
+    queues = parse_queues(args.queues) if args.queues else dict(settings.WORKER_QUEUES)
+    asyncio.run(run_worker(queues, args.drain_timeout))
+
+
+if __name__ == "__main__":
+    main()
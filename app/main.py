@@ -1,17 +1,24 @@
 import os
 
-import uvicorn
 from dotenv import load_dotenv
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from starlette.requests import Request
 import logging
 import asyncio
+from contextlib import asynccontextmanager
 
 from app.infrastructure import test_send_message, check_thread_status
-from app.routers import users
-from app.db import connect_to_mongo, close_mongo_connection
+from app.middleware import AdmissionControlMiddleware, MetricsMiddleware, ProfilingMiddleware, UploadLimitMiddleware
+from app.routers import auth, users, metrics
+from app.config.config import settings
+from app.db import close_mongo_connection
+from app.db.cache_invalidation import cache_invalidation
+from app.db.user_repository import user_writes
+from app.services.auth_service import get_password_hasher
+from app.utils.readiness import readiness
+from app.utils.warmup import start_dependency_warmups, warm_up_app
 
 # Load environment variables
 load_dotenv()
@@ -25,42 +32,54 @@ logger = logging.getLogger("app")
 
 
 
-# Initialize FastAPI app
-app = FastAPI(
-    title="Earth AI API",
-    description="API for Earth AI platform",
-    version="0.1.0"
-)
-
-# Create database tables
-@app.on_event("startup")
-async def startup_db_client():
+@asynccontextmanager
+async def lifespan(app: FastAPI):
     logger.info("🚀 Starting application...")
 
     # await test_send_message()
 
     # await check_thread_status("5830202f-0b85-404a-bd37-91a8bad91750")
 
-    connection_successful = await connect_to_mongo()
-
-    if not connection_successful:
-        logger.error("⚠️ Application started with MongoDB connection issues!")
-        # Retrying logic (optional)
-        for i in range(3):
-            logger.info(f"Retrying connection in 5 seconds (attempt {i + 1}/3)...")
-            await asyncio.sleep(5)
-            if await connect_to_mongo():
-                logger.info("✅ Connection successful on retry!")
-                break
+    # Mongo, S3 and LangGraph warm up concurrently and keep retrying with backoff.
+    # Startup waits a bounded time for the critical ones; /ready reports the rest.
+    warmups = start_dependency_warmups()
+    # Drops cache entries other workers wrote; waits for Mongo on its own
+    if settings.CACHE_INVALIDATION_ENABLED:
+        cache_invalidation.start()
+    critical = [task for name, task in warmups.items() if name in readiness.critical]
+    if critical:
+        await asyncio.wait(critical, timeout=settings.STARTUP_WARMUP_TIMEOUT)
+
+    if readiness.is_ready():
+        logger.info("✅ Application started successfully with warm dependencies!")
     else:
-        logger.info("✅ Application started successfully with MongoDB connection!")
+        logger.error(f"⚠️ Application started before critical dependencies were warm: {readiness.dependencies}")
 
- # Close MongoDB connection on shutdown
-@app.on_event("shutdown")
-async def shutdown_db_client():
+    # Runs before the worker accepts connections
+    await warm_up_app(app)
+
+    yield
+
+    # Close connections on shutdown
     logger.info("🛑 Shutting down application...")
+    for task in warmups.values():
+        task.cancel()
+    await asyncio.gather(*warmups.values(), return_exceptions=True)
+    await cache_invalidation.stop()
+    # Buffered user updates still pending
+    await user_writes.close()
+    (await get_password_hasher()).shutdown()
     await close_mongo_connection()
 
+
+# Initialize FastAPI app
+app = FastAPI(
+    title="Earth AI API",
+    description="API for Earth AI platform",
+    version="0.1.0",
+    lifespan=lifespan
+)
+
 # Configure CORS
 origins = [
     "http://localhost",
@@ -74,6 +93,18 @@ app.add_middleware(
     allowed_hosts=["*"]
 )
 
+# Enforce MAX_UPLOAD_SIZE on request bodies (limits are read once from Settings)
+app.add_middleware(UploadLimitMiddleware)
+
+# Profiles a single request on demand (X-Profile header or PROFILE_SAMPLE_RATE)
+app.add_middleware(ProfilingMiddleware)
+
+# Sheds excess load with 429/503 before it reaches the app; inside MetricsMiddleware so rejections are counted
+if settings.ADMISSION_ENABLED:
+    app.add_middleware(AdmissionControlMiddleware)
+
+# Outside admission control and the upload limit, so their 429/503/413 responses carry
+# CORS headers too and preflight requests are answered without taking a slot
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -82,28 +113,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Configure custom middleware for large file uploads
-@app.middleware("http")
-async def custom_upload_middleware(request: Request, call_next):
-    # Use environment variables for upload limits with fallback values
-    max_upload_size = int(os.getenv("MAX_UPLOAD_SIZE", 104857600))  # From .env: 100MB
-    chunk_size = int(os.getenv("CHUNK_SIZE", 1048576))  # From .env: 1MB
-    boundary_buffer = int(os.getenv("BOUNDARY_BUFFER_SIZE", 102400))  # From .env: 100KB
-
-    # Increase upload limits
-    request.scope["max_upload_size"] = max_upload_size
-    request.scope["max_form_parts"] = 1000
-    request.scope["max_form_field_size"] = chunk_size
-
-    # Increase boundary buffer
-    if "content-type" in request.headers:
-        request.scope["_boundary_buffer_size"] = boundary_buffer
-
-    response = await call_next(request)
-    return response
+# Added last so it wraps every other middleware and sees the full request latency
+app.add_middleware(MetricsMiddleware)
 
 # Include routers
+app.include_router(auth.router)
 app.include_router(users.router)
+app.include_router(metrics.router)
 # app.include_router(webhooks.router)
 
 @app.get("/")
@@ -114,6 +130,14 @@ async def root():
 def health_check():
     return {"status": "healthy"}
 
+@app.get("/ready")
+def readiness_check():
+    """Ready only once the critical dependencies are warm; liveness stays on /health"""
+    state = readiness.snapshot()
+    return JSONResponse(state, status_code=200 if state["ready"] else 503)
+
 if __name__ == "__main__":
+    import uvicorn
+
     port = int(os.getenv("PORT", "8000"))
     uvicorn.run("app.main:app", host="0.0.0.0", port=port, reload=True)
@@ -0,0 +1,6 @@
+from app.middleware.admission import AdmissionControlMiddleware
+from app.middleware.metrics import MetricsMiddleware
+from app.middleware.profiling import ProfilingMiddleware
+from app.middleware.uploads import UploadLimitMiddleware
+
+__all__ = ["AdmissionControlMiddleware", "MetricsMiddleware", "ProfilingMiddleware", "UploadLimitMiddleware"]
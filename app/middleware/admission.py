@@ -0,0 +1,71 @@
+import math
+import re
+from time import monotonic, perf_counter
+
+from starlette.responses import JSONResponse
+
+from app.config.config import settings
+from app.utils.admission import ADMISSION_REJECTIONS, AdaptiveConcurrencyLimiter, ClientRateLimiter
+
+
+def _client_key(scope) -> str:
+    # uvicorn's proxy_headers already resolved X-Forwarded-For into scope["client"]
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+class AdmissionControlMiddleware:
+    """
+    Pure ASGI admission control. Each client first spends a token from its own
+    bucket (429 when empty), then the request needs a slot under the adaptive
+    concurrency limit (503 when full). Both answer immediately with Retry-After,
+    so a burst is shed at the door instead of slowing every request down.
+    """
+
+    def __init__(self, app, client_limiter: ClientRateLimiter = None,
+                 concurrency_limiter: AdaptiveConcurrencyLimiter = None, exempt_paths=None, unsampled_paths=None):
+        self.app = app
+        self.client_limiter = client_limiter or ClientRateLimiter(
+            settings.ADMISSION_CLIENT_RATE, settings.ADMISSION_CLIENT_BURST, settings.ADMISSION_MAX_CLIENTS
+        )
+        self.concurrency_limiter = concurrency_limiter or AdaptiveConcurrencyLimiter(
+            settings.ADMISSION_INITIAL_LIMIT,
+            settings.ADMISSION_MIN_LIMIT,
+            settings.ADMISSION_MAX_LIMIT,
+            settings.ADMISSION_LATENCY_TARGET,
+        )
+        self.exempt_paths = frozenset(settings.ADMISSION_EXEMPT_PATHS if exempt_paths is None else exempt_paths)
+        self.unsampled_paths = [re.compile(pattern) for pattern in (
+            settings.ADMISSION_UNSAMPLED_PATHS if unsampled_paths is None else unsampled_paths)]
+
+    async def _reject(self, scope, receive, send, status_code: int, reason: str, retry_after: int):
+        ADMISSION_REJECTIONS.labels(reason).inc()
+        response = JSONResponse(
+            {"detail": "Too many requests" if status_code == 429 else "Server is over capacity, retry later"},
+            status_code=status_code,
+            headers={"Retry-After": str(retry_after)},
+        )
+        await response(scope, receive, send)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exempt_paths:
+            await self.app(scope, receive, send)
+            return
+
+        wait = self.client_limiter.acquire(_client_key(scope), monotonic())
+        if wait > 0:
+            await self._reject(scope, receive, send, 429, "rate_limited", max(1, math.ceil(wait)))
+            return
+
+        limiter = self.concurrency_limiter
+        if not limiter.try_acquire():
+            await self._reject(scope, receive, send, 503, "overloaded", limiter.retry_after())
+            return
+
+        # Long uploads hold a slot, but their duration doesn't feed the limit
+        sampled = not any(pattern.fullmatch(scope["path"]) for pattern in self.unsampled_paths)
+        start = perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release(perf_counter() - start if sampled else None)
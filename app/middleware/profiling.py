@@ -0,0 +1,107 @@
+import asyncio
+import hmac
+import logging
+import random
+import time
+import uuid
+
+from app.config.config import settings
+from app.utils.metrics import dependency_wait_times
+from app.utils.profiling import SamplingProfiler, write_profile
+
+logger = logging.getLogger("profiler")
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+DEPENDENCIES = ("mongo", "langgraph", "s3")
+
+
+class ProfilingMiddleware:
+    """
+    Samples the event loop thread for a single request and stores the result
+    under PROFILE_OUTPUT_DIR, which keeps the newest PROFILE_MAX_PROFILES.
+    A request is profiled when it carries an `X-Profile` header matching
+    PROFILE_ADMIN_TOKEN, or at PROFILE_SAMPLE_RATE.
+
+    Only one request is profiled at a time: the sampler sees the whole loop
+    thread, so overlapping profiles would attribute each other's work.
+    """
+
+    def __init__(self, app, sample_rate: float = None, admin_token: str = None,
+                 interval: float = None, output_dir: str = None, max_profiles: int = None):
+        self.app = app
+        self.sample_rate = settings.PROFILE_SAMPLE_RATE if sample_rate is None else sample_rate
+        self.admin_token = settings.PROFILE_ADMIN_TOKEN if admin_token is None else admin_token
+        self.interval = interval or settings.PROFILE_INTERVAL
+        self.output_dir = output_dir or settings.PROFILE_OUTPUT_DIR
+        self.max_profiles = settings.PROFILE_MAX_PROFILES if max_profiles is None else max_profiles
+        self._active = False
+
+    def _requested_by_admin(self, scope) -> bool:
+        if not self.admin_token:
+            return False
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                return hmac.compare_digest(value, self.admin_token.encode())
+        return False
+
+    def _should_profile(self, scope) -> bool:
+        if self._active:
+            return False
+        if self._requested_by_admin(scope):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        self._active = True
+        profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(PROFILE_ID_HEADER, profile_id.encode())]
+            await send(message)
+
+        waits = {}
+        token = dependency_wait_times.set(waits)
+        profiler = SamplingProfiler(interval=self.interval)
+        cpu_start = time.thread_time()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.stop()
+            cpu_seconds = time.thread_time() - cpu_start
+            dependency_wait_times.reset(token)
+            self._active = False
+
+            awaiting = {dep: round(waits.get(dep, 0.0), 6) for dep in DEPENDENCIES}
+            wall = profiler.wall_time
+            summary = {
+                "profile_id": profile_id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status_code,
+                "wall_seconds": round(wall, 6),
+                # Loop-thread CPU; includes other requests served concurrently
+                "cpu_seconds": round(cpu_seconds, 6),
+                "sampled_busy_seconds": round(profiler.busy_time(), 6),
+                # Summed per call, so overlapping awaits can add up to more than wall time
+                "awaiting_seconds": awaiting,
+                "unattributed_seconds": round(max(wall - cpu_seconds - sum(awaiting.values()), 0.0), 6),
+                "samples": profiler.sample_count,
+                "interval_seconds": self.interval,
+            }
+            # File I/O happens off the loop; the response has already been sent
+            try:
+                await asyncio.get_running_loop().run_in_executor(
+                    None, write_profile, self.output_dir, profile_id, profiler, summary, self.max_profiles
+                )
+            except Exception as e:
+                logger.error(f"Error writing profile {profile_id}: {e}")
@@ -0,0 +1,49 @@
+from fastapi import HTTPException, status
+from starlette.responses import JSONResponse
+
+from app.config.config import settings
+
+
+class UploadLimitMiddleware:
+    """
+    Enforces MAX_UPLOAD_SIZE on every request body. A declared Content-Length
+    over the limit is rejected before anything is read; chunked bodies are
+    counted as they stream and fail with 413 once they cross the limit.
+    """
+
+    def __init__(self, app, max_upload_size: int = None):
+        self.app = app
+        self.max_upload_size = max_upload_size or settings.MAX_UPLOAD_SIZE
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                if value.isdigit() and int(value) > self.max_upload_size:
+                    response = JSONResponse(
+                        {"detail": f"Request body exceeds the {self.max_upload_size} byte limit"},
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    )
+                    await response(scope, receive, send)
+                    return
+                break
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_upload_size:
+                    # Raised inside the endpoint's body read, so FastAPI turns it into a 413
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=f"Request body exceeds the {self.max_upload_size} byte limit"
+                    )
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -0,0 +1,17 @@
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class CarbonJourneySummary(BaseModel):
+    """
+    Embedded on the user in place of the history itself, which lives in the
+    carbon_journey time-series collection (one measurement per entry)
+    """
+    entries: int = 0
+    first_at: Optional[datetime] = None
+    last_at: Optional[datetime] = None
+    latest_carbon_score: Optional[float] = None  # of the entry at last_at
+    latest_credits: Optional[float] = None
+    total_credits: float = 0
@@ -1,5 +1,22 @@
+from typing import Optional
 
+from pydantic import BaseModel
 
+from app.models.geo import GeoPoint
 
-class CompanyModel():
-   pass
+
+# Company document as stored in the companies collection
+class CompanyBaseDB(BaseModel):
+    name: str
+    tagline: Optional[str] = None
+    description: Optional[str] = None
+    location: Optional[str] = None  # place name, e.g. "Nairobi, Kenya"
+    geo: Optional[GeoPoint] = None  # geocoded from location at seed time
+    contact_email: Optional[str] = None
+    minimum_score: float = 0
+    maximum_score: float = 100
+    carbon_credits_needed: int = 0
+    price_per_credit: float = 0
+    budget_range: Optional[str] = None
+    potential_earnings: float = 0
+    status: str = "Active"
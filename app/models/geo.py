@@ -0,0 +1,29 @@
+from typing import List, Literal
+
+from pydantic import BaseModel, Field, field_validator
+
+
+class GeoPoint(BaseModel):
+    """GeoJSON Point as stored for 2dsphere indexes: coordinates are [longitude, latitude]"""
+    type: Literal["Point"] = "Point"
+    coordinates: List[float] = Field(..., min_length=2, max_length=2)
+
+    @field_validator("coordinates")
+    @classmethod
+    def check_range(cls, coordinates: List[float]) -> List[float]:
+        longitude, latitude = coordinates
+        if not -180 <= longitude <= 180 or not -90 <= latitude <= 90:
+            raise ValueError("coordinates must be [longitude, latitude] within [-180, 180] and [-90, 90]")
+        return coordinates
+
+    @classmethod
+    def from_lat_lng(cls, latitude: float, longitude: float) -> "GeoPoint":
+        return cls(coordinates=[longitude, latitude])
+
+    @property
+    def longitude(self) -> float:
+        return self.coordinates[0]
+
+    @property
+    def latitude(self) -> float:
+        return self.coordinates[1]
@@ -0,0 +1,36 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class RasterMetadata(BaseModel):
+    """What the aerial photo's GeoTIFF header says, recorded when the upload is inspected"""
+    valid: bool
+    error: Optional[str] = None  # why an invalid upload was rejected
+    width: Optional[int] = None
+    height: Optional[int] = None
+    bands: Optional[int] = None
+    bits_per_sample: Optional[List[int]] = None
+    compression: Optional[int] = None  # TIFF compression code (1 none, 5 LZW, 7 JPEG, 8 deflate, ...)
+    tile_width: Optional[int] = None  # None for striped TIFFs
+    tile_height: Optional[int] = None
+    overviews: int = 0
+    crs: Optional[str] = None  # "EPSG:<code>"
+    bounds: Optional[List[float]] = None  # [min_x, min_y, max_x, max_y] in CRS units
+    size: Optional[int] = None  # object size in bytes
+    bytes_read: int = 0  # fetched from S3 to inspect it
+    inspected_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class PhotoPreviews(BaseModel):
+    """Downscaled renditions of an uploaded photo, stored under derived S3 keys"""
+    previews: Dict[str, str]  # name (thumbnail, preview) -> key
+    tiles: str  # key prefix of the tile pyramid: <tiles>/<level>/<column>/<row>.jpg
+    tile_size: int
+    levels: int  # level 0 is a single tile, each next level doubles the resolution
+    width: int  # of the most detailed level
+    height: int
+    source_width: int
+    source_height: int
+    generated_at: datetime = Field(default_factory=datetime.utcnow)
@@ -4,13 +4,23 @@ from typing import Optional, Dict, Any
 
 from bson import ObjectId
 from pydantic import BaseModel, Field, EmailStr
+from pydantic_core import core_schema
+
+from app.models.carbon_journey import CarbonJourneySummary
+from app.models.geo import GeoPoint
+from app.models.raster import PhotoPreviews, RasterMetadata
+from app.models.verification import ContentHash, FraudReview
 
 
 # Custom ObjectId field for MongoDB
 class PyObjectId(str):
     @classmethod
-    def __get_validators__(cls):
-        yield cls.validate
+    def __get_pydantic_core_schema__(cls, source, handler):
+        return core_schema.no_info_plain_validator_function(cls.validate)
+
+    @classmethod
+    def __get_pydantic_json_schema__(cls, schema, handler):
+        return {"type": "string"}
 
     @classmethod
     def validate(cls, v):
@@ -33,17 +43,25 @@ class UserBaseDB(BaseModel):
     username: str
     ground_photo: Optional[str] = None
     aerial_photo: Optional[str] = None
+    aerial_metadata: Optional[RasterMetadata] = None  # set when the uploaded aerial photo is inspected
+    ground_photo_previews: Optional[PhotoPreviews] = None
+    aerial_photo_previews: Optional[PhotoPreviews] = None
+    photo_hashes: Dict[str, ContentHash] = Field(default_factory=dict)  # photo field -> hash of the uploaded object
+    fraud_review: Optional[FraudReview] = None  # set when a submission duplicates someone else's
     avatar_url: Optional[str] = None
     carbon_score: float = 0
     potential_earnings: Optional[str] = None
     interested_companies: int = 0
     verification_status: VerificationStatusEnum = VerificationStatusEnum.PENDING
     notification_preferences: Dict[str, Any] = Field(default_factory=dict)
-    carbon_journey: Optional[Dict[str, Any]] = None,
+    carbon_summary: Optional[CarbonJourneySummary] = None  # the history is in the carbon_journey collection
     created_at: datetime = Field(default_factory=datetime.utcnow)
     is_verified: bool = False
     verification_thread_id: Optional[str] = None
     is_active: bool = True
+    hashed_password: Optional[str] = None
+    geo: Optional[GeoPoint] = None  # the farm's location, for matching nearby companies
+    version: int = 1
 
 
 # User model for response (with id)
@@ -68,7 +86,7 @@ def user_helper(user) -> dict:
         "interested_companies": user.get("interested_companies", 0),
         "verification_status": user.get("verification_status", "pending"),
         "notification_preferences": user.get("notification_preferences", {}),
-        "carbon_journey": user.get("carbon_journey"),
+        "carbon_summary": user.get("carbon_summary"),
         "is_verified": user.get("is_verified", False),
         "is_active": user.get("is_active", True),
         "created_at": user.get("created_at"),
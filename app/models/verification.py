@@ -0,0 +1,20 @@
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class ContentHash(BaseModel):
+    """SHA-256 of an uploaded object, with the ETag it was computed for"""
+    sha256: str
+    etag: Optional[str] = None  # the hash is reused while the object's ETag is unchanged
+    size: Optional[int] = None
+
+
+class FraudReview(BaseModel):
+    """Why a user's submission needs a human look"""
+    reason: str  # "duplicate_submission": both photos match another user's verified pair; "reused_photo": one does
+    matched_user_id: Optional[str] = None
+    matched_thread_id: Optional[str] = None
+    photo_field: Optional[str] = None  # which photo matched, for reused_photo
+    flagged_at: datetime = Field(default_factory=datetime.utcnow)
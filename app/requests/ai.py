@@ -1,7 +1,6 @@
 from typing import Dict, Optional, Any, List
 
-from pydantic import Field
-from pydantic.v1 import BaseModel
+from pydantic import BaseModel, Field
 
 # Request
 class AIRequest(BaseModel):
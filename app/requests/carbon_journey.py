@@ -0,0 +1,40 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+from app.config.config import settings
+from app.models.carbon_journey import CarbonJourneySummary
+
+
+class CarbonJourneyEntry(BaseModel):
+    timestamp: datetime
+    carbon_score: Optional[float] = None
+    credits: Optional[float] = None
+    note: Optional[str] = None
+    data: Dict[str, Any] = Field(default_factory=dict)  # anything else recorded with the entry
+
+
+class CarbonJourneyAppend(BaseModel):
+    entries: List[CarbonJourneyEntry] = Field(..., min_length=1, max_length=settings.JOURNEY_MAX_APPEND)
+
+
+class CarbonJourneyPoint(BaseModel):
+    """One entry, or with an interval the entries of one bucket (average score, summed credits)"""
+    timestamp: datetime  # start of the bucket when downsampled
+    carbon_score: Optional[float] = None
+    carbon_score_min: Optional[float] = None
+    carbon_score_max: Optional[float] = None
+    credits: Optional[float] = None
+    count: int = 1
+    note: Optional[str] = None  # raw entries only
+
+
+class CarbonJourneyHistory(BaseModel):
+    user_id: str
+    interval: str
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+    points: List[CarbonJourneyPoint]
+    truncated: bool = False  # more points matched than the limit
+    summary: Optional[CarbonJourneySummary] = None
@@ -0,0 +1,20 @@
+from typing import Optional
+
+from pydantic import BaseModel
+
+from app.models.geo import GeoPoint
+
+
+class NearbyCompanyResponse(BaseModel):
+    id: str
+    name: str
+    tagline: Optional[str] = None
+    location: Optional[str] = None
+    geo: Optional[GeoPoint] = None
+    minimum_score: float = 0
+    maximum_score: float = 100
+    carbon_credits_needed: int = 0
+    price_per_credit: float = 0
+    potential_earnings: float = 0
+    status: str = "Active"
+    distance_km: float
@@ -1,8 +1,13 @@
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 
 from pydantic import BaseModel, EmailStr, ConfigDict, Field
 
+from app.config.config import settings
+from app.models.carbon_journey import CarbonJourneySummary
+from app.models.geo import GeoPoint
+from app.models.raster import PhotoPreviews, RasterMetadata
+from app.models.verification import ContentHash, FraudReview
 from app.requests.S3 import SignedUrlsResponse
 from app.utils.Enums import VerificationStatusEnum
 
@@ -15,15 +20,24 @@ class UserBase(BaseModel):
 
 class UserCreate(UserBase):
     avatar_url: Optional[str]
+    # Optional so existing clients keep registering; without one the user cannot log in.
+    # bcrypt only looks at the first 72 bytes.
+    password: Optional[str] = Field(None, min_length=8, max_length=72)
+    geo: Optional[GeoPoint] = None
     ground_photo_content_type: Optional[str] = "image/jpeg"
     aerial_photo_content_type: Optional[str] = "image/tiff"
 
 
 class UserResponse(UserBase):
-    id: int
+    id: str
     ground_photo: Optional[str] = None
     aerial_photo: Optional[str] = None
+    aerial_metadata: Optional[RasterMetadata] = None
+    ground_photo_previews: Optional[PhotoPreviews] = None
+    aerial_photo_previews: Optional[PhotoPreviews] = None
     is_verified: bool = False
+    carbon_summary: Optional[CarbonJourneySummary] = None
+    geo: Optional[GeoPoint] = None
     created_at: Optional[datetime] = None
 
 class UserResponseCreation(BaseModel):
@@ -33,8 +47,28 @@ class UserResponseCreation(BaseModel):
     created_at: str
     upload_urls: SignedUrlsResponse
 
+class UserBatchCreate(BaseModel):
+    users: List[UserCreate] = Field(..., min_length=1, max_length=settings.BATCH_REGISTRATION_MAX_USERS)
+
+
+class BatchRegistrationResult(BaseModel):
+    index: int  # position in the request's users list
+    email: str
+    status: str  # "created" or "failed"
+    user: Optional[UserResponseCreation] = None
+    error: Optional[str] = None
+
+
+class BatchRegistrationResponse(BaseModel):
+    created: int
+    failed: int
+    results: List[BatchRegistrationResult]
+
 # User update model (all fields optional)
 class UserUpdate(BaseModel):
+    # Enums are stored by value; Mongo cannot encode the Enum members themselves
+    model_config = ConfigDict(use_enum_values=True)
+
     email: Optional[EmailStr] = None
     username: Optional[str] = None
     ground_photo: Optional[str] = None
@@ -45,8 +79,19 @@ class UserUpdate(BaseModel):
     interested_companies: Optional[int] = None
     verification_status: Optional[VerificationStatusEnum] = None
     notification_preferences: Optional[Dict[str, Any]] = None
-    carbon_journey: Optional[Dict[str, Any]] = None
+    carbon_journey: Optional[Dict[str, Any]] = None  # date -> entry; appended to the journey, not stored on the user
     is_verified: Optional[bool] = None
     is_active: Optional[bool] = None
     verification_thread_id: Optional[str] = None
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
\ No newline at end of file
+    geo: Optional[GeoPoint] = None
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+# Fields only the server writes (inspection, previews, dedup, fraud review); never
+# a request body, so a client can't forge them through PUT /api/users/{id}
+class InternalUserUpdate(UserUpdate):
+    aerial_metadata: Optional[RasterMetadata] = None
+    ground_photo_previews: Optional[PhotoPreviews] = None
+    aerial_photo_previews: Optional[PhotoPreviews] = None
+    photo_hashes: Optional[Dict[str, ContentHash]] = None
+    fraud_review: Optional[FraudReview] = None
\ No newline at end of file
@@ -1,3 +1,3 @@
-from app.routers import users, webhooks
+from app.routers import auth, users, webhooks, metrics
 
-__all__ = ["users", "webhooks"]
\ No newline at end of file
+__all__ = ["auth", "users", "webhooks", "metrics"]
\ No newline at end of file
@@ -0,0 +1,47 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.security import OAuth2PasswordRequestForm
+
+from app.requests.auth import LoginRequest, TokenResponse
+from app.requests.user import UserResponse
+from app.services.auth_service import (
+    PasswordHasher, TokenVerifier, authenticate, current_user, get_password_hasher, get_token_verifier,
+)
+
+router = APIRouter(tags=["auth"])
+
+
+async def _login(email: str, password: str, hasher: PasswordHasher, verifier: TokenVerifier) -> TokenResponse:
+    user = await authenticate(email, password, hasher)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect email or password",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    token, expires_in = verifier.issue(user)
+    return TokenResponse(access_token=token, expires_in=expires_in)
+
+
+@router.post("/api/auth/login", response_model=TokenResponse)
+async def login(
+        credentials: LoginRequest,
+        hasher: PasswordHasher = Depends(get_password_hasher),
+        verifier: TokenVerifier = Depends(get_token_verifier)
+):
+    """Exchange email and password for a bearer token"""
+    return await _login(credentials.email, credentials.password, hasher, verifier)
+
+
+@router.post("/api/auth/token", response_model=TokenResponse)
+async def login_form(
+        form: OAuth2PasswordRequestForm = Depends(),
+        hasher: PasswordHasher = Depends(get_password_hasher),
+        verifier: TokenVerifier = Depends(get_token_verifier)
+):
+    """OAuth2 password flow (form fields; the username field carries the email), as used by the docs UI"""
+    return await _login(form.username, form.password, hasher, verifier)
+
+
+@router.get("/api/auth/me", response_model=UserResponse)
+async def read_current_user(user: dict = Depends(current_user)):
+    return user
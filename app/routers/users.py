@@ -1,13 +1,31 @@
+from datetime import datetime
 from typing import Optional, List
 
-from fastapi import APIRouter, HTTPException, Path
+from fastapi import APIRouter, Depends, Header, HTTPException, Path, Query, Request, Response
 from fastapi.responses import JSONResponse
 
-from app.db.user_repository import create_user, get_user_by_email, update_user, get_user, get_users, delete_user
-from app.infrastructure.ai_engine import ai_engine
-from app.requests import AIRequest
-from app.requests.user import UserResponseCreation, UserResponse, UserCreate, UserUpdate
-from app.services.s3_service import storage_service
+from app.config.config import settings
+from app.db.company_repository import find_nearby_companies
+from app.db.job_repository import enqueue_job
+from app.db.journey_repository import find_journey
+from app.db.read_routing import PRIMARY
+from app.db.user_repository import append_carbon_journey, set_photo_hashes, update_user, get_user, get_users
+from app.models.carbon_journey import CarbonJourneySummary
+from app.models.raster import RasterMetadata
+from app.requests.carbon_journey import CarbonJourneyAppend, CarbonJourneyHistory
+from app.requests.company import NearbyCompanyResponse
+from app.requests.user import (
+    BatchRegistrationResponse, UserBatchCreate, UserResponseCreation, UserResponse, UserCreate, UserUpdate,
+)
+from app.services.auth_service import PasswordHasher, get_password_hasher
+from app.services.raster_service import inspect_and_record
+from app.services.registration_service import (
+    StageTimings, UserAlreadyExists, register_user as register_user_pipeline, register_users_batch,
+)
+from app.services.s3_service import StorageService, get_storage_service, VALID_IMAGE_TYPES
+from app.utils.Enums import JourneyIntervalEnum, PhotoFieldEnum
+from app.utils.etags import VERSION_FIELDS, entity_tag, if_match, if_none_match
+from app.utils.projection import FieldSelection, project, response_fields
 
 router = APIRouter(tags=["users"])
 
@@ -15,143 +33,342 @@ router = APIRouter(tags=["users"])
 # Make sure we have both prefixes covered
 @router.post("/api/users/register", response_model=UserResponseCreation)
 async def register_user(
-        user: UserCreate
+        user: UserCreate,
+        response: Response,
+        storage_service: StorageService = Depends(get_storage_service),
+        password_hasher: PasswordHasher = Depends(get_password_hasher)
 ):
+    timings = StageTimings()
     try:
-        existing_user = await get_user_by_email(user.email)
-
-        if existing_user:
-            return JSONResponse(
-                status_code=400,
-                content={
-                    "status": "error",
-                    "message": "User already exists"
-                }
-            )
-
-        user_dict = UserCreate(
-            email=user.email,
-            username=user.username,
-            avatar_url=user.avatar_url,
+        # Staged pipeline with per-stage timings, see app/services/registration_service.py
+        created = await register_user_pipeline(user, storage_service, timings, password_hasher)
+        response.headers["Server-Timing"] = timings.server_timing()
+        return created
+
+    except UserAlreadyExists:
+        return JSONResponse(
+            status_code=400,
+            content={
+                "status": "error",
+                "message": "User already exists"
+            },
+            headers={"Server-Timing": timings.server_timing()}
         )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Registration failed: {str(e)}")
 
-        # Create user
-        created_user = await create_user(user_dict)
 
-        # Generate signed URLs for photo uploads and thread_ID
-        try:
-            signed_urls = await storage_service.generate_signed_urls(str(created_user["id"]), user.ground_photo_content_type, user.aerial_photo_content_type)
-            thread_id = await ai_engine.send_message(AIRequest(
-                user_id=str(created_user["id"]),
-                aerial_key=signed_urls.aerial_photo_key,
-                ground_key=signed_urls.ground_photo_key
-            ))
+@router.post("/api/users/register/batch", response_model=BatchRegistrationResponse)
+async def register_users(
+        batch: UserBatchCreate,
+        storage_service: StorageService = Depends(get_storage_service),
+        password_hasher: PasswordHasher = Depends(get_password_hasher)
+):
+    """
+    Register several users at once (e.g. a whole village from one field agent).
+    Every user gets its own result; failed users are rolled back individually.
+    """
+    try:
+        return await register_users_batch(batch.users, storage_service, password_hasher)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Batch registration failed: {str(e)}")
 
-            await update_user(created_user["id"], UserUpdate(verification_thread_id=thread_id))
 
-            return UserResponseCreation(
-                id=str(created_user["id"]),
-                email=created_user["email"],
-                name=created_user["username"],
-                created_at=str(created_user["created_at"]),
-                upload_urls=signed_urls
-            )
+@router.get("/api/users", response_model=List[UserResponse])
+@router.get("/users/", response_model=List[UserResponse])
+async def read_users(skip: int = 0, limit: int = 100, selection: FieldSelection = Depends(response_fields)):
+    users = await get_users(skip=skip, limit=limit, fields=selection.fields, route="users.list")
+    return selection.respond(users)
 
 
+@router.get("/api/users/{user_id}", response_model=UserResponse)
+@router.get("/users/{user_id}", response_model=UserResponse)
+async def read_user(
+        user_id: str,
+        response: Response,
+        selection: FieldSelection = Depends(response_fields),
+        if_none_match_header: Optional[str] = Header(None, alias="If-None-Match")
+):
+    variant = ",".join(selection.fields) if selection.partial else None
+    if if_none_match_header:
+        # Revalidation only needs the version fields, not the document
+        current = await get_user(user_id, fields=VERSION_FIELDS, route="users.read")
+        if current is None:
+            raise HTTPException(status_code=404, detail="User not found")
+        etag = entity_tag(current, variant)
+        if if_none_match(if_none_match_header, etag):
+            return Response(status_code=304, headers={"ETag": etag})
 
-        except Exception as e:
-            # Cleanup on failure
-            await delete_user(created_user["id"])
-            raise HTTPException(status_code=500, detail=f"Failed to generate upload URLs: {str(e)}")
+    fields = tuple(dict.fromkeys(selection.fields + VERSION_FIELDS)) if selection.fields else None
+    db_user = await get_user(user_id, fields=fields, route="users.read")
+    if db_user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    response.headers["ETag"] = entity_tag(db_user, variant)
+    return selection.respond(project(db_user, selection.fields), response)
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Registration failed: {str(e)}")
 
+@router.get("/api/users/{user_id}/nearby-companies", response_model=List[NearbyCompanyResponse])
+async def read_nearby_companies(
+        user_id: str,
+        max_distance_km: float = Query(settings.NEARBY_COMPANIES_MAX_DISTANCE_KM, gt=0),
+        limit: int = Query(20, ge=1, le=settings.NEARBY_COMPANIES_MAX_LIMIT),
+        match_score: bool = Query(True, description="Only companies whose score range accepts the user's carbon score"),
+        status: Optional[str] = Query("Active", description="Company status to match; empty for any"),
+        selection: FieldSelection = Depends(response_fields)
+):
+    """Companies closest to the user's farm first, from the companies' 2dsphere index"""
+    user = await get_user(user_id, fields=("geo", "carbon_score"))
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    if not user.get("geo"):
+        raise HTTPException(status_code=409, detail="User has no location; set geo first")
 
+    companies = await find_nearby_companies(
+        user["geo"],
+        max_distance_km,
+        limit,
+        score=user.get("carbon_score", 0) if match_score else None,
+        status=status,
+        fields=selection.fields,
+        route="companies.nearby"
+    )
+    return selection.respond(companies)
 
-@router.get("/api/users", response_model=List[UserResponse])
-@router.get("/users/", response_model=List[UserResponse])
-async def read_users(skip: int = 0, limit: int = 100):
-    users = get_users(skip=skip, limit=limit)
-    return users
 
+@router.get("/api/users/{user_id}/carbon-journey", response_model=CarbonJourneyHistory)
+async def read_carbon_journey(
+        user_id: str,
+        start: Optional[datetime] = Query(None, description="First timestamp included (ISO 8601)"),
+        end: Optional[datetime] = Query(None, description="First timestamp excluded (ISO 8601)"),
+        interval: JourneyIntervalEnum = Query(JourneyIntervalEnum.RAW, description="Every entry, or one point per bucket"),
+        limit: int = Query(settings.JOURNEY_MAX_POINTS, ge=1, le=settings.JOURNEY_MAX_POINTS)
+):
+    """The user's carbon journey in [start, end), oldest first, from the time-series collection"""
+    if start and end and start >= end:
+        raise HTTPException(status_code=422, detail="start must be before end")
+    user = await get_user(user_id, fields=("carbon_summary",))
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
 
-@router.get("/api/users/{user_id}", response_model=UserResponse)
-@router.get("/users/{user_id}", response_model=UserResponse)
-async def read_user(user_id: str):
-    db_user = get_user(user_id)
-    if db_user is None:
+    points, truncated = await find_journey(user_id, start, end, interval.value, limit, route="journey.history")
+    return {
+        "user_id": user_id,
+        "interval": interval.value,
+        "start": start,
+        "end": end,
+        "points": points,
+        "truncated": truncated,
+        "summary": user.get("carbon_summary"),
+    }
+
+
+@router.post("/api/users/{user_id}/carbon-journey", response_model=CarbonJourneySummary)
+async def append_user_carbon_journey(user_id: str, journey: CarbonJourneyAppend):
+    """Record journey entries; returns the user's updated summary"""
+    if await get_user(user_id, fields=("id",)) is None:
         raise HTTPException(status_code=404, detail="User not found")
-    return db_user
+    return await append_carbon_journey(user_id, [entry.model_dump() for entry in journey.entries])
 
 
 @router.put("/api/users/{user_id}", response_model=UserResponse)
 @router.put("/users/{user_id}", response_model=UserResponse)
 async def update_user_endpoint(
+        response: Response,
         user_id: str = Path(..., title="The ID of the user to update"),
-        user_data: UserUpdate = None
+        user_data: UserUpdate = None,
+        if_match_header: Optional[str] = Header(None, alias="If-Match")
 ):
     """
     Update a user's information.
     This can be used to update any user fields, including photo URLs.
+    Send the ETag from a previous GET as If-Match to only update an unchanged user.
     """
     try:
         # Check if the user exists
-        existing_user = get_user(user_id)
+        # From the primary: If-Match must be checked against the latest version
+        existing_user = await get_user(user_id, fields=VERSION_FIELDS, route=PRIMARY)
         if not existing_user:
             raise HTTPException(status_code=404, detail="User not found")
 
+        expected_version = None
+        if if_match_header is not None and if_match_header.strip() != "*":
+            if not if_match(if_match_header, entity_tag(existing_user)):
+                raise HTTPException(status_code=412, detail="User was modified by another request")
+            expected_version = existing_user
+
         # Update the user
-        updated_user = update_user(user_id, user_data)
+        updated_user = await update_user(user_id, user_data or UserUpdate(), expected_version=expected_version)
 
         # Return the updated user
-        return UserResponse(
-            id=updated_user.id,
-            email=updated_user.email,
-            username=updated_user.username,
-            ground_photo=updated_user.ground_photo,
-            aerial_photo=updated_user.aerial_photo,
-            is_verified=updated_user.is_verified,
-            created_at=updated_user.created_at
-        )
+        response.headers["ETag"] = entity_tag(updated_user)
+        return updated_user
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Update failed: {str(e)}")
 
 
 @router.put("/api/users/{user_id}/photos", response_model=UserResponse)
 async def update_user_photos(
+        response: Response,
         user_id: str = Path(..., title="The ID of the user to update"),
         ground_photo: Optional[str] = None,
-        aerial_photo: Optional[str] = None
+        aerial_photo: Optional[str] = None,
+        selection: FieldSelection = Depends(response_fields),
+        if_match_header: Optional[str] = Header(None, alias="If-Match")
 ):
     """
     Update a user's photos.
-    This endpoint is specifically for updating photos after upload.
+    This endpoint is specifically for updating photos after upload; photos not given are left as they are.
+    Send the ETag from a previous GET as If-Match to only update an unchanged user.
     """
     try:
-        # Check if the user exists
-        existing_user = get_user(user_id)
+        # From the primary: If-Match must be checked against the latest version
+        existing_user = await get_user(user_id, fields=VERSION_FIELDS, route=PRIMARY)
         if not existing_user:
             raise HTTPException(status_code=404, detail="User not found")
 
-        # Create update data with only the photo fields
-        update_data = UserUpdate(
-            ground_photo=ground_photo,
-            aerial_photo=aerial_photo
-        )
+        expected_version = None
+        if if_match_header is not None and if_match_header.strip() != "*":
+            if not if_match(if_match_header, entity_tag(existing_user)):
+                raise HTTPException(status_code=412, detail="User was modified by another request")
+            expected_version = existing_user
 
-        # Update the user
-        updated_user = update_user(user_id, update_data)
+        # Only the photo fields that were given
+        photos = {"ground_photo": ground_photo, "aerial_photo": aerial_photo}
+        update_data = UserUpdate(**{field: key for field, key in photos.items() if key is not None})
 
-        # Return the updated user
-        return UserResponse(
-            id=updated_user.id,
-            email=updated_user.email,
-            username=updated_user.username,
-            ground_photo=updated_user.ground_photo,
-            aerial_photo=updated_user.aerial_photo,
-            is_verified=updated_user.is_verified,
-            created_at=updated_user.created_at
-        )
+        updated_user = await update_user(user_id, update_data, expected_version=expected_version)
+
+        response.headers["ETag"] = entity_tag(updated_user)
+        return selection.respond(updated_user, response)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Photo update failed: {str(e)}")
+
+
+@router.put("/api/users/{user_id}/photos/{photo_field}/upload")
+async def upload_user_photo(
+        request: Request,
+        user_id: str = Path(..., title="The ID of the user the photo belongs to"),
+        photo_field: PhotoFieldEnum = Path(..., title="Which photo is being uploaded"),
+        storage_service: StorageService = Depends(get_storage_service)
+):
+    """
+    Proxy upload for clients that cannot use the presigned URLs.
+    The raw request body is streamed to S3 in multipart chunks, never buffered whole,
+    and stored under the same key the presigned URL would have used.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type not in VALID_IMAGE_TYPES:
+        raise HTTPException(status_code=415, detail=f"Unsupported content type: {content_type or 'missing'}")
+
+    existing_user = await get_user(user_id)
+    if not existing_user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    key = f"{photo_field.value}-{user_id}"
+    try:
+        uploaded = await storage_service.upload_stream(key, request.stream(), content_type)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
+
+    # Hashed on the way through; dispatch compares it with earlier verified uploads without rereading
+    await set_photo_hashes(user_id, {photo_field.value: {
+        "sha256": uploaded["sha256"], "etag": uploaded["etag"], "size": uploaded["size"]
+    }})
+    if photo_field == PhotoFieldEnum.AERIAL_PHOTO:
+        # Checked now, so a bad aerial photo never reaches a verification run
+        metadata = await _inspect_aerial_photo(user_id, key, storage_service)
+        uploaded["aerial_metadata"] = metadata.model_dump(mode="json")
+        existing_user = dict(existing_user, aerial_photo=key)
+    else:
+        await update_user(user_id, UserUpdate(**{photo_field.value: key}))
+        existing_user = dict(existing_user, ground_photo=key)
+    uploaded["previews_job_id"] = await _enqueue_previews(user_id, photo_field, key)
+    # Only behind a valid aerial photo; the ground photo may still be on its way
+    if photo_field == PhotoFieldEnum.AERIAL_PHOTO or (existing_user.get("aerial_metadata") or {}).get("valid"):
+        uploaded["verification_job_id"] = await _enqueue_verification(existing_user, storage_service)
+    return uploaded
+
+
+async def _enqueue_previews(user_id: str, photo_field: PhotoFieldEnum, key: str) -> str:
+    """Thumbnails and the tile pyramid are rendered by a job worker, see app/services/preview_service.py"""
+    return await enqueue_job("previews", {"user_id": user_id, "photo_field": photo_field.value, "key": key})
+
+
+async def _enqueue_verification(user: dict, storage_service: StorageService) -> str:
+    """
+    The LangGraph run is started by a job worker, see app/jobs/handlers.py; once
+    per user, so the uploads and the metadata call can all ask for it
+    """
+    ground_key, aerial_key = storage_service.upload_keys(user["id"])
+    return await enqueue_job("ai_dispatch", {
+        "user_id": user["id"],
+        "aerial_key": user.get("aerial_photo") or aerial_key,
+        "ground_key": user.get("ground_photo") or ground_key,
+    }, dedupe_key=f"ai_dispatch:{user['id']}")
+
+
+async def _inspect_aerial_photo(user_id: str, key: str, storage_service: StorageService) -> RasterMetadata:
+    try:
+        metadata = await inspect_and_record(user_id, key, storage_service)
+    except FileNotFoundError:
+        raise HTTPException(status_code=409, detail="Aerial photo has not been uploaded yet")
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Aerial photo inspection failed: {str(e)}")
+    if not metadata.valid:
+        raise HTTPException(status_code=422, detail=f"Invalid aerial photo: {metadata.error}")
+    return metadata
+
+
+@router.post("/api/users/{user_id}/photos/aerial_photo/metadata", response_model=RasterMetadata)
+async def inspect_user_aerial_photo(
+        user_id: str = Path(..., title="The ID of the user whose aerial photo was uploaded"),
+        storage_service: StorageService = Depends(get_storage_service)
+):
+    """
+    Call after uploading the aerial photo to its presigned URL. Reads only the
+    GeoTIFF header from S3 (ranged GETs), stores dimensions, bands, CRS and
+    bounds on the user as aerial_metadata, and answers 422 if the file is not
+    a georeferenced GeoTIFF. Verification is only started for a valid one.
+    """
+    existing_user = await get_user(user_id, fields=("ground_photo", "aerial_photo"))
+    if not existing_user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    _, aerial_key = storage_service.upload_keys(user_id)
+    key = existing_user.get("aerial_photo") or aerial_key
+    metadata = await _inspect_aerial_photo(user_id, key, storage_service)
+    await _enqueue_previews(user_id, PhotoFieldEnum.AERIAL_PHOTO, key)
+    await _enqueue_verification(existing_user, storage_service)
+    return metadata
+
+
+@router.post("/api/users/{user_id}/photos/{photo_field}/previews", status_code=202)
+async def render_user_photo_previews(
+        user_id: str = Path(..., title="The ID of the user the photo belongs to"),
+        photo_field: PhotoFieldEnum = Path(..., title="Which photo to render previews of"),
+        storage_service: StorageService = Depends(get_storage_service)
+):
+    """
+    (Re)render a photo's thumbnail, preview and tile pyramid in the background,
+    e.g. after a ground photo was uploaded to its presigned URL. The result is
+    stored on the user as <photo_field>_previews.
+    """
+    existing_user = await get_user(user_id, fields=(photo_field.value,))
+    if not existing_user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    ground_key, aerial_key = storage_service.upload_keys(user_id)
+    default_key = ground_key if photo_field == PhotoFieldEnum.GROUND_PHOTO else aerial_key
+    return {"job_id": await _enqueue_previews(user_id, photo_field, existing_user.get(photo_field.value) or default_key)}
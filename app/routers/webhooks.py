@@ -1,6 +1,4 @@
 from fastapi import APIRouter, HTTPException, Depends, status
-import os
-from sqlalchemy.orm import Session
 from app.requests.S3 import S3Callback
 
 
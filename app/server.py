@@ -0,0 +1,116 @@
+# Production launcher: python -m app.server
+import importlib.util
+import logging
+import os
+import signal
+import sys
+import threading
+
+import uvicorn
+from dotenv import load_dotenv
+from uvicorn.supervisors import Multiprocess
+
+from app.utils.readiness import readiness
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("server")
+
+
+class DrainingServer(uvicorn.Server):
+    """
+    On SIGTERM the worker first reports draining on /ready (503) and keeps
+    serving for `drain_seconds`, so load balancers take it out of rotation
+    before uvicorn stops accepting connections. SIGINT, or a second signal,
+    shuts down at once.
+    """
+
+    def __init__(self, config: uvicorn.Config, drain_seconds: float):
+        super().__init__(config)
+        self.drain_seconds = drain_seconds
+        self._drain_timer = None
+
+    def handle_exit(self, sig, frame):
+        readiness.draining = True
+        if sig != signal.SIGTERM or self._drain_timer is not None or self.drain_seconds <= 0 or not self.started:
+            super().handle_exit(sig, frame)
+            return
+        logger.info(f"🛑 Draining: /ready reports 503 for {self.drain_seconds}s before shutting down")
+        # A timer thread: the handler may run inside a signal handler, outside the event loop
+        self._drain_timer = threading.Timer(self.drain_seconds, super().handle_exit, (sig, frame))
+        self._drain_timer.daemon = True
+        self._drain_timer.start()
+
+
+def worker_count() -> int:
+    """WEB_CONCURRENCY if set, otherwise one worker per CPU available to this process"""
+    configured = os.getenv("WEB_CONCURRENCY")
+    if configured:
+        return max(int(configured), 1)
+    try:
+        # Honours cgroup/taskset CPU pinning, unlike os.cpu_count()
+        return max(len(os.sched_getaffinity(0)), 1)
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def event_loop() -> str:
+    return "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+
+
+def http_protocol() -> str:
+    return "httptools" if importlib.util.find_spec("httptools") else "h11"
+
+
+def main():
+    load_dotenv()
+
+    host = os.getenv("HOST", "0.0.0.0")
+    port = int(os.getenv("PORT", "8000"))
+    workers = worker_count()
+    loop = event_loop()
+    http = http_protocol()
+    # Seconds a worker keeps serving in-flight requests after SIGTERM before it is cut off
+    graceful_timeout = int(os.getenv("GRACEFUL_SHUTDOWN_TIMEOUT", "30"))
+    # Seconds /ready reports draining, with traffic still served, before that shutdown starts
+    drain_seconds = float(os.getenv("READINESS_DRAIN_SECONDS", "5"))
+
+    if workers > 1 and not os.getenv("JWT_SECRET_KEY"):
+        # Each worker would sign with its own random key and reject the others' tokens
+        logger.error(f"JWT_SECRET_KEY must be set to run {workers} workers; set it or WEB_CONCURRENCY=1")
+        raise SystemExit(1)
+
+    logger.info(f"🚀 Starting {workers} worker(s) on {host}:{port} (loop={loop}, http={http})")
+
+    # Each worker runs the app's startup (connections, route warm-up) before it
+    # accepts connections. On SIGTERM it reports draining for drain_seconds, then
+    # uvicorn stops accepting, lets in-flight requests finish within the graceful
+    # timeout, and runs shutdown.
+    config = uvicorn.Config(
+        "app.main:app",
+        host=host,
+        port=port,
+        workers=workers,
+        loop=loop,
+        http=http,
+        reload=False,
+        proxy_headers=True,
+        forwarded_allow_ips=os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1"),
+        timeout_keep_alive=int(os.getenv("KEEP_ALIVE_TIMEOUT", "5")),
+        timeout_graceful_shutdown=graceful_timeout,
+        access_log=os.getenv("ACCESS_LOG", "false").lower() == "true",
+    )
+    # What uvicorn.run does, with DrainingServer as the server of each worker
+    server = DrainingServer(config, drain_seconds)
+    if workers > 1:
+        Multiprocess(config, target=server.run, sockets=[config.bind_socket()]).run()
+    else:
+        server.run()
+        if not server.started:
+            sys.exit(3)  # uvicorn's startup failure code
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+import asyncio
+import logging
+import secrets
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import Depends, HTTPException, status
+from fastapi.security import OAuth2PasswordBearer
+from jose import JWTError, jwt
+from passlib.context import CryptContext
+
+from app.config.config import settings
+from app.db.user_repository import get_user, get_user_by_email
+from app.utils.cache import TTLCache
+from app.utils.metrics import registry, track_dependency
+
+logger = logging.getLogger("auth")
+
+AUTH_LOGINS = registry.counter("auth_logins_total", "Login attempts by outcome (success/failure)", ("outcome",))
+PASSWORD_HASH_REJECTIONS = registry.counter(
+    "password_hash_rejections_total", "bcrypt calls refused because too many were already waiting"
+)
+
+# Password handling
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.PASSWORD_BCRYPT_ROUNDS)
+
+# Swagger's Authorize button posts the form here
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/token")
+
+
+def _unauthorized() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid or expired token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+# Module level so a process pool can pickle them by reference
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify(password: str, hashed: str) -> bool:
+    return pwd_context.verify(password, hashed)
+
+
+class PasswordHasher:
+    """
+    bcrypt off the event loop. A hash takes a few hundred milliseconds of CPU,
+    so it runs in a bounded pool: threads by default (bcrypt releases the GIL)
+    or processes. Calls beyond `max_pending` are refused with 503 rather than
+    queued, so a login storm cannot build an unbounded backlog.
+    """
+
+    def __init__(self, workers: int = settings.PASSWORD_HASH_WORKERS,
+                 executor: str = settings.PASSWORD_HASH_EXECUTOR,
+                 max_pending: int = settings.PASSWORD_HASH_MAX_PENDING):
+        self.workers = max(workers, 1)
+        self.max_pending = max_pending
+        self.pending = 0
+        self._executor: Executor = (
+            ProcessPoolExecutor(self.workers) if executor == "process"
+            else ThreadPoolExecutor(self.workers, thread_name_prefix="bcrypt")
+        )
+        self._dummy_hash: Optional[str] = None
+
+    async def _run(self, operation: str, func, *args):
+        if self.pending >= self.max_pending:
+            PASSWORD_HASH_REJECTIONS.inc()
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many logins in progress, retry later",
+                headers={"Retry-After": "1"},
+            )
+        self.pending += 1
+        try:
+            with track_dependency("bcrypt", operation):
+                return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", _hash, password)
+
+    async def hash_many(self, passwords: List[Optional[str]]) -> List[Optional[str]]:
+        """Hash a batch at most `workers` at a time; None stays None"""
+        semaphore = asyncio.Semaphore(self.workers)
+
+        async def one(password: Optional[str]) -> Optional[str]:
+            if password is None:
+                return None
+            async with semaphore:
+                return await self.hash(password)
+
+        return list(await asyncio.gather(*(one(password) for password in passwords)))
+
+    async def verify(self, password: str, hashed: Optional[str]) -> bool:
+        """Without a stored hash a dummy one is checked, so unknown emails take as long as wrong passwords"""
+        if hashed is None:
+            if self._dummy_hash is None:
+                self._dummy_hash = await self.hash(secrets.token_urlsafe(16))
+            await self._run("verify", _verify, password, self._dummy_hash)
+            return False
+        return await self._run("verify", _verify, password, hashed)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+class TokenVerifier:
+    """
+    Issues and verifies access tokens. A verified token's claims are cached
+    until the token expires, so repeat requests skip the signature check and
+    cost a dictionary lookup. Tokens that fail verification are never cached.
+    """
+
+    def __init__(self, secret_key: str, algorithm: str = settings.JWT_ALGORITHM,
+                 expire_minutes: int = settings.ACCESS_TOKEN_EXPIRE_MINUTES, cache: Optional[TTLCache] = None):
+        self.secret_key = secret_key
+        self.algorithm = algorithm
+        self.expire_minutes = expire_minutes
+        self.cache = cache
+
+    def issue(self, user: dict) -> Tuple[str, int]:
+        """Signed token for a user document; returns (token, seconds until it expires)"""
+        expires_in = self.expire_minutes * 60
+        claims = {
+            "sub": user["id"],
+            "email": user.get("email"),
+            "exp": datetime.utcnow() + timedelta(seconds=expires_in),
+        }
+        return jwt.encode(claims, self.secret_key, algorithm=self.algorithm), expires_in
+
+    def verify(self, token: str) -> Dict:
+        if self.cache is not None:
+            claims = self.cache.get(token)
+            if claims is not None:
+                return claims
+        try:
+            claims = jwt.decode(token, self.secret_key, algorithms=[self.algorithm], options={"require_exp": True})
+        except JWTError:
+            raise _unauthorized()
+        if self.cache is not None:
+            remaining = claims["exp"] - time.time()
+            if remaining > 0:
+                self.cache.set(token, claims, ttl=remaining)
+        return claims
+
+
+@lru_cache(maxsize=None)
+def _password_hasher() -> PasswordHasher:
+    return PasswordHasher()
+
+
+@lru_cache(maxsize=None)
+def _token_verifier() -> TokenVerifier:
+    secret_key = settings.JWT_SECRET_KEY
+    if not secret_key:
+        logger.warning("JWT_SECRET_KEY is not set; tokens are signed with a random per-process key")
+        secret_key = secrets.token_urlsafe(32)
+    cache = TTLCache("token", settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60, settings.TOKEN_CACHE_MAX_ENTRIES)
+    return TokenVerifier(secret_key, cache=cache)
+
+
+# async dependencies run on the event loop: no threadpool hop per request, and no
+# race between threads building two instances (two random keys) on the first burst
+async def get_password_hasher() -> PasswordHasher:
+    """FastAPI dependency returning the shared PasswordHasher"""
+    return _password_hasher()
+
+
+async def get_token_verifier() -> TokenVerifier:
+    """FastAPI dependency returning the shared TokenVerifier"""
+    return _token_verifier()
+
+
+async def authenticate(email: str, password: str, hasher: PasswordHasher) -> Optional[dict]:
+    """The user with this email and password, or None; inactive users cannot log in"""
+    user = await get_user_by_email(email, fields=("email", "hashed_password", "is_active"))
+    hashed = user.get("hashed_password") if user else None
+    if not await hasher.verify(password, hashed) or not user.get("is_active", True):
+        AUTH_LOGINS.labels("failure").inc()
+        return None
+    AUTH_LOGINS.labels("success").inc()
+    return user
+
+
+async def token_claims(token: str = Depends(oauth2_scheme),
+                       verifier: TokenVerifier = Depends(get_token_verifier)) -> Dict:
+    """Dependency for endpoints that only need the caller's identity: no database access"""
+    return verifier.verify(token)
+
+
+async def current_user(claims: Dict = Depends(token_claims)) -> dict:
+    """Dependency resolving the caller's user document; 401 if it was deleted or deactivated"""
+    user = await get_user(claims["sub"])
+    if user is None or not user.get("is_active", True):
+        raise _unauthorized()
+    return user
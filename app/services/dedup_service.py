@@ -0,0 +1,103 @@
+import asyncio
+import logging
+from typing import Dict, Optional
+
+from app.db.user_repository import get_user, set_photo_hashes, update_user
+from app.db.verification_repository import (
+    find_photo_owner, find_verified_upload, mark_reused, record_verified_upload, save_reused_result,
+)
+from app.models.verification import FraudReview
+from app.requests.ai import AIResponse
+from app.requests.user import InternalUserUpdate, UserUpdate
+from app.services.s3_service import StorageService
+from app.utils.Enums import VerificationStatusEnum
+from app.utils.metrics import registry
+
+logger = logging.getLogger("dedup")
+
+VERIFICATION_DEDUP = registry.counter(
+    "verification_dedup_total",
+    "Verification dispatches checked against earlier results, by outcome (new/reused/reused_photo)",
+    ("outcome",),
+)
+
+PHOTO_FIELDS = ("ground_photo", "aerial_photo")
+
+
+async def hash_user_photos(user_id: str, keys: Dict[str, str], storage_service: StorageService) -> Dict[str, dict]:
+    """
+    Content hashes of a user's photos (photo field -> {sha256, etag, size}).
+    Hashes already recorded on the user are reused while the object's ETag
+    is unchanged; new ones are recorded.
+    """
+    user = await get_user(user_id, fields=("photo_hashes",)) or {}
+    known = user.get("photo_hashes") or {}
+    hashes = dict(zip(keys, await asyncio.gather(
+        *(storage_service.content_hash(key, known.get(field)) for field, key in keys.items())
+    )))
+    await set_photo_hashes(user_id, {field: value for field, value in hashes.items() if value != known.get(field)})
+    return hashes
+
+
+async def _flag(user_id: str, review: FraudReview, **updates):
+    logger.warning(f"User {user_id} flagged for review: {review.reason} (matches user {review.matched_user_id})")
+    await update_user(user_id, InternalUserUpdate(fraud_review=review.model_dump(), **updates))
+
+
+async def reuse_verified_result(user_id: str, ground_key: str, aerial_key: str,
+                                storage_service: StorageService) -> Optional[AIResponse]:
+    """
+    Before starting a LangGraph run: if this exact pair of photos was verified
+    already, the earlier AIResponse is stored as this user's result and
+    returned, and no new run is needed. When the earlier verification belonged
+    to someone else the user is flagged for fraud review ("duplicate_submission").
+    A single photo that matches another user's verified upload only flags
+    ("reused_photo"); the run still goes ahead.
+    """
+    hashes = await hash_user_photos(user_id, {"ground_photo": ground_key, "aerial_photo": aerial_key}, storage_service)
+    ground, aerial = hashes["ground_photo"]["sha256"], hashes["aerial_photo"]["sha256"]
+
+    verified = await find_verified_upload(ground, aerial)
+    if verified is not None:
+        result = AIResponse(**dict(verified["result"], user_id=user_id))
+        await save_reused_result(user_id, verified["thread_id"], result.model_dump())
+        await mark_reused(ground, aerial)
+        updates = {"verification_status": VerificationStatusEnum.IN_REVIEW}
+        if verified["user_id"] != user_id:
+            await _flag(user_id, FraudReview(
+                reason="duplicate_submission",
+                matched_user_id=verified["user_id"],
+                matched_thread_id=verified["thread_id"],
+            ), **updates)
+        else:
+            await update_user(user_id, UserUpdate(**updates))
+        VERIFICATION_DEDUP.labels("reused").inc()
+        return result
+
+    for field, sha256 in (("ground", ground), ("aerial", aerial)):
+        owner = await find_photo_owner(sha256, field, user_id)
+        if owner is not None:
+            await _flag(user_id, FraudReview(
+                reason="reused_photo",
+                matched_user_id=owner["user_id"],
+                matched_thread_id=owner["thread_id"],
+                photo_field=f"{field}_photo",
+            ))
+            VERIFICATION_DEDUP.labels("reused_photo").inc()
+            return None
+
+    VERIFICATION_DEDUP.labels("new").inc()
+    return None
+
+
+async def record_verification(user_id: str, thread_id: str, result: AIResponse, storage_service: StorageService):
+    """Index a finished verification by the content hashes of the photos it looked at"""
+    ground_key, aerial_key = storage_service.upload_keys(user_id)
+    user = await get_user(user_id, fields=PHOTO_FIELDS) or {}
+    hashes = await hash_user_photos(user_id, {
+        "ground_photo": user.get("ground_photo") or ground_key,
+        "aerial_photo": user.get("aerial_photo") or aerial_key,
+    }, storage_service)
+    await record_verified_upload(
+        hashes["ground_photo"]["sha256"], hashes["aerial_photo"]["sha256"], user_id, thread_id, result.model_dump()
+    )
@@ -1,9 +1,13 @@
 import os
+from functools import lru_cache
+from typing import Optional
 from dotenv import load_dotenv
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 
+from app.db.job_repository import enqueue_job
+
 load_dotenv()
 
 class EmailService:
@@ -13,6 +17,11 @@ class EmailService:
         self.smtp_user = os.getenv('SMTP_USER')
         self.smtp_pass = os.getenv('SMTP_PASS')
         self.sender_email = os.getenv('EMAIL_FROM')
+
+    @property
+    def configured(self) -> bool:
+        """Without SMTP_HOST no email is sent"""
+        return bool(self.smtp_host)
     
     async def send_signed_urls_email(self, email: str, urls: dict) -> None:
         """
@@ -76,4 +85,14 @@ class EmailService:
             server.login(self.smtp_user, self.smtp_pass)
             server.send_message(message)
 
-email_service = EmailService()
+@lru_cache(maxsize=None)
+def get_email_service() -> EmailService:
+    """FastAPI dependency returning the shared EmailService"""
+    return EmailService()
+
+
+async def enqueue_email(template: str, email: str, dedupe_key: str, **fields) -> Optional[str]:
+    """Send an email from the email job queue (see app/jobs/handlers.py); None if SMTP isn't configured"""
+    if not get_email_service().configured:
+        return None
+    return await enqueue_job("email", {"template": template, "email": email, **fields}, dedupe_key=dedupe_key)
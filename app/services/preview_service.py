@@ -0,0 +1,210 @@
+import asyncio
+import logging
+import math
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Dict, Optional
+
+from app.config.config import settings
+from app.models.raster import PhotoPreviews
+from app.services.s3_service import StorageService
+from app.utils.metrics import registry
+
+logger = logging.getLogger("previews")
+
+PREVIEW_RENDERS = registry.counter(
+    "photo_preview_renders_total", "Preview and tile pyramid renders by outcome", ("outcome",)
+)
+PREVIEW_RENDER_DURATION = registry.histogram(
+    "photo_preview_render_seconds", "Time to download, render and upload one photo's previews", ("stage",)
+)
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def preview_prefix(key: str) -> str:
+    """Where the renditions of the object at `key` are stored"""
+    return f"previews/{key}"
+
+
+def _pick_frame(image, target: int) -> int:
+    """
+    Smallest image in a multi-page TIFF (COG overviews) still at least
+    `target` pixels on its longest side, so only that one is decoded.
+    """
+    full = image.size
+    best, best_size = 0, max(full)
+    for frame in range(1, getattr(image, "n_frames", 1)):
+        image.seek(frame)
+        width, height = image.size
+        # Other pages (masks, unrelated images) don't keep the aspect ratio of a reduced copy
+        if abs(width / full[0] - height / full[1]) > 0.01:
+            continue
+        if target <= max(width, height) < best_size:
+            best, best_size = frame, max(width, height)
+    image.seek(best)
+    return best
+
+
+def _to_rgb(image):
+    """8-bit RGB for JPEG output, stretching 16-bit and float bands to 0-255"""
+    from PIL import Image
+
+    if image.mode in ("I;16", "I;16B", "I;16L", "I", "F"):
+        image = image.convert("F")
+        low, high = image.getextrema()
+        scale = 255.0 / (high - low) if high > low else 0.0
+        image = image.point(lambda value: (value - low) * scale).convert("L")
+    if image.mode in ("RGBA", "LA", "P"):
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        rgba = image.convert("RGBA")
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def render_previews(source: str, output_dir: str, sizes: Dict[str, int], tile_size: int,
+                    pyramid_max_size: int, max_source_pixels: int, quality: int) -> dict:
+    """
+    Render previews and a tile pyramid of the image file `source` into
+    `output_dir`. Runs in a worker process.
+
+    The source is never decoded at full resolution unless it has to be: JPEGs
+    are decoded already downscaled (DCT scaling via draft), tiled TIFFs with
+    overviews decode only the smallest overview big enough, and everything is
+    reduced to at most `pyramid_max_size` pixels before the pyramid is cut.
+    ValueError if the file isn't an image Pillow can read.
+    """
+    from PIL import Image
+
+    Image.MAX_IMAGE_PIXELS = max_source_pixels
+    try:
+        with Image.open(source) as image:
+            source_width, source_height = image.size
+            # Previews are cut from the top pyramid level, so nothing needs more detail than that
+            top = min(pyramid_max_size, max(source_width, source_height))
+            if image.format == "JPEG":
+                image.draft("RGB", (top, top))
+            elif image.format == "TIFF":
+                _pick_frame(image, top)
+            image.thumbnail((top, top), Image.LANCZOS, reducing_gap=3.0)
+            working = _to_rgb(image)
+    except (OSError, SyntaxError, Image.DecompressionBombError) as e:
+        # Unidentified, truncated or unsupported (e.g. more bands than Pillow handles) image data
+        raise ValueError(f"Cannot render previews: {str(e).replace(source, 'the upload')}")
+
+    rendered = _write_renditions(working, output_dir, sizes, tile_size, quality)
+    rendered.update(source_width=source_width, source_height=source_height)
+    return rendered
+
+
+def _write_renditions(working, output_dir: str, sizes: Dict[str, int], tile_size: int, quality: int) -> dict:
+    """Save the named previews and the tile pyramid of an already reduced RGB image"""
+    from PIL import Image
+
+    written = {}
+    for name, size in sizes.items():
+        preview = working.copy()
+        preview.thumbnail((size, size), Image.LANCZOS)
+        written[name] = f"{name}.jpg"
+        preview.save(os.path.join(output_dir, written[name]), "JPEG", quality=quality, optimize=True)
+
+    # Most detailed level first; each level below halves it until it fits one tile
+    levels = max(math.ceil(math.log2(max(working.size) / tile_size)), 0) + 1
+    width, height = working.size
+    tiles = []
+    level_image = working
+    for level in range(levels - 1, -1, -1):
+        for column in range(math.ceil(level_image.width / tile_size)):
+            for row in range(math.ceil(level_image.height / tile_size)):
+                box = (column * tile_size, row * tile_size,
+                       min((column + 1) * tile_size, level_image.width),
+                       min((row + 1) * tile_size, level_image.height))
+                path = os.path.join("tiles", str(level), str(column), f"{row}.jpg")
+                os.makedirs(os.path.join(output_dir, os.path.dirname(path)), exist_ok=True)
+                level_image.crop(box).save(os.path.join(output_dir, path), "JPEG", quality=quality)
+                tiles.append(path)
+        if level:
+            level_image = level_image.reduce(2)
+
+    return {
+        "previews": written,
+        "tiles": tiles,
+        "levels": levels,
+        "width": width,
+        "height": height,
+    }
+
+
+def _preview_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=settings.PREVIEW_WORKERS)
+    return _executor
+
+
+def shutdown_preview_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+async def generate_previews(storage_service: StorageService, key: str) -> PhotoPreviews:
+    """
+    Download the object at `key` to a temporary file (streamed, never held
+    in memory), render its previews and tile pyramid in the process pool and
+    upload them under preview_prefix(key). ValueError if it isn't a usable
+    image, FileNotFoundError if nothing was uploaded.
+    """
+    prefix = preview_prefix(key)
+    outcome = "error"
+    try:
+        with tempfile.TemporaryDirectory(prefix="previews-") as workdir:
+            source = os.path.join(workdir, "source")
+            output_dir = os.path.join(workdir, "out")
+            os.makedirs(output_dir)
+
+            start = time.perf_counter()
+            await storage_service.download_to_file(key, source)
+            PREVIEW_RENDER_DURATION.labels("download").observe(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            try:
+                rendered = await asyncio.get_running_loop().run_in_executor(_preview_executor(), partial(
+                    render_previews, source, output_dir, dict(settings.PREVIEW_SIZES), settings.PREVIEW_TILE_SIZE,
+                    settings.PREVIEW_PYRAMID_MAX_SIZE, settings.PREVIEW_MAX_SOURCE_PIXELS,
+                    settings.PREVIEW_JPEG_QUALITY,
+                ))
+            except ValueError:
+                outcome = "invalid"
+                raise
+            finally:
+                PREVIEW_RENDER_DURATION.labels("render").observe(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            files = list(rendered["previews"].values()) + rendered["tiles"]
+            await storage_service.upload_files(
+                [(os.path.join(output_dir, path), f"{prefix}/{path.replace(os.sep, '/')}", "image/jpeg")
+                 for path in files],
+                concurrency=settings.PREVIEW_UPLOAD_CONCURRENCY,
+            )
+            PREVIEW_RENDER_DURATION.labels("upload").observe(time.perf_counter() - start)
+        outcome = "success"
+    finally:
+        PREVIEW_RENDERS.labels(outcome).inc()
+
+    logger.info(f"Rendered {len(files)} previews and tiles for {key}")
+    return PhotoPreviews(
+        previews={name: f"{prefix}/{path}" for name, path in rendered["previews"].items()},
+        tiles=f"{prefix}/tiles",
+        tile_size=settings.PREVIEW_TILE_SIZE,
+        levels=rendered["levels"],
+        width=rendered["width"],
+        height=rendered["height"],
+        source_width=rendered["source_width"],
+        source_height=rendered["source_height"],
+    )
@@ -0,0 +1,71 @@
+import logging
+from functools import partial
+
+from app.config.config import settings
+from app.db.user_repository import update_user
+from app.models.raster import RasterMetadata
+from app.requests.user import InternalUserUpdate
+from app.services.s3_service import StorageService
+from app.utils.geotiff import InvalidGeoTIFF, RangeReader, read_geotiff
+from app.utils.metrics import registry
+
+logger = logging.getLogger("raster")
+
+RASTER_INSPECTIONS = registry.counter(
+    "raster_inspections_total", "Aerial photo header inspections by outcome (valid/invalid)", ("outcome",)
+)
+RASTER_INSPECTION_BYTES = registry.counter(
+    "raster_inspection_bytes_total", "Bytes fetched from S3 to inspect aerial photo headers"
+)
+
+
+async def inspect_aerial_photo(storage_service: StorageService, key: str) -> RasterMetadata:
+    """
+    Dimensions, bands, CRS and bounds of an uploaded GeoTIFF, read from its
+    header and IFDs with ranged GETs (GEOTIFF_READ_BLOCK_SIZE each, at most
+    GEOTIFF_MAX_RANGE_REQUESTS). A file that isn't an acceptable GeoTIFF
+    gives valid=False with the reason; FileNotFoundError if nothing was uploaded.
+    """
+    reader = RangeReader(
+        partial(storage_service.read_range, key),
+        block_size=settings.GEOTIFF_READ_BLOCK_SIZE,
+        max_requests=settings.GEOTIFF_MAX_RANGE_REQUESTS,
+    )
+    try:
+        info = await read_geotiff(
+            reader, require_georeference=settings.GEOTIFF_REQUIRE_GEOREFERENCE, max_ifds=settings.GEOTIFF_MAX_IFDS
+        )
+        if settings.GEOTIFF_REQUIRE_CRS and info.crs is None:
+            raise InvalidGeoTIFF("GeoTIFF has no EPSG coordinate reference system")
+    except InvalidGeoTIFF as e:
+        logger.info(f"Rejected aerial photo {key}: {e}")
+        metadata = RasterMetadata(valid=False, error=str(e), size=reader.size, bytes_read=reader.bytes_read)
+    else:
+        metadata = RasterMetadata(
+            valid=True,
+            width=info.width,
+            height=info.height,
+            bands=info.bands,
+            bits_per_sample=info.bits_per_sample,
+            compression=info.compression,
+            tile_width=info.tile_width,
+            tile_height=info.tile_height,
+            overviews=len(info.overviews),
+            crs=info.crs,
+            bounds=info.bounds,
+            size=reader.size,
+            bytes_read=reader.bytes_read,
+        )
+    finally:
+        RASTER_INSPECTION_BYTES.inc(reader.bytes_read)
+
+    RASTER_INSPECTIONS.labels("valid" if metadata.valid else "invalid").inc()
+    return metadata
+
+
+async def inspect_and_record(user_id: str, key: str, storage_service: StorageService) -> RasterMetadata:
+    """Inspect the user's aerial photo and store the result as its aerial_metadata"""
+    metadata = await inspect_aerial_photo(storage_service, key)
+    # Dumped whole: update_user drops unset fields, nested defaults like inspected_at included
+    await update_user(user_id, InternalUserUpdate(aerial_photo=key, aerial_metadata=metadata.model_dump()))
+    return metadata
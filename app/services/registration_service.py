@@ -0,0 +1,182 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Dict, List
+
+from bson import ObjectId
+from fastapi import HTTPException
+
+from app.db.user_repository import create_users, delete_users, find_registration_conflict, insert_user
+from app.requests.S3 import SignedUrlsResponse
+from app.requests.user import BatchRegistrationResponse, BatchRegistrationResult, UserCreate, UserResponseCreation
+from app.services.auth_service import PasswordHasher
+from app.services.email_service import enqueue_email
+from app.services.s3_service import StorageService
+from app.utils.metrics import registry
+
+logger = logging.getLogger("registration")
+
+REGISTRATION_STAGE_DURATION = registry.histogram(
+    "registration_stage_duration_seconds",
+    "Time spent in each stage of the registration pipeline",
+    ("stage", "outcome"),
+)
+
+
+class UserAlreadyExists(Exception):
+    def __init__(self, field: str):
+        super().__init__(f"{field} already registered")
+        self.field = field
+
+
+class StageTimings:
+    """Wall time of each pipeline stage, recorded as metrics and for a Server-Timing header"""
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+
+    async def run(self, stage: str, awaitable: Awaitable):
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            result = await awaitable
+            outcome = "success"
+            return result
+        finally:
+            elapsed = time.perf_counter() - start
+            self.stages[stage] = elapsed
+            REGISTRATION_STAGE_DURATION.labels(stage, outcome).observe(elapsed)
+
+    def server_timing(self) -> str:
+        return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in self.stages.items())
+
+
+async def _none():
+    return None
+
+
+async def _enqueue_upload_email(user: dict, signed_urls: SignedUrlsResponse):
+    """The upload links by mail too; a failure only loses the email, the response carries them"""
+    try:
+        await enqueue_email("signed_urls", user["email"], dedupe_key=f"email:signed_urls:{user['id']}", urls={
+            "ground_photo_url": signed_urls.ground_photo_signed_url,
+            "aerial_photo_url": signed_urls.aerial_photo_signed_url,
+        })
+    except Exception as e:
+        logger.error(f"Queueing the upload email of user {user['id']} failed: {e}")
+
+
+async def register_user(
+        user: UserCreate,
+        storage_service: StorageService,
+        timings: StageTimings,
+        password_hasher: PasswordHasher
+) -> UserResponseCreation:
+    """
+    Staged registration. The user id is generated up front, so the steps keyed
+    by it need not wait for the insert:
+
+        check ─────────────────────────────────┬─ insert ─ notify (upload email)
+        presign ───────────────────────────────┤
+        hash (bcrypt, if a password was given) ┘
+
+    Presigning and hashing overlap the duplicate check, and nothing is stored
+    until every step has succeeded, so there is nothing to roll back. The
+    upload links are also queued as an email. The photos don't exist yet:
+    verification is started by the ai_dispatch job their upload enqueues, not here.
+    """
+    user_id = ObjectId()
+    presign = asyncio.ensure_future(timings.run("presign", storage_service.generate_signed_urls(
+        str(user_id), user.ground_photo_content_type, user.aerial_photo_content_type
+    )))
+    hashing = asyncio.ensure_future(
+        timings.run("hash", password_hasher.hash(user.password)) if user.password else _none()
+    )
+
+    try:
+        conflict = await timings.run("check", find_registration_conflict(user.email, user.username))
+        if conflict:
+            raise UserAlreadyExists(conflict)
+    except BaseException:
+        presign.cancel()
+        hashing.cancel()
+        await asyncio.gather(presign, hashing, return_exceptions=True)
+        raise
+
+    signed_urls, hashed_password = await asyncio.gather(presign, hashing, return_exceptions=True)
+    if isinstance(signed_urls, BaseException):
+        raise HTTPException(status_code=500, detail=f"Failed to generate upload URLs: {str(signed_urls)}")
+    if isinstance(hashed_password, HTTPException):
+        # The hashing pool is saturated (503)
+        raise hashed_password
+    if isinstance(hashed_password, BaseException):
+        raise HTTPException(status_code=500, detail=f"Failed to hash password: {str(hashed_password)}")
+
+    created_user = await timings.run("insert", insert_user(user, user_id, hashed_password=hashed_password))
+    await timings.run("notify", _enqueue_upload_email(created_user, signed_urls))
+
+    return UserResponseCreation(
+        id=created_user["id"],
+        email=created_user["email"],
+        name=created_user["username"],
+        created_at=str(created_user["created_at"]),
+        upload_urls=signed_urls
+    )
+
+
+async def register_users_batch(
+        users: List[UserCreate],
+        storage_service: StorageService,
+        password_hasher: PasswordHasher
+) -> BatchRegistrationResponse:
+    """
+    Register many users: passwords hashed a pool's worth at a time, one
+    insert_many, one presigning pass. A user whose step fails is deleted again
+    and reported as failed; the rest of the batch is kept. As for a single
+    registration, the upload links are queued as emails, and verification
+    starts once the user's photos are uploaded.
+    """
+    results: List[BatchRegistrationResult] = [None] * len(users)
+
+    def fail(index: int, error: str):
+        results[index] = BatchRegistrationResult(index=index, email=users[index].email, status="failed", error=error)
+
+    created = []  # (input index, user document)
+    hashed_passwords = await password_hasher.hash_many([user.password for user in users])
+    for index, (user, error) in enumerate(await create_users(users, hashed_passwords)):
+        if user is None:
+            fail(index, error)
+        else:
+            created.append((index, user))
+
+    if created:
+        try:
+            signed_urls = await storage_service.generate_signed_urls_batch([
+                (user["id"], users[index].ground_photo_content_type, users[index].aerial_photo_content_type)
+                for index, user in created
+            ])
+        except Exception as e:
+            logger.error(f"Presigning failed for a batch of {len(created)} users: {e}")
+            await delete_users([user["id"] for _, user in created])
+            for index, _ in created:
+                fail(index, f"Failed to generate upload URLs: {str(e)}")
+            created = []
+
+    if created:
+        for (index, user), urls in zip(created, signed_urls):
+            results[index] = BatchRegistrationResult(
+                index=index,
+                email=user["email"],
+                status="created",
+                user=UserResponseCreation(
+                    id=user["id"],
+                    email=user["email"],
+                    name=user["username"],
+                    created_at=str(user["created_at"]),
+                    upload_urls=urls
+                )
+            )
+        await asyncio.gather(*(_enqueue_upload_email(user, urls) for (_, user), urls in zip(created, signed_urls)))
+
+    created_count = sum(1 for result in results if result.status == "created")
+    return BatchRegistrationResponse(created=created_count, failed=len(results) - created_count, results=results)
@@ -1,27 +1,71 @@
+import asyncio
+import hashlib
 import os
+from functools import lru_cache
+from typing import AsyncIterator, List, Optional, Tuple
 
-import boto3
 from dotenv import load_dotenv
+from fastapi import HTTPException, status
 
+from app.config.config import settings
 from app.requests.S3 import SignedUrlsResponse
+from app.utils.metrics import timed, track_dependency
 
 load_dotenv()
 
+VALID_IMAGE_TYPES = ["image/jpeg", "image/png", "image/tiff"]
+
+# S3 rejects multipart parts smaller than 5MiB (except the last one)
+S3_MIN_PART_SIZE = 5 * 1024 * 1024
+
 
 class StorageService:
     def __init__(self):
-        self.s3_client = boto3.client(
-            's3',
-            region_name=os.getenv('AWS_REGION'),
-            aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-            aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
-        )
+        self._s3_client = None
         self.bucket_name = os.getenv('S3_BUCKET_NAME')
 
-    async def generate_signed_urls(self, user_id: str, ground_photo_content_type: str = "image/jpeg", aerial_photo_content_type: str = "tiff/jpeg") -> SignedUrlsResponse:
+    @property
+    def s3_client(self):
+        """boto3 client, created (and boto3 imported) on first use"""
+        if self._s3_client is None:
+            import boto3
+            from botocore.config import Config
+
+            # Optional S3-compatible endpoint (MinIO, local stand-ins); those need path-style URLs
+            endpoint_url = os.getenv('S3_ENDPOINT_URL')
+            self._s3_client = boto3.client(
+                's3',
+                region_name=os.getenv('AWS_REGION'),
+                aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
+                aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
+                endpoint_url=endpoint_url,
+                config=Config(s3={'addressing_style': 'path'}) if endpoint_url else None,
+            )
+        return self._s3_client
+
+    def warm_up(self):
+        """
+        Build the client and sign one URL so credentials, endpoint resolution and
+        the signer are loaded before the first registration. Blocking; run in a thread.
+        """
+        if not self.bucket_name:
+            raise ValueError("S3_BUCKET_NAME environment variable is not set")
+        self.s3_client.generate_presigned_url(
+            'put_object',
+            Params={'Bucket': self.bucket_name, 'Key': 'warmup', 'ContentType': 'image/jpeg'},
+            ExpiresIn=60
+        )
+        return True
+
+    @staticmethod
+    def upload_keys(user_id: str) -> Tuple[str, str]:
+        """(ground photo key, aerial photo key) a user's uploads are stored under"""
+        return f"ground_photo-{user_id}", f"aerial_photo-{user_id}"
+
+    def _sign_upload_urls(self, user_id: str, ground_photo_content_type: str,
+                          aerial_photo_content_type: str) -> SignedUrlsResponse:
         # Ensure user_id is a string and not None
         user_id = str(user_id)
-        valid_images = ["image/jpeg", "image/png", "image/tiff"]
 
         # Set URL expiration time
         expires_in = 3600 * 12  # expire after 12 hrs
@@ -30,8 +74,9 @@ class StorageService:
         if not self.bucket_name:
             raise ValueError("S3_BUCKET_NAME environment variable is not set")
 
+        ground_photo_key, aerial_photo_key = self.upload_keys(user_id)
+
         # Generate URL for ground photo
-        ground_photo_key = f"ground_photo-{user_id}"
         ground_photo_url = self.s3_client.generate_presigned_url(
             'put_object',
             Params={
@@ -43,7 +88,6 @@ class StorageService:
         )
 
         # Generate URL for aerial photo
-        aerial_photo_key = f"aerial_photo-{user_id}"
         aerial_photo_url = self.s3_client.generate_presigned_url(
             'put_object',
             Params={
@@ -62,6 +106,199 @@ class StorageService:
             aerial_photo_key=aerial_photo_key,
         )
 
+    @timed("s3")
+    async def generate_signed_urls(self, user_id: str, ground_photo_content_type: str = "image/jpeg", aerial_photo_content_type: str = "tiff/jpeg") -> SignedUrlsResponse:
+        return self._sign_upload_urls(user_id, ground_photo_content_type, aerial_photo_content_type)
+
+    @timed("s3")
+    async def generate_signed_urls_batch(self, uploads: List[Tuple[str, str, str]]) -> List[SignedUrlsResponse]:
+        """
+        Presign upload URLs for many users in one pass: (user_id, ground content type,
+        aerial content type) tuples in, responses out in the same order. Signing is
+        local CPU work, so the whole batch runs in one worker thread instead of
+        blocking the event loop once per user.
+        """
+        return await asyncio.to_thread(lambda: [self._sign_upload_urls(*upload) for upload in uploads])
+
+    async def _call(self, operation: str, **params):
+        """Run a blocking boto3 call off the event loop"""
+        with track_dependency("s3", operation):
+            return await asyncio.to_thread(getattr(self.s3_client, operation), Bucket=self.bucket_name, **params)
+
+    def _get_range(self, key: str, offset: int, length: int) -> Tuple[bytes, Optional[int]]:
+        from botocore.exceptions import ClientError
+
+        try:
+            result = self.s3_client.get_object(
+                Bucket=self.bucket_name, Key=key, Range=f"bytes={offset}-{offset + length - 1}"
+            )
+        except ClientError as e:
+            code = e.response.get("Error", {}).get("Code")
+            if code in ("NoSuchKey", "404"):
+                raise FileNotFoundError(key) from e
+            if code == "InvalidRange":
+                # Starts past the end of the object (or the object is empty)
+                return b"", None
+            raise
+        with result["Body"] as body:
+            data = body.read()
+        content_range = result.get("ContentRange")
+        return data, int(content_range.rpartition("/")[2]) if content_range else None
+
+    async def read_range(self, key: str, offset: int, length: int) -> Tuple[bytes, Optional[int]]:
+        """
+        Up to `length` bytes of an object from `offset` with one ranged GET, and
+        the object's total size. FileNotFoundError if the object doesn't exist.
+        """
+        with track_dependency("s3", "get_object_range"):
+            return await asyncio.to_thread(self._get_range, key, offset, length)
+
+    def _hash_object(self, key: str) -> dict:
+        from botocore.exceptions import ClientError
+
+        try:
+            result = self.s3_client.get_object(Bucket=self.bucket_name, Key=key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+                raise FileNotFoundError(key) from e
+            raise
+        digest = hashlib.sha256()
+        body = result["Body"]
+        try:
+            for chunk in body.iter_chunks(settings.CHUNK_SIZE):
+                digest.update(chunk)
+        finally:
+            body.close()
+        return {"sha256": digest.hexdigest(), "etag": result["ETag"], "size": result["ContentLength"]}
+
+    async def content_hash(self, key: str, known: Optional[dict] = None) -> dict:
+        """
+        SHA-256 of an object, streamed through in CHUNK_SIZE pieces: {sha256, etag, size}.
+        `known` is an earlier result; while the object's ETag still matches it,
+        only a HEAD is made. (The ETag itself is no content hash: for multipart
+        uploads it depends on the part size.) FileNotFoundError if it doesn't exist.
+        """
+        if known and known.get("etag"):
+            from botocore.exceptions import ClientError
+
+            try:
+                head = await self._call("head_object", Key=key)
+            except ClientError as e:
+                if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+                    raise FileNotFoundError(key) from e
+                raise
+            if head["ETag"] == known["etag"]:
+                return known
+        with track_dependency("s3", "hash_object"):
+            return await asyncio.to_thread(self._hash_object, key)
+
+    async def download_to_file(self, key: str, path: str, max_size: int = settings.MAX_UPLOAD_SIZE) -> int:
+        """
+        Stream an object to a local file (boto3's transfer manager: ranged GETs,
+        a few MB in memory at a time) and return its size. FileNotFoundError if
+        it doesn't exist, ValueError if it is larger than `max_size`.
+        """
+        from botocore.exceptions import ClientError
+
+        try:
+            head = await self._call("head_object", Key=key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+                raise FileNotFoundError(key) from e
+            raise
+        if head["ContentLength"] > max_size:
+            raise ValueError(f"{key} is {head['ContentLength']} bytes, above the {max_size} byte limit")
+        await self._call("download_file", Key=key, Filename=path)
+        return head["ContentLength"]
+
+    async def upload_files(self, files: List[Tuple[str, str, str]], concurrency: int = 16):
+        """Upload (local path, key, content type) tuples, `concurrency` at a time"""
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def upload(path: str, key: str, content_type: str):
+            async with semaphore:
+                await self._call("upload_file", Filename=path, Key=key, ExtraArgs={"ContentType": content_type})
+
+        await asyncio.gather(*(upload(*file) for file in files))
+
+    async def upload_stream(self, key: str, chunks: AsyncIterator[bytes], content_type: str,
+                            max_size: int = settings.MAX_UPLOAD_SIZE,
+                            part_size: int = settings.CHUNK_SIZE) -> dict:
+        """
+        Stream an upload to S3 without holding the whole file in memory.
+
+        Chunks are gathered into multipart parts (CHUNK_SIZE, raised to S3's 5MiB
+        minimum) and each part is sent while the next one is being read, so at most
+        two parts are held at once. The upload is aborted as soon as more than
+        `max_size` bytes arrive. Bodies smaller than one part use a single PUT.
+        The SHA-256 of the body is computed on the way through.
+        """
+        if not self.bucket_name:
+            raise ValueError("S3_BUCKET_NAME environment variable is not set")
+
+        part_size = max(part_size, S3_MIN_PART_SIZE)
+        buffer = bytearray()
+        total = 0
+        digest = hashlib.sha256()
+        upload_id = None
+        parts = []
+        part_number = 0
+        pending = None  # part upload overlapping with reading the next part
+
+        async def send_part(number: int, data: bytes):
+            result = await self._call("upload_part", Key=key, UploadId=upload_id, PartNumber=number, Body=data)
+            return {"PartNumber": number, "ETag": result["ETag"]}
+
+        try:
+            async for chunk in chunks:
+                total += len(chunk)
+                if total > max_size:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=f"Upload exceeds the {max_size} byte limit"
+                    )
+                buffer += chunk
+                digest.update(chunk)
+
+                while len(buffer) >= part_size:
+                    if upload_id is None:
+                        created = await self._call("create_multipart_upload", Key=key, ContentType=content_type)
+                        upload_id = created["UploadId"]
+                    if pending is not None:
+                        parts.append(await pending)
+                    data = bytes(buffer[:part_size])
+                    del buffer[:part_size]
+                    part_number += 1
+                    pending = asyncio.ensure_future(send_part(part_number, data))
+
+            if upload_id is None:
+                result = await self._call("put_object", Key=key, Body=bytes(buffer), ContentType=content_type)
+                return {"key": key, "size": total, "etag": result["ETag"], "parts": 1, "sha256": digest.hexdigest()}
+
+            if pending is not None:
+                parts.append(await pending)
+                pending = None
+            if buffer:
+                part_number += 1
+                parts.append(await send_part(part_number, bytes(buffer)))
+                buffer.clear()
+
+            result = await self._call(
+                "complete_multipart_upload", Key=key, UploadId=upload_id, MultipartUpload={"Parts": parts}
+            )
+            return {"key": key, "size": total, "etag": result["ETag"], "parts": len(parts),
+                    "sha256": digest.hexdigest()}
+
+        except BaseException:
+            if pending is not None:
+                pending.cancel()
+                await asyncio.gather(pending, return_exceptions=True)
+            if upload_id is not None:
+                await self._call("abort_multipart_upload", Key=key, UploadId=upload_id)
+            raise
+
 
-# Create a singleton instance
-storage_service = StorageService()
+@lru_cache(maxsize=None)
+def get_storage_service() -> StorageService:
+    """FastAPI dependency returning the shared StorageService"""
+    return StorageService()
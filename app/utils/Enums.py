@@ -4,6 +4,7 @@ class VerificationStatusEnum(Enum):
     PENDING = "Pending"
     REJECTED = "Rejected"
     ACCEPTED = "Accepted"
+    IN_REVIEW = "InReview"
 
 default_status = VerificationStatusEnum.PENDING
 
@@ -11,8 +12,21 @@ class ImageTypeEnum(Enum):
     GROUNDPHOTO = "GroundPhoto"
     AERIALPHOTO = "AerialPhoto"
 
+class PhotoFieldEnum(str, Enum):
+    GROUND_PHOTO = "ground_photo"
+    AERIAL_PHOTO = "aerial_photo"
+
+class JourneyIntervalEnum(str, Enum):
+    RAW = "raw"
+    HOUR = "hour"
+    DAY = "day"
+    WEEK = "week"
+    MONTH = "month"
+
 __all__ = [
     'VerificationStatusEnum',
     'default_status',
-    'ImageTypeEnum'
+    'ImageTypeEnum',
+    'PhotoFieldEnum',
+    'JourneyIntervalEnum'
 ]
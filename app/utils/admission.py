@@ -0,0 +1,117 @@
+import math
+import time
+from collections import OrderedDict
+from typing import List, Optional
+
+from app.utils.metrics import registry
+
+ADMISSION_REJECTIONS = registry.counter(
+    "admission_rejections_total",
+    "Requests turned away before reaching the app; reason is rate_limited (429) or overloaded (503)",
+    ("reason",),
+)
+ADMISSION_LIMIT = registry.gauge("admission_concurrency_limit", "Current adaptive limit on concurrent requests")
+ADMISSION_IN_FLIGHT = registry.gauge("admission_in_flight", "Requests admitted and not yet finished")
+ADMISSION_P99 = registry.gauge(
+    "admission_latency_p99_seconds", "p99 latency of the last window of admitted requests"
+)
+ADMISSION_CLIENTS = registry.gauge("admission_tracked_clients", "Clients with a token bucket held in memory")
+
+
+class ClientRateLimiter:
+    """
+    One token bucket per client: `rate` tokens per second up to `burst`. The
+    least recently seen clients are dropped beyond `max_clients`; a dropped
+    client simply starts again with a full bucket.
+    """
+
+    def __init__(self, rate: float, burst: float, max_clients: int):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()  # client -> [tokens, updated]
+
+    def acquire(self, client: str, now: float = None) -> float:
+        """Take a token; returns 0 if admitted, else seconds until the next token"""
+        now = time.monotonic() if now is None else now
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = self._buckets[client] = [self.burst, now]
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+            ADMISSION_CLIENTS.set(len(self._buckets))
+        else:
+            self._buckets.move_to_end(client)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0.0
+        return (1 - bucket[0]) / self.rate
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Caps concurrent requests at a limit that follows observed latency: after
+    each window of completed requests the p99 is compared with the target. Above
+    it the limit shrinks multiplicatively; below it, and only if the limit was
+    actually reached, it grows by about sqrt(limit). Requests over the limit
+    are refused instead of queued.
+    """
+
+    def __init__(self, initial_limit: int, min_limit: int, max_limit: int, latency_target: float,
+                 window: int = 200, decrease_factor: float = 0.9, adjust_interval: float = 1.0):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.window = window
+        self.decrease_factor = decrease_factor
+        self.adjust_interval = adjust_interval
+        self.in_flight = 0
+        self.p99 = 0.0
+        self._samples: List[float] = []
+        self._saturated = False
+        self._last_adjust = time.monotonic()
+        ADMISSION_LIMIT.set(int(self.limit))
+
+    def try_acquire(self) -> bool:
+        if self.in_flight >= int(self.limit):
+            self._saturated = True
+            return False
+        self.in_flight += 1
+        if self.in_flight >= int(self.limit):
+            self._saturated = True
+        ADMISSION_IN_FLIGHT.set(self.in_flight)
+        return True
+
+    def release(self, latency: Optional[float]):
+        """Free a slot; `latency` None for requests whose duration shouldn't move the limit"""
+        self.in_flight -= 1
+        ADMISSION_IN_FLIGHT.set(self.in_flight)
+        if latency is None:
+            return
+        self._samples.append(latency)
+        now = time.monotonic()
+        # Full window, or a partial one on a quiet server so the limit still moves
+        if len(self._samples) >= self.window or (
+                len(self._samples) >= 10 and now - self._last_adjust >= self.adjust_interval):
+            self._adjust(now)
+
+    def _adjust(self, now: float):
+        samples = sorted(self._samples)
+        self._samples.clear()
+        self._last_adjust = now
+        self.p99 = samples[max(math.ceil(len(samples) * 0.99) - 1, 0)]
+        if self.p99 > self.latency_target:
+            self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+        elif self._saturated:
+            self.limit = min(self.max_limit, self.limit + max(1.0, math.sqrt(self.limit)))
+        self._saturated = False
+        ADMISSION_LIMIT.set(int(self.limit))
+        ADMISSION_P99.set(self.p99)
+
+    def retry_after(self) -> int:
+        """Seconds a refused client should wait: roughly how long current requests take"""
+        return max(1, math.ceil(self.p99))
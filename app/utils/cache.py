@@ -0,0 +1,82 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+from app.utils.metrics import registry
+
+CACHE_REQUESTS = registry.counter(
+    "cache_requests_total",
+    "Result cache lookups by cache name and result (hit/miss)",
+    ("cache", "result"),
+)
+
+
+class TTLCache:
+    """
+    Bounded in-process cache with per-entry expiry and LRU eviction.
+    `cap_ttl` shortens every entry's lifetime, e.g. while the change stream
+    that would invalidate them is down.
+    """
+
+    def __init__(self, name: str, ttl: float, max_entries: int = 10000):
+        self.name = name
+        self.ttl = ttl
+        self.ttl_cap: Optional[float] = None
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = CACHE_REQUESTS.labels(name, "hit")
+        self._misses = CACHE_REQUESTS.labels(name, "miss")
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self._misses.inc()
+                return None
+            self._entries.move_to_end(key)
+        self._hits.inc()
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: float = None):
+        ttl = ttl or self.ttl
+        if self.ttl_cap is not None:
+            ttl = min(ttl, self.ttl_cap)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_where(self, predicate: Callable[[Hashable, Any], bool]) -> int:
+        """Drop every entry whose (key, value) matches; a full scan"""
+        with self._lock:
+            keys = [key for key, (_, value) in self._entries.items() if predicate(key, value)]
+            for key in keys:
+                del self._entries[key]
+        return len(keys)
+
+    def cap_ttl(self, seconds: Optional[float]):
+        """Keep entries, existing ones included, at most `seconds`; None lifts the cap for new entries"""
+        with self._lock:
+            self.ttl_cap = seconds
+            if seconds is None:
+                return
+            latest = time.monotonic() + seconds
+            for key, (expires_at, value) in self._entries.items():
+                if expires_at > latest:
+                    self._entries[key] = (latest, value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,109 @@
+import copy
+import json
+from datetime import date, datetime
+from enum import Enum
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+from bson import ObjectId
+from pydantic import BaseModel
+from starlette.responses import Response
+
+try:
+    import orjson
+except ImportError:  # optional; the standard library encoder is used instead
+    orjson = None
+
+
+def _default(value: Any):
+    """Types neither encoder handles on its own"""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(value: Any) -> bytes:
+    """JSON bytes, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(value, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class JSONBytesResponse(Response):
+    """JSON response rendered by `dumps`; already encoded bytes are sent as they are"""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return content if isinstance(content, bytes) else dumps(content)
+
+
+class ModelCodec:
+    """
+    Shapes trusted documents (our own Mongo output, our own new documents) like
+    `model` without validating them: missing fields get the model's defaults,
+    Mongo's _id becomes id, and nothing else is checked or coerced. Input from
+    clients or other services still goes through the model itself.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.fields: Tuple[str, ...] = tuple(model.model_fields)
+        self._defaults: Dict[str, Any] = {}
+        self._factories: Dict[str, Any] = {}
+        for name, field in model.model_fields.items():
+            if field.default_factory is not None:
+                self._factories[name] = field.default_factory
+            elif not field.is_required():
+                self._defaults[name] = field.default
+            else:
+                self._defaults[name] = None
+
+    def default(self, name: str) -> Any:
+        factory = self._factories.get(name)
+        if factory is not None:
+            return factory()
+        value = self._defaults[name]
+        return copy.copy(value) if isinstance(value, (dict, list)) else value
+
+    def to_dict(self, document: dict, fields: Optional[Tuple[str, ...]] = None) -> dict:
+        """A stored document as the model would serialize it; `fields` narrows it (id is always kept)"""
+        names = self.fields if not fields else (
+            fields if "id" in fields or "id" not in self.fields else ("id",) + tuple(fields))
+        shaped = {}
+        for name in names:
+            if name == "id":
+                value = document.get("id", document.get("_id"))
+                shaped["id"] = str(value) if value is not None else None
+            elif name in document:
+                shaped[name] = document[name]
+            else:
+                shaped[name] = self.default(name)
+        return shaped
+
+    def new_document(self, **values) -> dict:
+        """A new document with every model field, defaults filled in and enums stored by value"""
+        document = {}
+        for name in self.fields:
+            value = values[name] if name in values else self.default(name)
+            document[name] = value.value if isinstance(value, Enum) else value
+        return document
+
+    def encode(self, data, fields: Optional[Tuple[str, ...]] = None) -> bytes:
+        """One document or a list of them, straight to JSON bytes"""
+        if isinstance(data, list):
+            return dumps([self.to_dict(document, fields) for document in data])
+        return dumps(self.to_dict(data, fields))
+
+
+@lru_cache(maxsize=None)
+def codec_for(model) -> ModelCodec:
+    return ModelCodec(model)
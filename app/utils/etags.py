@@ -0,0 +1,43 @@
+import hashlib
+from typing import Optional, Tuple
+
+# Fields an entity tag is derived from, in order of preference. Documents written
+# before `version` existed fall back to their timestamps.
+VERSION_FIELDS: Tuple[str, ...] = ("version", "updated_at", "created_at")
+
+
+def version_token(document: dict) -> str:
+    for field in VERSION_FIELDS:
+        value = document.get(field)
+        if value is not None:
+            return f"{field}:{value.isoformat() if hasattr(value, 'isoformat') else value}"
+    return "unversioned"
+
+
+def entity_tag(document: dict, variant: Optional[str] = None) -> str:
+    """
+    Strong ETag for a stored document. `variant` distinguishes representations of
+    the same version, e.g. a fields= selection.
+    """
+    basis = f"{document.get('id')}|{version_token(document)}|{variant or ''}"
+    return f'"{hashlib.blake2b(basis.encode(), digest_size=12).hexdigest()}"'
+
+
+def _tags(header: str):
+    return [tag.strip() for tag in header.split(",") if tag.strip()]
+
+
+def if_none_match(header: Optional[str], etag: str) -> bool:
+    """True when If-None-Match matches, i.e. the client's copy is current (weak comparison)"""
+    if not header:
+        return False
+    tags = _tags(header)
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+
+def if_match(header: Optional[str], etag: str) -> bool:
+    """True when If-Match allows the write (strong comparison; weak tags never match)"""
+    if header is None:
+        return True
+    tags = _tags(header)
+    return "*" in tags or etag in tags
@@ -0,0 +1,67 @@
+import csv
+import logging
+import unicodedata
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from app.config.config import settings
+from app.models.geo import GeoPoint
+
+logger = logging.getLogger("geocoding")
+
+
+def _normalize(name: str) -> str:
+    """Case, accents and surrounding whitespace don't matter: 'São Paulo ' -> 'sao paulo'"""
+    decomposed = unicodedata.normalize("NFKD", name.strip().lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+class Gazetteer:
+    """
+    Offline place-name lookup read from a tab separated file (see
+    migration-scripts/data/gazetteer.tsv), so seeding needs no geocoding API.
+    """
+
+    def __init__(self, rows: List[Tuple[str, List[str], float, float]]):
+        # place -> [(country names, point)], in file order
+        self._places: Dict[str, List[Tuple[frozenset, GeoPoint]]] = {}
+        for place, countries, latitude, longitude in rows:
+            self._places.setdefault(_normalize(place), []).append((
+                frozenset(_normalize(country) for country in countries),
+                GeoPoint.from_lat_lng(latitude, longitude),
+            ))
+
+    @classmethod
+    def load(cls, path: str) -> "Gazetteer":
+        rows = []
+        with open(path, encoding="utf-8", newline="") as f:
+            for line_number, row in enumerate(csv.reader(f, delimiter="\t"), start=1):
+                if not row or row[0].startswith("#"):
+                    continue
+                try:
+                    place, countries, latitude, longitude = row
+                    rows.append((place, countries.split("|"), float(latitude), float(longitude)))
+                except ValueError:
+                    logger.warning(f"Skipping malformed gazetteer line {line_number} in {path}")
+        return cls(rows)
+
+    def __len__(self):
+        return sum(len(entries) for entries in self._places.values())
+
+    def points(self) -> List[GeoPoint]:
+        return [point for entries in self._places.values() for _, point in entries]
+
+    def geocode(self, location: str) -> Optional[GeoPoint]:
+        """'Nairobi, Kenya' -> its point; the country part narrows ambiguous names. None if unknown."""
+        parts = [part for part in (_normalize(part) for part in location.split(",")) if part]
+        if not parts:
+            return None
+        entries = self._places.get(parts[0], [])
+        if len(parts) > 1:
+            entries = [entry for entry in entries if parts[-1] in entry[0]]
+        return entries[0][1] if entries else None
+
+
+@lru_cache(maxsize=None)
+def get_gazetteer() -> Gazetteer:
+    return Gazetteer.load(settings.GAZETTEER_PATH)
@@ -0,0 +1,338 @@
+"""
+GeoTIFF header parsing from ranged reads.
+
+Only the TIFF header and the image file directories (IFDs) are read, plus the
+out-of-line values of the few tags needed for dimensions, bands, CRS and
+bounds. Pixel data and the strip/tile offset arrays are never fetched, so a
+100MB aerial photo is usually inspected with a single 64KB read.
+"""
+import struct
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+# (bytes, total object size if known) for `length` bytes from `offset`; short at the end of the object
+RangeFetch = Callable[[int, int], Awaitable[Tuple[bytes, Optional[int]]]]
+
+# TIFF tags
+NEW_SUBFILE_TYPE = 254
+IMAGE_WIDTH = 256
+IMAGE_LENGTH = 257
+BITS_PER_SAMPLE = 258
+COMPRESSION = 259
+PHOTOMETRIC = 262
+SAMPLES_PER_PIXEL = 277
+PLANAR_CONFIGURATION = 284
+TILE_WIDTH = 322
+TILE_LENGTH = 323
+SAMPLE_FORMAT = 339
+# GeoTIFF tags
+MODEL_PIXEL_SCALE = 33550
+MODEL_TIEPOINT = 33922
+MODEL_TRANSFORMATION = 34264
+GEO_KEY_DIRECTORY = 34735
+GEO_DOUBLE_PARAMS = 34736
+GEO_ASCII_PARAMS = 34737
+
+# GeoKeys
+GT_MODEL_TYPE = 1024
+GT_RASTER_TYPE = 1025
+GEOGRAPHIC_TYPE = 2048
+PROJECTED_CS_TYPE = 3072
+RASTER_PIXEL_IS_POINT = 2
+USER_DEFINED = 32767
+
+# Tags whose values are read for the first (full resolution) image; anything
+# else, notably StripOffsets/TileOffsets, is skipped without being fetched
+IMAGE_TAGS = frozenset({
+    NEW_SUBFILE_TYPE, IMAGE_WIDTH, IMAGE_LENGTH, BITS_PER_SAMPLE, COMPRESSION, PHOTOMETRIC, SAMPLES_PER_PIXEL,
+    PLANAR_CONFIGURATION, TILE_WIDTH, TILE_LENGTH, SAMPLE_FORMAT, MODEL_PIXEL_SCALE, MODEL_TIEPOINT,
+    MODEL_TRANSFORMATION, GEO_KEY_DIRECTORY, GEO_DOUBLE_PARAMS, GEO_ASCII_PARAMS,
+})
+# Later IFDs are only classified (overview or mask) and sized
+OVERVIEW_TAGS = frozenset({NEW_SUBFILE_TYPE, IMAGE_WIDTH, IMAGE_LENGTH})
+
+# field type -> (struct code, size)
+FIELD_TYPES = {
+    1: ("B", 1), 2: ("s", 1), 3: ("H", 2), 4: ("I", 4), 5: ("I", 4), 6: ("b", 1), 7: ("B", 1),
+    8: ("h", 2), 9: ("i", 4), 10: ("i", 4), 11: ("f", 4), 12: ("d", 8), 16: ("Q", 8), 17: ("q", 8), 18: ("Q", 8),
+}
+ASCII = 2
+RATIONAL_TYPES = (5, 10)
+
+MAX_IFD_ENTRIES = 4096
+MAX_TAG_VALUE_BYTES = 1024 * 1024
+
+
+class InvalidGeoTIFF(ValueError):
+    """The object is not a GeoTIFF this service accepts; the message says why"""
+
+
+@dataclass
+class GeoTIFFInfo:
+    width: int
+    height: int
+    bands: int
+    bits_per_sample: List[int]
+    sample_format: int
+    compression: int
+    photometric: Optional[int]
+    planar_configuration: int
+    tile_width: Optional[int]
+    tile_height: Optional[int]
+    crs: Optional[str]  # "EPSG:<code>", None when user-defined or missing
+    bounds: Optional[List[float]]  # [min_x, min_y, max_x, max_y] in CRS units
+    overviews: List[Tuple[int, int]] = field(default_factory=list)  # (width, height), largest first
+    big_tiff: bool = False
+
+    @property
+    def tiled(self) -> bool:
+        return self.tile_width is not None
+
+
+class RangeReader:
+    """
+    Random access over an object that is fetched in blocks of at least
+    `block_size` bytes. Fetched blocks are kept, so reads falling inside
+    them cost nothing; at most `max_requests` fetches are made.
+    """
+
+    def __init__(self, fetch: RangeFetch, block_size: int = 64 * 1024, max_requests: int = 8):
+        self._fetch = fetch
+        self.block_size = block_size
+        self.max_requests = max_requests
+        self._blocks: List[Tuple[int, bytes]] = []
+        self.size: Optional[int] = None
+        self.requests = 0
+        self.bytes_read = 0
+
+    async def read(self, offset: int, length: int) -> bytes:
+        for start, data in self._blocks:
+            if start <= offset and offset + length <= start + len(data):
+                return data[offset - start:offset - start + length]
+        if self.size is not None and offset + length > self.size:
+            raise InvalidGeoTIFF("Truncated TIFF: a directory points past the end of the file")
+        if self.requests >= self.max_requests:
+            raise InvalidGeoTIFF(f"TIFF header is spread over more than {self.max_requests} reads")
+
+        data, size = await self._fetch(offset, max(length, self.block_size))
+        self.requests += 1
+        self.bytes_read += len(data)
+        if size is not None:
+            self.size = size
+        if len(data) < length:
+            raise InvalidGeoTIFF("Truncated TIFF: a directory points past the end of the file")
+        self._blocks.append((offset, data))
+        return data[:length]
+
+
+class _Layout:
+    """Byte order and offset widths of classic TIFF or BigTIFF"""
+
+    def __init__(self, byte_order: str, big: bool):
+        self.byte_order = byte_order
+        self.big = big
+        self.offset_code = "Q" if big else "I"
+        self.offset_size = 8 if big else 4
+        self.count_code = "Q" if big else "H"
+        self.count_size = 8 if big else 2
+        self.entry_size = 20 if big else 12
+
+    def unpack(self, code: str, data: bytes, offset: int = 0):
+        return struct.unpack_from(self.byte_order + code, data, offset)
+
+
+async def _read_layout(reader: RangeReader) -> Tuple[_Layout, int]:
+    """(layout, offset of the first IFD)"""
+    header = await reader.read(0, 8)
+    if header[:2] == b"II":
+        byte_order = "<"
+    elif header[:2] == b"MM":
+        byte_order = ">"
+    else:
+        raise InvalidGeoTIFF("Not a TIFF file")
+
+    version = struct.unpack_from(byte_order + "H", header, 2)[0]
+    if version == 42:
+        layout = _Layout(byte_order, big=False)
+        return layout, layout.unpack("I", header, 4)[0]
+    if version == 43:
+        layout = _Layout(byte_order, big=True)
+        header = await reader.read(0, 16)
+        if layout.unpack("HH", header, 4) != (8, 0):
+            raise InvalidGeoTIFF("Unsupported BigTIFF offset size")
+        return layout, layout.unpack("Q", header, 8)[0]
+    raise InvalidGeoTIFF(f"Unsupported TIFF version {version}")
+
+
+async def _read_ifd(reader: RangeReader, layout: _Layout, offset: int,
+                    wanted: frozenset) -> Tuple[Dict[int, tuple], int]:
+    """The values of the `wanted` tags in the IFD at `offset`, and the next IFD's offset (0 for none)"""
+    count = layout.unpack(layout.count_code, await reader.read(offset, layout.count_size))[0]
+    if count == 0 or count > MAX_IFD_ENTRIES:
+        raise InvalidGeoTIFF(f"Implausible TIFF directory with {count} entries")
+    raw = await reader.read(offset + layout.count_size, count * layout.entry_size + layout.offset_size)
+
+    tags = {}
+    for index in range(count):
+        entry = index * layout.entry_size
+        tag, field_type = layout.unpack("HH", raw, entry)
+        if tag not in wanted or field_type not in FIELD_TYPES:
+            continue
+        value_count = layout.unpack(layout.offset_code, raw, entry + 4)[0]
+        code, size = FIELD_TYPES[field_type]
+        if field_type in RATIONAL_TYPES:
+            value_count *= 2
+        value_size = value_count * size
+        if value_size > MAX_TAG_VALUE_BYTES:
+            raise InvalidGeoTIFF(f"TIFF tag {tag} is implausibly large ({value_size} bytes)")
+
+        value_field = entry + 4 + layout.offset_size
+        if value_size <= layout.offset_size:
+            data = raw[value_field:value_field + value_size]
+        else:
+            data = await reader.read(layout.unpack(layout.offset_code, raw, value_field)[0], value_size)
+
+        if field_type == ASCII:
+            tags[tag] = (data.split(b"\0", 1)[0].decode("ascii", "replace"),)
+            continue
+        values = layout.unpack(f"{value_count}{code}", data)
+        if field_type in RATIONAL_TYPES:
+            values = tuple(values[i] / values[i + 1] if values[i + 1] else 0.0 for i in range(0, len(values), 2))
+        tags[tag] = values
+
+    next_offset = layout.unpack(layout.offset_code, raw, count * layout.entry_size)[0]
+    return tags, next_offset
+
+
+def _integers(tags: Dict[int, tuple], tag: int, default: tuple) -> tuple:
+    """Values of an integer tag (`default` if it's missing); a tag stored as text or reals is invalid"""
+    values = tags.get(tag)
+    if values is None:
+        return default
+    if not values or not all(isinstance(value, int) for value in values):
+        raise InvalidGeoTIFF(f"TIFF tag {tag} must hold integers")
+    return values
+
+
+def _numbers(tags: Dict[int, tuple], tag: int, minimum: int) -> Optional[tuple]:
+    """Values of a numeric tag with at least `minimum` of them, None if it's missing"""
+    values = tags.get(tag)
+    if not values:
+        return None
+    if not all(isinstance(value, (int, float)) for value in values):
+        raise InvalidGeoTIFF(f"TIFF tag {tag} must hold numbers")
+    if len(values) < minimum:
+        raise InvalidGeoTIFF(f"TIFF tag {tag} needs at least {minimum} values, has {len(values)}")
+    return values
+
+
+def _geo_keys(tags: Dict[int, tuple]) -> Dict[int, object]:
+    """GeoKey id -> value from the GeoKeyDirectory and its parameter tags"""
+    directory = _integers(tags, GEO_KEY_DIRECTORY, ())
+    if len(directory) < 4:
+        return {}
+    doubles = _numbers(tags, GEO_DOUBLE_PARAMS, 0) or ()
+    ascii_params = tags.get(GEO_ASCII_PARAMS, ("",))[0]
+    if not isinstance(ascii_params, str):
+        raise InvalidGeoTIFF(f"TIFF tag {GEO_ASCII_PARAMS} must hold text")
+    keys = {}
+    for index in range(min(directory[3], (len(directory) - 4) // 4)):
+        key_id, location, count, value = directory[4 + index * 4:8 + index * 4]
+        if location == 0:
+            keys[key_id] = value
+        elif location == GEO_DOUBLE_PARAMS:
+            keys[key_id] = doubles[value:value + count]
+        elif location == GEO_ASCII_PARAMS:
+            keys[key_id] = ascii_params[value:value + count].rstrip("|")
+    return keys
+
+
+def _crs(keys: Dict[int, object]) -> Optional[str]:
+    for key in (PROJECTED_CS_TYPE, GEOGRAPHIC_TYPE):
+        code = keys.get(key)
+        if isinstance(code, int) and 0 < code < USER_DEFINED:
+            return f"EPSG:{code}"
+    return None
+
+
+def _bounds(tags: Dict[int, tuple], keys: Dict[int, object], width: int, height: int) -> Optional[List[float]]:
+    """Extent of the raster in model (CRS) coordinates, from the transformation or tiepoint + scale"""
+    # Pixel-is-point rasters are referenced at pixel centres rather than corners
+    shift = -0.5 if keys.get(GT_RASTER_TYPE) == RASTER_PIXEL_IS_POINT else 0.0
+    corners = [(shift, shift), (width + shift, shift), (shift, height + shift), (width + shift, height + shift)]
+
+    transformation = _numbers(tags, MODEL_TRANSFORMATION, 16)
+    tiepoint = _numbers(tags, MODEL_TIEPOINT, 6)
+    scale = _numbers(tags, MODEL_PIXEL_SCALE, 2)
+    if transformation:
+        a, b, _, d, e, f, _, h = transformation[:8]
+        points = [(a * i + b * j + d, e * i + f * j + h) for i, j in corners]
+    elif tiepoint and scale:
+        i0, j0, _, x0, y0, _ = tiepoint[:6]
+        scale_x, scale_y = scale[:2]
+        if scale_x <= 0 or scale_y <= 0:
+            raise InvalidGeoTIFF("Non-positive pixel scale")
+        points = [(x0 + (i - i0) * scale_x, y0 - (j - j0) * scale_y) for i, j in corners]
+    else:
+        return None
+
+    xs = [x for x, _ in points]
+    ys = [y for _, y in points]
+    return [min(xs), min(ys), max(xs), max(ys)]
+
+
+async def read_geotiff(reader: RangeReader, require_georeference: bool = True, max_ifds: int = 32) -> GeoTIFFInfo:
+    """
+    Parse the header and IFDs of a (Big)TIFF through `reader`. Raises
+    InvalidGeoTIFF for anything that isn't a readable TIFF, and for TIFFs
+    without georeferencing when `require_georeference` is set.
+    """
+    try:
+        layout, offset = await _read_layout(reader)
+        if offset == 0:
+            raise InvalidGeoTIFF("TIFF has no images")
+        tags, next_offset = await _read_ifd(reader, layout, offset, IMAGE_TAGS)
+
+        overviews = []
+        seen = {offset}
+        while next_offset and len(seen) < max_ifds:
+            if next_offset in seen:
+                raise InvalidGeoTIFF("TIFF directories form a loop")
+            seen.add(next_offset)
+            sub_tags, next_offset = await _read_ifd(reader, layout, next_offset, OVERVIEW_TAGS)
+            subfile_type = _integers(sub_tags, NEW_SUBFILE_TYPE, (0,))[0]
+            # Bit 0: reduced resolution copy; bit 2: transparency mask
+            if subfile_type & 1 and not subfile_type & 4 and IMAGE_WIDTH in sub_tags and IMAGE_LENGTH in sub_tags:
+                overviews.append((_integers(sub_tags, IMAGE_WIDTH, ())[0], _integers(sub_tags, IMAGE_LENGTH, ())[0]))
+    except struct.error:
+        raise InvalidGeoTIFF("Malformed TIFF directory")
+
+    width = _integers(tags, IMAGE_WIDTH, (0,))[0]
+    height = _integers(tags, IMAGE_LENGTH, (0,))[0]
+    if width <= 0 or height <= 0:
+        raise InvalidGeoTIFF("TIFF has no image dimensions")
+    bands = _integers(tags, SAMPLES_PER_PIXEL, (1,))[0]
+    if bands <= 0:
+        raise InvalidGeoTIFF("TIFF has no bands")
+
+    keys = _geo_keys(tags)
+    bounds = _bounds(tags, keys, width, height)
+    if require_georeference and bounds is None:
+        raise InvalidGeoTIFF("TIFF is not georeferenced (no ModelTiepoint/ModelPixelScale or ModelTransformation)")
+
+    return GeoTIFFInfo(
+        width=width,
+        height=height,
+        bands=bands,
+        bits_per_sample=list(_integers(tags, BITS_PER_SAMPLE, (1,))),
+        sample_format=_integers(tags, SAMPLE_FORMAT, (1,))[0],
+        compression=_integers(tags, COMPRESSION, (1,))[0],
+        photometric=_integers(tags, PHOTOMETRIC, (None,))[0],
+        planar_configuration=_integers(tags, PLANAR_CONFIGURATION, (1,))[0],
+        tile_width=_integers(tags, TILE_WIDTH, (None,))[0],
+        tile_height=_integers(tags, TILE_LENGTH, (None,))[0],
+        crs=_crs(keys),
+        bounds=bounds,
+        overviews=overviews,
+        big_tiff=layout.big,
+    )
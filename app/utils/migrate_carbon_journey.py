@@ -0,0 +1,101 @@
+# Move embedded carbon_journey dicts into the time-series collection:
+# python -m app.utils.migrate_carbon_journey [--batch-size 500] [--dry-run]
+import argparse
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict
+
+from dotenv import load_dotenv
+
+from app.config.config import settings
+from app.db.database import close_mongo_connection, connect_to_mongo, db
+from app.db.journey_repository import (
+    delete_measurements, ensure_journey_collection, insert_measurements, journey_measurement, legacy_entries,
+)
+from app.db.user_repository import invalidate_user, refresh_carbon_summaries
+
+logger = logging.getLogger(__name__)
+
+MIGRATION_SOURCE = "migration"
+
+
+async def migrate_batch(users: list, dry_run: bool = False) -> Dict[str, int]:
+    """
+    Move the journeys of one batch of users ({"_id", "carbon_journey"}).
+    Safe to rerun: measurements an interrupted run left for these users are
+    replaced, and a user's embedded dict is only removed once its entries
+    and summary are written.
+    """
+    stats = {"users": len(users), "entries": 0, "skipped_keys": 0}
+    measurements = []
+    for user in users:
+        entries, skipped = legacy_entries(user.get("carbon_journey"))
+        if skipped:
+            logger.warning(f"User {user['_id']}: skipping carbon_journey keys that aren't dates: {skipped}")
+        stats["skipped_keys"] += len(skipped)
+        measurements.extend(journey_measurement(str(user["_id"]), entry, MIGRATION_SOURCE) for entry in entries)
+    stats["entries"] = len(measurements)
+    if dry_run:
+        return stats
+
+    user_ids = [str(user["_id"]) for user in users]
+    await delete_measurements(user_ids, source=MIGRATION_SOURCE)
+    await insert_measurements(measurements)
+    # From the collection, so entries appended since the deploy are counted too
+    await refresh_carbon_summaries(user_ids)
+    await db.get_collection("users").update_many(
+        {"_id": {"$in": [user["_id"] for user in users]}},
+        {"$unset": {"carbon_journey": ""}, "$set": {"updated_at": datetime.utcnow()}, "$inc": {"version": 1}}
+    )
+    for user_id in user_ids:
+        invalidate_user(user_id)
+    return stats
+
+
+async def migrate_carbon_journeys(batch_size: int = settings.JOURNEY_MIGRATION_BATCH_SIZE,
+                                  dry_run: bool = False) -> Dict[str, int]:
+    """Every user still carrying an embedded carbon_journey, `batch_size` users at a time in _id order"""
+    if not dry_run:
+        await ensure_journey_collection()
+    users_collection = db.get_collection("users")
+    totals = {"users": 0, "entries": 0, "skipped_keys": 0, "batches": 0}
+    last_id = None
+    while True:
+        query = {"carbon_journey": {"$exists": True}}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        users = await users_collection.find(query, {"carbon_journey": 1}).sort("_id", 1).limit(batch_size).to_list(
+            length=batch_size
+        )
+        if not users:
+            break
+        stats = await migrate_batch(users, dry_run=dry_run)
+        for key, value in stats.items():
+            totals[key] += value
+        totals["batches"] += 1
+        last_id = users[-1]["_id"]
+        logger.info(f"Batch {totals['batches']}: {stats['users']} users, {stats['entries']} entries "
+                    f"({totals['users']} users so far)")
+    return totals
+
+
+async def main(batch_size: int, dry_run: bool):
+    if not await connect_to_mongo():
+        raise SystemExit("Could not connect to MongoDB")
+    try:
+        totals = await migrate_carbon_journeys(batch_size, dry_run)
+        logger.info(f"{'Would move' if dry_run else 'Moved'} {totals['entries']} entries of {totals['users']} users "
+                    f"in {totals['batches']} batches; {totals['skipped_keys']} keys skipped")
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Move embedded carbon_journey histories to the time-series collection")
+    parser.add_argument("--batch-size", type=int, default=settings.JOURNEY_MIGRATION_BATCH_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="count what would move without writing")
+    args = parser.parse_args()
+    asyncio.run(main(args.batch_size, args.dry_run))
@@ -0,0 +1,179 @@
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger("profiler")
+
+# Leaf frames that mean the event loop thread is parked waiting on I/O
+IDLE_FILES = ("selectors.py",)
+IDLE_FUNCTIONS = ("select", "poll", "run_forever", "run_until_complete")
+MAX_STACK_DEPTH = 128
+
+Frame = Tuple[str, str, int]
+
+
+class SamplingProfiler:
+    """
+    Wall-clock sampling profiler for a single thread.
+
+    A daemon thread snapshots the target thread's stack every `interval`
+    seconds via sys._current_frames(), so the profiled code runs unmodified.
+    With asyncio the target is the event loop thread: samples parked in the
+    selector are time spent awaiting I/O, everything else is on-CPU work.
+    """
+
+    def __init__(self, interval: float = 0.005, thread_id: Optional[int] = None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.stacks: Counter = Counter()
+        self.started_at = 0.0
+        self.stopped_at = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.stopped_at = time.perf_counter()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[self._collect(frame)] += 1
+
+    @staticmethod
+    def _collect(frame) -> Tuple[Frame, ...]:
+        stack: List[Frame] = []
+        while frame is not None and len(stack) < MAX_STACK_DEPTH:
+            code = frame.f_code
+            stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+            frame = frame.f_back
+        stack.reverse()
+        return tuple(stack)
+
+    @staticmethod
+    def is_idle(stack: Tuple[Frame, ...]) -> bool:
+        if not stack:
+            return True
+        name, filename, _ = stack[-1]
+        return filename.endswith(IDLE_FILES) or name in IDLE_FUNCTIONS
+
+    @property
+    def wall_time(self) -> float:
+        return (self.stopped_at or time.perf_counter()) - self.started_at
+
+    @property
+    def sample_count(self) -> int:
+        return sum(self.stacks.values())
+
+    def busy_time(self) -> float:
+        """Estimated time the thread spent running Python code rather than waiting"""
+        busy = sum(count for stack, count in self.stacks.items() if not self.is_idle(stack))
+        return busy * self.interval
+
+    def to_speedscope(self, name: str) -> dict:
+        """Render the samples in speedscope's 'sampled' file format"""
+        frame_index: Dict[Frame, int] = {}
+        frames = []
+        samples = []
+        weights = []
+        for stack, count in self.stacks.items():
+            indices = []
+            for frame in stack:
+                index = frame_index.get(frame)
+                if index is None:
+                    index = frame_index[frame] = len(frames)
+                    frames.append({"name": frame[0], "file": frame[1], "line": frame[2]})
+                indices.append(index)
+            samples.append(indices)
+            weights.append(count * self.interval)
+
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": self.wall_time,
+                "samples": samples,
+                "weights": weights,
+            }],
+            "name": name,
+            "activeProfileIndex": 0,
+            "exporter": "earth-ai-sampling-profiler",
+        }
+
+    def to_collapsed(self) -> str:
+        """Render the samples as folded stacks for flamegraph.pl / inferno"""
+        lines = []
+        for stack, count in self.stacks.items():
+            folded = ";".join(f"{name} ({os.path.basename(filename)}:{line})" for name, filename, line in stack)
+            lines.append(f"{folded} {count}")
+        return "\n".join(lines) + "\n"
+
+
+PROFILE_SUFFIXES = (".speedscope.json", ".folded", ".summary.json")
+
+
+def prune_profiles(output_dir: str, max_profiles: int) -> int:
+    """Delete the files of all but the newest `max_profiles` profiles; returns how many profiles went"""
+    if max_profiles <= 0:
+        return 0
+    latest: Dict[str, float] = {}
+    for entry in os.scandir(output_dir):
+        for suffix in PROFILE_SUFFIXES:
+            if entry.name.endswith(suffix) and entry.is_file():
+                profile_id = entry.name[:-len(suffix)]
+                latest[profile_id] = max(latest.get(profile_id, 0.0), entry.stat().st_mtime)
+                break
+    expired = sorted(latest, key=latest.get)[:-max_profiles]
+    for profile_id in expired:
+        for suffix in PROFILE_SUFFIXES:
+            try:
+                os.remove(os.path.join(output_dir, profile_id + suffix))
+            except FileNotFoundError:
+                pass
+    return len(expired)
+
+
+def write_profile(output_dir: str, profile_id: str, profiler: SamplingProfiler, summary: dict,
+                  max_profiles: int = 0) -> str:
+    """
+    Write speedscope, folded-stack and summary files, then prune the oldest
+    profiles beyond `max_profiles` (0 keeps all); returns the speedscope path
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    base = os.path.join(output_dir, profile_id)
+
+    name = (
+        f"{summary['method']} {summary['path']} wall={summary['wall_seconds'] * 1000:.1f}ms "
+        + " ".join(f"{dep}={seconds * 1000:.1f}ms" for dep, seconds in summary["awaiting_seconds"].items())
+        + f" cpu={summary['cpu_seconds'] * 1000:.1f}ms"
+    )
+
+    with open(f"{base}.speedscope.json", "w") as f:
+        json.dump(profiler.to_speedscope(name), f)
+    with open(f"{base}.folded", "w") as f:
+        f.write(profiler.to_collapsed())
+    with open(f"{base}.summary.json", "w") as f:
+        json.dump(summary, f, indent=2)
+
+    logger.info(f"📈 Profile written to {base}.speedscope.json ({name})")
+    pruned = prune_profiles(output_dir, max_profiles)
+    if pruned:
+        logger.info(f"Pruned {pruned} old profile(s) from {output_dir}")
+    return f"{base}.speedscope.json"
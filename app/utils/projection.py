@@ -0,0 +1,103 @@
+import typing
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+from fastapi import HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from app.utils.codec import JSONBytesResponse, ModelCodec, codec_for
+
+# API field name -> Mongo field name
+FIELD_ALIASES = {"id": "_id"}
+
+
+def _unwrap_model(annotation):
+    """List[UserResponse] / Optional[UserResponse] -> UserResponse"""
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation
+    for arg in typing.get_args(annotation):
+        model = _unwrap_model(arg)
+        if model is not None:
+            return model
+    return None
+
+
+@lru_cache(maxsize=None)
+def model_fields(model) -> Tuple[str, ...]:
+    """Field names a response model serializes"""
+    return tuple(model.model_fields)
+
+
+def mongo_projection(fields: Optional[Tuple[str, ...]]) -> Optional[Dict[str, int]]:
+    """Mongo projection for a tuple of API field names; None means the full document"""
+    if not fields:
+        return None
+    return {FIELD_ALIASES.get(field, field): 1 for field in fields}
+
+
+def project(document: Optional[dict], fields: Optional[Tuple[str, ...]]) -> Optional[dict]:
+    """Apply the same projection in memory (used for cached full documents); id is always kept, as Mongo keeps _id"""
+    if document is None or not fields:
+        return document
+    return {field: value for field, value in document.items() if field == "id" or field in fields}
+
+
+class FieldSelection:
+    """Fields an endpoint needs from Mongo, and how to return them"""
+
+    def __init__(self, fields: Optional[Tuple[str, ...]], partial: bool, codec: Optional[ModelCodec] = None):
+        self.fields = fields
+        # True when the client asked for a subset the response model can't validate
+        self.partial = partial
+        self.codec = codec
+
+    def respond(self, data, response: Optional[Response] = None):
+        """
+        Encode stored documents straight to JSON with the response model's codec,
+        skipping FastAPI's re-validation of what we just read from Mongo.
+        `response` is the endpoint's injected Response; its headers carry over.
+        """
+        headers = dict(response.headers) if response is not None else None
+        if self.codec is not None:
+            return JSONBytesResponse(self.codec.encode(data, self.fields), headers=headers)
+        if self.partial:
+            return JSONResponse(jsonable_encoder(data), headers=headers)
+        return data
+
+
+_route_models: Dict[object, Optional[type]] = {}
+
+
+def _response_model(request: Request):
+    endpoint = request.scope.get("endpoint")
+    if endpoint not in _route_models:
+        route = request.scope.get("route")
+        if route is None:
+            route = next((r for r in request.app.router.routes if getattr(r, "endpoint", None) is endpoint), None)
+        _route_models[endpoint] = _unwrap_model(getattr(route, "response_model", None))
+    return _route_models[endpoint]
+
+
+def response_fields(
+        request: Request,
+        fields: Optional[str] = Query(None, description="Comma-separated subset of fields to return; id is always included")
+) -> FieldSelection:
+    """
+    Dependency deriving the Mongo projection from the route's response model,
+    optionally narrowed by a `fields=` query parameter.
+    """
+    model = _response_model(request)
+    allowed = model_fields(model) if model is not None else None
+    codec = codec_for(model) if model is not None else None
+
+    if not fields:
+        return FieldSelection(allowed, partial=False, codec=codec)
+
+    requested = tuple(dict.fromkeys(field.strip() for field in fields.split(",") if field.strip()))
+    if allowed is not None:
+        unknown = [field for field in requested if field not in allowed]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return FieldSelection(requested, partial=True, codec=codec)
@@ -0,0 +1,44 @@
+import logging
+from typing import Dict, Iterable
+
+logger = logging.getLogger("readiness")
+
+PENDING = "pending"
+READY = "ready"
+
+
+class Readiness:
+    """Tracks warm-up state per dependency; ready once every critical one is warm"""
+
+    def __init__(self):
+        self.critical = set()
+        self.dependencies: Dict[str, str] = {}
+        self.draining = False
+
+    def reset(self, dependencies: Iterable[str], critical: Iterable[str]):
+        self.critical = set(critical)
+        self.dependencies = {name: PENDING for name in dependencies}
+        self.draining = False
+
+    def mark(self, name: str, state: str):
+        was_ready = self.is_ready()
+        self.dependencies[name] = state
+        if state == READY:
+            logger.info(f"✅ {name} is warm")
+        if self.is_ready() and not was_ready:
+            logger.info("🟢 All critical dependencies are warm, ready for traffic")
+
+    def is_ready(self) -> bool:
+        return not self.draining and all(self.dependencies.get(name) == READY for name in self.critical)
+
+    def snapshot(self) -> dict:
+        return {
+            "ready": self.is_ready(),
+            "draining": self.draining,
+            "critical": sorted(self.critical),
+            "dependencies": dict(self.dependencies),
+        }
+
+
+# Create a singleton instance
+readiness = Readiness()
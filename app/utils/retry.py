@@ -0,0 +1,47 @@
+import asyncio
+import logging
+import random
+from typing import Awaitable, Callable, Iterator, Optional
+
+logger = logging.getLogger("retry")
+
+
+def backoff_delay(attempt: int, base_delay: float = 0.5, max_delay: float = 30.0, factor: float = 2.0) -> float:
+    """Exponential backoff with full jitter for the n-th retry (0-based): uniform(0, min(max_delay, base * factor**n))"""
+    return random.uniform(0, min(max_delay, base_delay * factor ** attempt))
+
+
+def backoff_delays(base_delay: float = 0.5, max_delay: float = 30.0, factor: float = 2.0) -> Iterator[float]:
+    """Successive backoff_delay values, for retry loops"""
+    attempt = 0
+    while True:
+        yield backoff_delay(attempt, base_delay, max_delay, factor)
+        attempt += 1
+
+
+async def retry_with_backoff(operation: Callable[[], Awaitable], name: str,
+                             base_delay: float = 0.5, max_delay: float = 30.0,
+                             max_attempts: Optional[int] = None):
+    """
+    Await `operation` until it returns a truthy value without raising.
+    Retries forever unless max_attempts is given; returns the last result.
+    """
+    delays = backoff_delays(base_delay, max_delay)
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            result = await operation()
+            if result:
+                return result
+            logger.warning(f"{name} not available (attempt {attempt})")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            result = None
+            logger.warning(f"{name} failed (attempt {attempt}): {e}")
+        if max_attempts is not None and attempt >= max_attempts:
+            return result
+        delay = next(delays)
+        logger.info(f"Retrying {name} in {delay:.1f}s...")
+        await asyncio.sleep(delay)
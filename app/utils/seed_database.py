@@ -1,27 +1,65 @@
+# Seed the companies collection: python -m app.utils.seed_database [--force]
+import argparse
+import asyncio
 import logging
+import runpy
+from typing import List
 
-from app.models import Company
-from scripts.data.seed_data import companies
+from dotenv import load_dotenv
+
+from app.config.config import settings
+from app.db.company_repository import COMPANIES_COLLECTION, count_companies, ensure_company_indexes, insert_companies
+from app.db.database import close_mongo_connection, connect_to_mongo, db
+from app.utils.geocoding import Gazetteer, get_gazetteer
 
 logger = logging.getLogger(__name__)
 
 
+def load_seed_companies(path: str = settings.SEED_DATA_PATH) -> List[dict]:
+    # migration-scripts isn't an importable package, so the file is run by path
+    return runpy.run_path(path)["companies"]
+
+
+def geocode_companies(companies: List[dict], gazetteer: Gazetteer) -> List[dict]:
+    """Copies of the companies with a GeoJSON `geo` point resolved from their `location`"""
+    geocoded = []
+    for company in companies:
+        point = gazetteer.geocode(company["location"]) if company.get("location") else None
+        if point is None:
+            logger.warning(f"No gazetteer entry for {company.get('name')} at {company.get('location')!r}; "
+                           f"it won't show up in nearby searches")
+        geocoded.append(dict(company, geo=point.model_dump() if point else None))
+    return geocoded
+
+
+async def seed_companies(companies: List[dict], gazetteer: Gazetteer, force: bool = False) -> int:
+    """Insert the geocoded companies unless some exist already (or `force` replaces them)"""
+    count = await count_companies()
+    if count and not force:
+        logger.info(f"Database already contains {count} companies. Skipping seed.")
+        return 0
+    if count:
+        await db.get_collection(COMPANIES_COLLECTION).delete_many({})
 
-def seed_companies():
+    logger.info("Seeding companies...")
+    inserted = await insert_companies(geocode_companies(companies, gazetteer))
+    await ensure_company_indexes()
+    logger.info(f"Successfully seeded {inserted} companies into the database.")
+    return inserted
+
+
+async def main(force: bool):
+    if not await connect_to_mongo():
+        raise SystemExit("Could not connect to MongoDB")
     try:
-        # Check if companies already exist
-        count = Company.objects.count()
-        
-        if count == 0:
-            logger.info("No companies found in database. Seeding initial data...")
-            
-            # Insert all companies from seed data
-            for company_data in companies:
-                company = Company(**company_data)
-                company.save()
-            
-            logger.info(f"Successfully seeded {len(companies)} companies into the database.")
-        else:
-            logger.info(f"Database already contains {count} companies. Skipping seed.")
-    except Exception as error:
-        logger.error(f"Error seeding companies: {str(error)}")
+        await seed_companies(load_seed_companies(), get_gazetteer(), force=force)
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Seed companies, geocoded from the offline gazetteer")
+    parser.add_argument("--force", action="store_true", help="replace existing companies")
+    asyncio.run(main(parser.parse_args().force))
@@ -0,0 +1,64 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable
+
+from app.utils.metrics import registry
+
+SINGLEFLIGHT_CALLS = registry.counter(
+    "singleflight_calls_total",
+    "Lookups by group; outcome=coalesced means the caller shared another caller's in-flight query",
+    ("group", "outcome"),
+)
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls for the same key into one in-flight awaitable.
+
+    The shared call runs as its own task, so a caller being cancelled never
+    cancels the query for the others. `forget(key)` detaches the in-flight call
+    after a write, so later callers start a fresh query instead of joining a
+    stale one; a forgotten call's result is not written to the cache either.
+    """
+
+    def __init__(self, group: str):
+        self.group = group
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._leader = SINGLEFLIGHT_CALLS.labels(group, "leader")
+        self._coalesced = SINGLEFLIGHT_CALLS.labels(group, "coalesced")
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable], cache=None):
+        task = self._inflight.get(key)
+        if task is not None:
+            self._coalesced.inc()
+            result = await asyncio.shield(task)
+            # Followers get their own copy so nobody mutates a shared dict
+            return dict(result) if isinstance(result, dict) else result
+
+        self._leader.inc()
+        task = asyncio.ensure_future(fn())
+        self._inflight[key] = task
+        task.add_done_callback(lambda done: self._finish(key, done, cache))
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Task, cache):
+        current = self._inflight.get(key) is task
+        if current:
+            del self._inflight[key]
+        if task.cancelled():
+            return
+        # Always retrieve the exception so an unawaited failure isn't logged as lost
+        if task.exception() is None and current and cache is not None and task.result() is not None:
+            result = task.result()
+            cache.set(key, dict(result) if isinstance(result, dict) else result)
+
+    def forget(self, key: Hashable):
+        self._inflight.pop(key, None)
+
+    def forget_where(self, predicate: Callable[[Hashable], bool]):
+        """Forget every in-flight key the predicate matches, e.g. all projections of one user"""
+        for key in [key for key in self._inflight if predicate(key)]:
+            self._inflight.pop(key, None)
+
+    @property
+    def inflight(self) -> int:
+        return len(self._inflight)
@@ -0,0 +1,91 @@
+import asyncio
+import logging
+import time
+from typing import Dict
+
+import httpx
+
+from app.config.config import settings
+from app.db.company_repository import ensure_company_indexes
+from app.db.database import connect_to_mongo, warm_mongo_pool
+from app.db.journey_repository import ensure_journey_collection
+from app.db.user_repository import ensure_user_indexes
+from app.db.verification_repository import ensure_verification_indexes
+from app.infrastructure.ai_engine import get_ai_engine
+from app.services.s3_service import get_storage_service
+from app.utils.readiness import READY, readiness
+from app.utils.retry import retry_with_backoff
+
+logger = logging.getLogger("warmup")
+
+# Cheap routes that exercise routing, middleware and response serialization
+WARMUP_PATHS = ("/health", "/")
+
+
+async def warm_up_app(app, paths=WARMUP_PATHS, rounds: int = 3):
+    """
+    Run a few in-process requests through the full ASGI stack and build the
+    OpenAPI schema, so the first real requests a worker serves don't pay for
+    lazy initialization.
+    """
+    start = time.perf_counter()
+    try:
+        app.openapi()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://warmup") as client:
+            for _ in range(rounds):
+                for path in paths:
+                    await client.get(path)
+        logger.info(f"🔥 Worker warmed up in {(time.perf_counter() - start) * 1000:.1f}ms")
+    except Exception as e:
+        logger.error(f"Worker warm-up failed: {e}")
+
+
+async def warm_mongo() -> bool:
+    """Connect, fill the connection pool and make sure the indexes exist"""
+    if not await connect_to_mongo():
+        return False
+    await warm_mongo_pool()
+    try:
+        # $geoNear fails without its 2dsphere index; creating an existing index is a no-op
+        await asyncio.gather(ensure_user_indexes(), ensure_company_indexes(), ensure_verification_indexes(),
+                             ensure_journey_collection())
+    except Exception as e:
+        logger.error(f"Creating indexes failed: {e}")
+    return True
+
+
+async def warm_s3() -> bool:
+    """Create the boto3 client and load signing state off the event loop"""
+    return await asyncio.to_thread(get_storage_service().warm_up)
+
+
+async def warm_langgraph() -> bool:
+    """Resolve and cache the default assistant used by every run"""
+    return bool(await get_ai_engine().get_default_assistant())
+
+
+DEPENDENCY_WARMERS = {
+    "mongo": warm_mongo,
+    "s3": warm_s3,
+    "langgraph": warm_langgraph,
+}
+
+
+async def _warm(name: str, warmer):
+    await retry_with_backoff(
+        warmer,
+        f"{name} warm-up",
+        base_delay=settings.RECONNECT_BASE_DELAY,
+        max_delay=settings.RECONNECT_MAX_DELAY,
+    )
+    readiness.mark(name, READY)
+
+
+def start_dependency_warmups() -> Dict[str, asyncio.Task]:
+    """Warm every dependency concurrently; each retries with backoff until it succeeds"""
+    readiness.reset(DEPENDENCY_WARMERS, settings.CRITICAL_DEPENDENCIES)
+    return {
+        name: asyncio.create_task(_warm(name, warmer), name=f"warmup-{name}")
+        for name, warmer in DEPENDENCY_WARMERS.items()
+    }
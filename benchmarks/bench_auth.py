@@ -0,0 +1,189 @@
+"""
+Logins per second and authenticated requests per second.
+
+Logins: POST /api/auth/login at a given concurrency with bcrypt run inline on
+the event loop (what calling pwd_context from an endpoint would do) and in the
+thread or process pool at several sizes. While logins run, GET /health is
+polled to show how long the event loop is blocked.
+
+Authenticated requests: TokenVerifier.verify on its own and GET /api/auth/me,
+with the verified-token cache and without it (every request decodes and checks
+the signature).
+
+    python -m benchmarks.bench_auth --workers 1 2 4 --concurrency 16 --output results/auth.json
+    python -m benchmarks.bench_auth --rounds 12 --executor process --logins 200
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+from typing import List
+
+# Read by Settings when app.config is first imported, below
+os.environ.setdefault("AWS_REGION", "us-east-1")
+# Every request comes from one client address; keep the per-client buckets out of the numbers
+os.environ.setdefault("ADMISSION_ENABLED", "false")
+
+import httpx
+from bson import ObjectId
+
+from benchmarks.bench_user_repository import measure, use_backend, _user_template
+from benchmarks.common import compare, print_table, run_metadata, summarize, write_results
+
+
+async def seed(size: int, password: str) -> List[str]:
+    """Users sharing one hash: hashing each would take size * bcrypt time"""
+    from app.db.database import db
+    from app.services.auth_service import _hash
+
+    users = db.get_collection("users")
+    await users.drop()
+    await users.create_index("email", unique=True)
+    hashed_password = _hash(password)
+    template = _user_template()
+    result = await users.insert_many([
+        dict(template, _id=ObjectId(), email=f"auth-{i}@example.com", username=f"auth-{i}",
+             hashed_password=hashed_password)
+        for i in range(size)
+    ], ordered=False)
+    return [str(_id) for _id in result.inserted_ids]
+
+
+def provide(value):
+    """Async dependency override, so the override itself adds no threadpool hop"""
+    async def dependency():
+        return value
+
+    return dependency
+
+
+def inline_hasher_class():
+    from app.services.auth_service import PasswordHasher
+
+    class InlineHasher(PasswordHasher):
+        """Baseline: bcrypt on the event loop thread"""
+
+        async def _run(self, operation, func, *args):
+            return func(*args)
+
+    return InlineHasher
+
+
+async def bench_logins(client, app, hasher, args) -> dict:
+    from app.services.auth_service import get_password_hasher
+
+    app.dependency_overrides[get_password_hasher] = provide(hasher)
+    health: List[float] = []
+    done = asyncio.Event()
+
+    async def poll_health():
+        # What every other request on this worker experiences during the login burst
+        while not done.is_set():
+            start = time.perf_counter()
+            await client.get("/health")
+            health.append(time.perf_counter() - start)
+            await asyncio.sleep(0.01)
+
+    async def login(i):
+        response = await client.post("/api/auth/login", json={
+            "email": f"auth-{i % args.users}@example.com", "password": args.password})
+        response.raise_for_status()
+
+    poller = asyncio.ensure_future(poll_health())
+    try:
+        result = await measure(login, args.logins, args.concurrency)
+    finally:
+        done.set()
+        await poller
+        app.dependency_overrides.pop(get_password_hasher, None)
+        hasher.shutdown()
+    loop_stall = summarize(health, 1.0)
+    result["health_p99_ms"] = loop_stall["p99_ms"]
+    result["health_max_ms"] = loop_stall["max_ms"]
+    return result
+
+
+async def main(args):
+    from app.main import app
+    from app.services.auth_service import PasswordHasher, TokenVerifier, get_token_verifier, pwd_context
+    from app.utils.cache import TTLCache
+
+    pwd_context.update(bcrypt__rounds=args.rounds)
+    logging.getLogger().setLevel(logging.WARNING)
+    await use_backend(args)
+    print(f"Seeding {args.users} users (bcrypt rounds={args.rounds})...")
+    ids = await seed(args.users, args.password)
+
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://testserver", timeout=120)
+    results = {}
+    try:
+        hashers = {"inline": inline_hasher_class()(workers=1)}
+        for workers in args.workers:
+            hashers[f"{args.executor}x{workers}"] = PasswordHasher(workers, args.executor, max_pending=args.logins)
+        for name, hasher in hashers.items():
+            results[f"login[{name}]"] = await bench_logins(client, app, hasher, args)
+
+        secret = "bench-secret"
+        verifiers = {
+            "cached": TokenVerifier(secret, cache=TTLCache("bench_token", 3600, args.users)),
+            "uncached": TokenVerifier(secret),
+        }
+        tokens = [verifiers["cached"].issue({"id": user_id, "email": f"auth-{i}@example.com"})[0]
+                  for i, user_id in enumerate(ids)]
+        for name, verifier in verifiers.items():
+            async def verify(i):
+                verifier.verify(tokens[i % len(tokens)])
+
+            async def me(i):
+                response = await client.get(
+                    "/api/auth/me", headers={"Authorization": f"Bearer {tokens[i % len(tokens)]}"})
+                response.raise_for_status()
+
+            results[f"verify[{name}]"] = await measure(verify, args.requests, 1)
+            app.dependency_overrides[get_token_verifier] = provide(verifier)
+            try:
+                results[f"me[{name}]"] = await measure(me, args.requests, args.concurrency)
+            finally:
+                app.dependency_overrides.pop(get_token_verifier, None)
+    finally:
+        await client.aclose()
+
+    metadata = run_metadata(
+        "auth",
+        backend=args.backend,
+        users=args.users,
+        rounds=args.rounds,
+        executor=args.executor,
+        workers=args.workers,
+        logins=args.logins,
+        requests=args.requests,
+        concurrency=args.concurrency,
+    )
+    document = write_results(args.output, metadata, results)
+    print_table(results, columns=("ops", "throughput_ops_per_sec", "p50_ms", "p99_ms", "health_p99_ms"))
+    if args.compare:
+        compare(args.compare, document, metric="throughput_ops_per_sec")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Login and authenticated request throughput")
+    parser.add_argument("--backend", choices=["fake", "mongo"], default="fake")
+    parser.add_argument("--mongo-uri", default="mongodb://localhost:27017")
+    parser.add_argument("--db-name", default="earth_ai_bench")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--password", default="correct horse battery")
+    parser.add_argument("--rounds", type=int, default=10, help="bcrypt cost factor (production default is 12)")
+    parser.add_argument("--executor", choices=["thread", "process"], default="thread")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="hashing pool sizes to compare")
+    parser.add_argument("--logins", type=int, default=100, help="logins per hashing variant")
+    parser.add_argument("--requests", type=int, default=5000, help="authenticated requests per verifier variant")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated round trip for the fake (seconds)")
+    parser.add_argument("--output", help="write JSON results to this path")
+    parser.add_argument("--compare", help="earlier JSON result file to compare throughput against")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,132 @@
+"""
+How long a cached user stays stale after another worker writes it.
+
+Caches users (USER_CACHE_TTL, 60s here) and starts the change stream
+listener, then plays the other worker: updates users straight through the
+collection, without this process's invalidate_user, and polls get_user until
+the change shows. Reports that lag with the stream open, after the stream was
+interrupted and resumed (fake backend only; writes made while it was down are
+replayed from the resume token), and, for reference, the TTL it would
+otherwise take.
+
+Change streams need a replica set; a local single-node one will do:
+
+    docker compose up -d mongo
+    python -m benchmarks.bench_cache_invalidation --backend mongo --mongo-uri "mongodb://localhost:27017/?replicaSet=rs0"
+    python -m benchmarks.bench_cache_invalidation --users 1000 --iterations 200
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import time
+
+# Read by Settings when app.config is first imported, below
+os.environ.setdefault("AWS_REGION", "us-east-1")
+os.environ.setdefault("USER_CACHE_TTL", "60")
+
+from bson import ObjectId
+
+from benchmarks.bench_user_repository import seed, use_backend
+from benchmarks.common import compare, print_table, run_metadata, summarize, write_results
+
+
+async def wait_until_fresh(user_id: str, username: str, timeout: float) -> float:
+    """Seconds until get_user returns the new username (timeout if it never does)"""
+    from app.db import user_repository
+
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        user = await user_repository.get_user(user_id)
+        if user and user["username"] == username:
+            return time.perf_counter() - start
+        await asyncio.sleep(0.001)
+    return timeout
+
+
+async def remote_update(user_id: str, username: str):
+    """Another worker's write: straight to Mongo, so nothing in this process is invalidated"""
+    from app.db.database import db
+
+    await db.get_collection("users").update_one({"_id": ObjectId(user_id)}, {"$set": {"username": username}})
+
+
+async def main(args):
+    from app.config.config import settings
+    from app.db import user_repository
+    from app.db.cache_invalidation import cache_invalidation
+    from app.db.database import db
+
+    logging.getLogger().setLevel(logging.WARNING)
+    await use_backend(args)
+    print(f"Seeding {args.users} users...")
+    ids = await seed(args.users, with_indexes=True)
+    rng = random.Random(args.seed)
+
+    cache_invalidation.start()
+    for _ in range(1000):
+        if cache_invalidation.is_open:
+            break
+        await asyncio.sleep(0.01)
+    else:
+        raise SystemExit("The change stream did not open; is the server a replica set?")
+
+    results = {}
+    lags = []
+    start = time.perf_counter()
+    for i in range(args.iterations):
+        user_id = rng.choice(ids)
+        await user_repository.get_user(user_id)  # cached now
+        await remote_update(user_id, f"renamed-{i}")
+        lags.append(await wait_until_fresh(user_id, f"renamed-{i}", args.timeout))
+    results["stale_for[stream_open]"] = summarize(lags, time.perf_counter() - start)
+
+    if args.backend == "fake":
+        lags = []
+        start = time.perf_counter()
+        for i in range(args.outages):
+            user_id = rng.choice(ids)
+            await user_repository.get_user(user_id)
+            db.db.interrupt_change_streams()
+            await asyncio.sleep(0)
+            # Written while the stream is down; seen once it resumes
+            await remote_update(user_id, f"outage-{i}")
+            lags.append(await wait_until_fresh(user_id, f"outage-{i}", args.timeout))
+        results["stale_for[stream_resumed]"] = summarize(lags, time.perf_counter() - start)
+
+    results["stale_for[ttl_only]"] = {"mean_ms": settings.USER_CACHE_TTL * 1000}
+    await cache_invalidation.stop()
+
+    metadata = run_metadata(
+        "cache_invalidation",
+        backend=args.backend,
+        users=args.users,
+        iterations=args.iterations,
+        user_cache_ttl=settings.USER_CACHE_TTL,
+        fallback_ttl=settings.CACHE_INVALIDATION_FALLBACK_TTL,
+    )
+    document = write_results(args.output, metadata, results)
+    print_table(results, columns=("ops", "mean_ms", "p50_ms", "p99_ms", "max_ms"))
+    if args.compare:
+        compare(args.compare, document, metric="mean_ms")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Staleness of cached users after writes by another worker")
+    parser.add_argument("--backend", choices=["fake", "mongo"], default="fake")
+    parser.add_argument("--mongo-uri", default="mongodb://localhost:27017/?replicaSet=rs0")
+    parser.add_argument("--db-name", default="earth_ai_bench")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--outages", type=int, default=10, help="stream interruptions (fake backend)")
+    parser.add_argument("--timeout", type=float, default=10.0, help="give up waiting for a change after this long")
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated round trip for the fake (seconds)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write JSON results to this path")
+    parser.add_argument("--compare", help="earlier JSON result file to compare staleness against")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
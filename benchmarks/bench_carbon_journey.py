@@ -0,0 +1,114 @@
+"""
+User reads before and after moving carbon_journey to its time-series collection.
+
+Seeds users with the history embedded the old way (one entry per day), reads
+them with get_user, runs the batch migration (app.utils.migrate_carbon_journey)
+and reads them again. Then serves the history the new way: every entry of a
+year vs. downsampled to weeks and months. Reports latency and BSON bytes per
+document or per history response.
+
+    python -m benchmarks.bench_carbon_journey --users 2000 --journey-entries 365 --output results/journey.json
+    python -m benchmarks.bench_carbon_journey --backend mongo --mongo-uri mongodb://localhost:27017
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import time
+
+# Read by Settings when app.config is first imported, below
+os.environ.setdefault("AWS_REGION", "us-east-1")
+
+import bson
+
+from benchmarks.bench_projection import seed
+from benchmarks.bench_user_repository import measure, use_backend
+from benchmarks.common import compare, print_table, run_metadata, write_results
+
+
+async def read_users(ids, rng, args) -> dict:
+    from app.db import user_repository
+
+    sizes = []
+
+    async def get_user(i):
+        user = await user_repository.get_user(rng.choice(ids))
+        sizes.append(len(bson.encode(user)))
+
+    result = await measure(get_user, args.iterations, args.concurrency)
+    result["bytes_per_doc"] = round(sum(sizes) / len(sizes)) if sizes else 0
+    return result
+
+
+async def main(args):
+    from app.db.journey_repository import JOURNEY_COLLECTION, ensure_journey_collection, find_journey
+    from app.db.database import db
+    from app.utils.migrate_carbon_journey import migrate_carbon_journeys
+
+    logging.getLogger().setLevel(logging.WARNING)
+    await use_backend(args)
+    await db.get_collection(JOURNEY_COLLECTION).drop()
+    await ensure_journey_collection()
+    rng = random.Random(args.seed)
+    print(f"Seeding {args.users} users with {args.journey_entries} embedded journey entries each...")
+    ids = await seed(args.users, args.journey_entries, rng)
+
+    results = {"get_user[embedded]": await read_users(ids, rng, args)}
+
+    start = time.perf_counter()
+    totals = await migrate_carbon_journeys(batch_size=args.batch_size)
+    elapsed = time.perf_counter() - start
+    results["migration"] = {"ops": totals["users"], "entries": totals["entries"], "batches": totals["batches"],
+                            "seconds": round(elapsed, 2), "users_per_s": round(totals["users"] / elapsed, 1)}
+
+    results["get_user[summary]"] = await read_users(ids, rng, args)
+    base = results["get_user[embedded]"]["bytes_per_doc"]
+    results["get_user[summary]"]["bytes_saved_pct"] = round(
+        (1 - results["get_user[summary]"]["bytes_per_doc"] / base) * 100, 1) if base else 0.0
+
+    for interval in ("raw", "week", "month"):
+        sizes = []
+
+        async def history(i):
+            points, _ = await find_journey(rng.choice(ids), interval=interval)
+            sizes.append(len(bson.encode({"points": points})))
+
+        result = await measure(history, args.iterations, args.concurrency)
+        result["bytes_per_doc"] = round(sum(sizes) / len(sizes)) if sizes else 0
+        results[f"history[{interval}]"] = result
+
+    metadata = run_metadata(
+        "carbon_journey",
+        backend=args.backend,
+        users=args.users,
+        journey_entries=args.journey_entries,
+        batch_size=args.batch_size,
+        iterations=args.iterations,
+        concurrency=args.concurrency,
+    )
+    document = write_results(args.output, metadata, results)
+    print_table(results, columns=("ops", "mean_ms", "p99_ms", "bytes_per_doc", "bytes_saved_pct", "users_per_s"))
+    if args.compare:
+        compare(args.compare, document, metric="mean_ms")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="User reads with an embedded vs. time-series carbon journey")
+    parser.add_argument("--backend", choices=["fake", "mongo"], default="fake")
+    parser.add_argument("--mongo-uri", default="mongodb://localhost:27017")
+    parser.add_argument("--db-name", default="earth_ai_bench")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--journey-entries", type=int, default=365, help="daily entries per user")
+    parser.add_argument("--batch-size", type=int, default=500, help="users per migration batch")
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated round trip for the fake (seconds)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write JSON results to this path")
+    parser.add_argument("--compare", help="earlier JSON result file to compare mean latency against")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,106 @@
+"""
+Cold-start cost of the API: import time of app.main in a fresh interpreter,
+the slowest modules according to -X importtime, and the time from spawning a
+single uvicorn worker to its first successful /health response.
+
+    python -m benchmarks.bench_cold_start --runs 10 --output results/cold_start.json
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+from typing import List
+
+import httpx
+
+from benchmarks.common import compare, print_table, run_metadata, summarize, write_results
+from benchmarks.fake_services import free_port
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+
+
+def measure_import(runs: int) -> List[float]:
+    durations = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET], capture_output=True, text=True, check=True)
+        durations.append(float(output.stdout.strip().splitlines()[-1]))
+    return durations
+
+
+def slowest_imports(limit: int) -> List[dict]:
+    """Modules with the largest cumulative import time, from -X importtime"""
+    output = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app.main"],
+                            capture_output=True, text=True, check=True)
+    rows = []
+    for line in output.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, self_us, cumulative_us, module = (part.strip() for part in line.replace("import time:", "|").split("|"))
+        rows.append({"module": module.strip(), "self_ms": int(self_us) / 1000, "cumulative_ms": int(cumulative_us) / 1000})
+    rows.sort(key=lambda row: row["cumulative_ms"], reverse=True)
+    return rows[:limit]
+
+
+def measure_first_health(timeout: float) -> float:
+    port = free_port()
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with code {process.returncode}")
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/health", timeout=0.5).status_code == 200:
+                    return time.perf_counter() - start
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.01)
+        raise TimeoutError(f"/health did not answer within {timeout}s")
+    finally:
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+def main(args):
+    os.environ.setdefault("AWS_REGION", "us-east-1")
+
+    results = {"import_app_main": summarize(measure_import(args.runs), 0.0)}
+    first_health = [measure_first_health(args.timeout) for _ in range(args.server_runs)]
+    results["first_health_response"] = summarize(first_health, 0.0)
+    offenders = slowest_imports(args.top)
+
+    metadata = run_metadata("cold_start", runs=args.runs, server_runs=args.server_runs)
+    metadata["slowest_imports"] = offenders
+    document = write_results(args.output, metadata, results)
+
+    print_table(results, columns=("ops", "mean_ms", "p50_ms", "max_ms"))
+    print("\nSlowest imports (cumulative):")
+    for row in offenders:
+        print(f"  {row['cumulative_ms']:>9.1f}ms  {row['module']}")
+    if args.compare:
+        compare(args.compare, document, metric="p50_ms")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Import time and time to first /health response")
+    parser.add_argument("--runs", type=int, default=10, help="fresh-interpreter imports of app.main")
+    parser.add_argument("--server-runs", type=int, default=3, help="uvicorn cold starts")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--output", help="write JSON results to this path")
+    parser.add_argument("--compare", help="earlier JSON result file to compare p50 against")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    main(parse_args())
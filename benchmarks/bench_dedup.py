@@ -0,0 +1,135 @@
+"""
+Content-hash deduplication of verification dispatches.
+
+Registers users against the S3 and LangGraph stand-ins and the Mongo fake,
+with a share of them (--duplicate-rate) re-submitting a photo pair someone
+else already had verified. Every user goes through the ai_dispatch job
+handler; the first verification of each pair is ingested so later
+duplicates can reuse it. Reports dispatch latency for new vs. reused
+submissions, LangGraph runs avoided, and the cost of hashing a photo when it
+is streamed vs. when its recorded hash is still valid (HEAD only).
+
+    python -m benchmarks.bench_dedup --users 200 --duplicate-rate 0.3 --langgraph-latency 0.2
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import time
+
+# Read by Settings when app.config is first imported, below
+os.environ.setdefault("AWS_REGION", "us-east-1")
+
+from benchmarks.bench_geotiff import build_geotiff
+from benchmarks.bench_user_repository import measure
+from benchmarks.common import compare, print_table, run_metadata, summarize, write_results
+from benchmarks.fake_mongo import FakeDatabase
+from benchmarks.fake_services import (
+    BackgroundServer, FakeS3Store, FaultConfig, create_fake_langgraph_app, create_fake_s3_app,
+)
+from benchmarks.load_registration import BUCKET, configure_environment
+
+
+async def main(args):
+    store = FakeS3Store()
+    s3 = await BackgroundServer(create_fake_s3_app(FaultConfig(latency=args.s3_latency), store)).start()
+    langgraph = await BackgroundServer(create_fake_langgraph_app(FaultConfig(latency=args.langgraph_latency))).start()
+    configure_environment(s3.url, langgraph_url=langgraph.url)
+
+    from bson import ObjectId
+
+    from app.db.database import db
+    from app.db.user_repository import insert_user
+    from app.db.verification_repository import ensure_verification_indexes
+    from app.jobs.handlers import dispatch_verification, ingest_verification_result
+    from app.requests.user import UserCreate
+    from app.services.s3_service import get_storage_service
+
+    logging.getLogger().setLevel(logging.WARNING)
+    db.db = FakeDatabase()
+    db.is_connected = True
+    await ensure_verification_indexes()
+    rng = random.Random(args.seed)
+    aerial_size = int(args.photo_mb * 1024 * 1024)
+
+    verified = []  # (ground, aerial) bodies of pairs whose verification was ingested
+    latencies = {"new": [], "reused": []}
+    start = time.perf_counter()
+    try:
+        for index in range(args.users):
+            user_id = ObjectId()
+            await insert_user(UserCreate(username=f"dedup{index}", email=f"dedup{index}@example.com",
+                                         avatar_url=None), user_id)
+            user_id = str(user_id)
+            if verified and rng.random() < args.duplicate_rate:
+                ground, aerial = rng.choice(verified)
+            else:
+                # A unique ground photo makes the pair unique
+                ground = b"\xff\xd8" + os.urandom(64 * 1024)
+                aerial = build_geotiff(aerial_size) if not verified else verified[0][1][:-16] + os.urandom(16)
+            store.put(BUCKET, f"ground_photo-{user_id}", ground, "image/jpeg")
+            store.put(BUCKET, f"aerial_photo-{user_id}", aerial, "image/tiff")
+
+            dispatch_start = time.perf_counter()
+            outcome = await dispatch_verification({
+                "user_id": user_id, "ground_key": f"ground_photo-{user_id}", "aerial_key": f"aerial_photo-{user_id}",
+            })
+            elapsed = time.perf_counter() - dispatch_start
+            if outcome.get("reused"):
+                latencies["reused"].append(elapsed)
+            else:
+                latencies["new"].append(elapsed)
+                await ingest_verification_result({"user_id": user_id, "thread_id": outcome["thread_id"]})
+                verified.append((ground, aerial))
+        wall = time.perf_counter() - start
+
+        results = {f"dispatch[{kind}]": summarize(values, wall) for kind, values in latencies.items() if values}
+        results["langgraph_runs"] = {"ops": len(latencies["new"]), "avoided": len(latencies["reused"])}
+
+        storage = get_storage_service()
+        key = f"aerial_photo-{user_id}"
+        known = await storage.content_hash(key)
+
+        async def streamed(i):
+            await storage.content_hash(key)
+
+        async def cached(i):
+            await storage.content_hash(key, known)
+
+        results[f"hash[streamed,{args.photo_mb:g}MB]"] = await measure(streamed, args.hash_iterations, 1)
+        results[f"hash[etag_unchanged,{args.photo_mb:g}MB]"] = await measure(cached, args.hash_iterations, 1)
+    finally:
+        await s3.stop()
+        await langgraph.stop()
+
+    metadata = run_metadata(
+        "dedup",
+        users=args.users,
+        duplicate_rate=args.duplicate_rate,
+        photo_mb=args.photo_mb,
+        langgraph_latency=args.langgraph_latency,
+        s3_latency=args.s3_latency,
+    )
+    document = write_results(args.output, metadata, results)
+    print_table(results, columns=("ops", "avoided", "mean_ms", "p50_ms", "p99_ms"))
+    if args.compare:
+        compare(args.compare, document, metric="mean_ms")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Verification dispatch with content-hash deduplication")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--duplicate-rate", type=float, default=0.3, help="share of users re-submitting a verified pair")
+    parser.add_argument("--photo-mb", type=float, default=10, help="size of the aerial photos")
+    parser.add_argument("--langgraph-latency", type=float, default=0.2)
+    parser.add_argument("--s3-latency", type=float, default=0.0)
+    parser.add_argument("--hash-iterations", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write JSON results to this path")
+    parser.add_argument("--compare", help="earlier JSON result file to compare mean latency against")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
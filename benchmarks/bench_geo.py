@@ -0,0 +1,135 @@
+"""
+Nearest-company queries ($geoNear) on a large synthetic catalog.
+
+Companies are scattered around the gazetteer's places (so density looks like
+real clusters of buyers, not uniform noise) with random score ranges and
+statuses. Each query starts from a random farm near a random place and asks
+for the closest matching companies, with and without the score filter, at a
+few search radii.
+
+Against the in-process fake (the default) $geoNear is a full scan, which is
+the baseline an index has to beat; run with --backend mongo to measure the
+2dsphere index itself.
+
+    python -m benchmarks.bench_geo --sizes 10000 100000 --backend mongo --output results/geo.json
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+from typing import List
+
+# Read by Settings when app.config is first imported, below
+os.environ.setdefault("AWS_REGION", "us-east-1")
+
+from benchmarks.bench_user_repository import measure, use_backend
+from benchmarks.common import compare, print_table, run_metadata, write_results
+
+SEED_BATCH_SIZE = 10_000
+STATUSES = ("Active", "Active", "Active", "Pending", "Closed")
+
+
+def _jitter(point: List[float], spread_km: float, rng: random.Random) -> dict:
+    # ~111km per degree; good enough for synthetic scatter
+    longitude = max(-180.0, min(180.0, point[0] + rng.gauss(0, spread_km / 111)))
+    latitude = max(-90.0, min(90.0, point[1] + rng.gauss(0, spread_km / 111)))
+    return {"type": "Point", "coordinates": [longitude, latitude]}
+
+
+async def seed(size: int, places: List[List[float]], spread_km: float, rng: random.Random):
+    from app.db.company_repository import COMPANIES_COLLECTION, ensure_company_indexes
+    from app.db.database import db
+
+    companies = db.get_collection(COMPANIES_COLLECTION)
+    await companies.drop()
+    await ensure_company_indexes()
+    for start in range(0, size, SEED_BATCH_SIZE):
+        batch = []
+        for i in range(start, min(start + SEED_BATCH_SIZE, size)):
+            minimum = rng.randint(30, 80)
+            batch.append({
+                "name": f"Company {i}",
+                "tagline": "Synthetic buyer",
+                "location": "synthetic",
+                "geo": _jitter(rng.choice(places), spread_km, rng),
+                "minimum_score": minimum,
+                "maximum_score": minimum + rng.randint(10, 30),
+                "carbon_credits_needed": rng.randint(10, 500),
+                "price_per_credit": rng.randint(10, 40),
+                "potential_earnings": rng.randint(500, 3000),
+                "status": rng.choice(STATUSES),
+            })
+        await companies.insert_many(batch, ordered=False)
+
+
+async def main(args):
+    from app.db.company_repository import find_nearby_companies
+    from app.requests.company import NearbyCompanyResponse
+    from app.utils.geocoding import get_gazetteer
+    from app.utils.projection import model_fields
+
+    logging.getLogger().setLevel(logging.WARNING)
+    await use_backend(args)
+    rng = random.Random(args.seed)
+    places = [point.coordinates for point in get_gazetteer().points()]
+    fields = model_fields(NearbyCompanyResponse)
+
+    results = {}
+    for size in args.sizes:
+        print(f"Seeding {size} companies around {len(places)} places...")
+        await seed(size, places, args.spread_km, rng)
+        for radius in args.radii_km:
+            for scored in (False, True):
+                returned = []
+
+                async def nearby(i):
+                    farm = _jitter(rng.choice(places), args.spread_km, rng)
+                    companies = await find_nearby_companies(
+                        farm, radius, args.limit,
+                        score=rng.randint(40, 90) if scored else None,
+                        status="Active",
+                        fields=fields,
+                    )
+                    returned.append(len(companies))
+
+                result = await measure(nearby, args.iterations, args.concurrency)
+                result["avg_results"] = round(sum(returned) / len(returned), 1) if returned else 0.0
+                results[f"nearby[{size},{radius:g}km,{'score' if scored else 'any'}]"] = result
+
+    metadata = run_metadata(
+        "geo",
+        backend=args.backend,
+        sizes=args.sizes,
+        radii_km=args.radii_km,
+        limit=args.limit,
+        spread_km=args.spread_km,
+        iterations=args.iterations,
+        concurrency=args.concurrency,
+    )
+    document = write_results(args.output, metadata, results)
+    print_table(results, columns=("ops", "throughput_ops_per_sec", "mean_ms", "p99_ms", "avg_results"))
+    if args.compare:
+        compare(args.compare, document, metric="p99_ms")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Latency of $geoNear nearest-company queries")
+    parser.add_argument("--backend", choices=["fake", "mongo"], default="fake")
+    parser.add_argument("--mongo-uri", default="mongodb://localhost:27017")
+    parser.add_argument("--db-name", default="earth_ai_bench")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--radii-km", type=float, nargs="+", default=[50, 500])
+    parser.add_argument("--spread-km", type=float, default=150, help="scatter of companies and farms around a place")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated round trip for the fake (seconds)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write JSON results to this path")
+    parser.add_argument("--compare", help="earlier JSON result file to compare p99 latency against")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,197 @@
+"""
+Aerial photo inspection: ranged header reads vs. downloading the whole GeoTIFF.
+
+Synthetic GeoTIFFs of a few sizes are put into the S3 stand-in
+(benchmarks/fake_services.py), both as cloud-optimized files (IFDs up front)
+and with the IFD trailing the pixel data, as some writers emit. Each is then
+inspected through StorageService with ranged GETs and, as the baseline, by
+downloading the object and parsing it in memory. A handful of invalid uploads
+(PNG, TIFF without georeferencing, truncated header) check they are rejected.
+
+    python -m benchmarks.bench_geotiff --sizes-mb 10 100 --s3-latency 0.02 --output results/geotiff.json
+"""
+import argparse
+import asyncio
+import logging
+import os
+import struct
+from typing import List, Optional, Tuple
+
+# Read by Settings when app.config is first imported, below
+os.environ.setdefault("AWS_REGION", "us-east-1")
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "bench")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "bench")
+
+from benchmarks.bench_user_repository import measure
+from benchmarks.common import compare, print_table, run_metadata, write_results
+from benchmarks.fake_services import BackgroundServer, FakeS3Store, FaultConfig, create_fake_s3_app
+
+BUCKET = "earth-ai-bench"
+TILE = 512
+
+# field type codes and struct formats, for the writer below
+SHORT, LONG, DOUBLE = 3, 4, 12
+FORMATS = {SHORT: "H", LONG: "I", DOUBLE: "d"}
+
+
+def _ifd(entries: List[Tuple[int, int, list]], offset: int, next_offset: int) -> bytes:
+    """A little-endian IFD placed at `offset`, its out-of-line values right after it"""
+    entries = sorted(entries)
+    table_size = 2 + 12 * len(entries) + 4
+    table = struct.pack("<H", len(entries))
+    extra = b""
+    for tag, field_type, values in entries:
+        data = struct.pack(f"<{len(values)}{FORMATS[field_type]}", *values)
+        if len(data) <= 4:
+            table += struct.pack("<HHI", tag, field_type, len(values)) + data.ljust(4, b"\0")
+        else:
+            table += struct.pack("<HHII", tag, field_type, len(values), offset + table_size + len(extra))
+            extra += data + b"\0" * (len(data) % 2)
+    return table + struct.pack("<I", next_offset) + extra
+
+
+def _image_entries(width: int, height: int, bands: int, data_offset: int, overview: bool) -> list:
+    tiles = -(-width // TILE) * -(-height // TILE)
+    tile_bytes = TILE * TILE * bands
+    entries = [
+        (256, LONG, [width]), (257, LONG, [height]), (258, SHORT, [8] * bands), (259, SHORT, [8]),
+        (262, SHORT, [2 if bands >= 3 else 1]), (277, SHORT, [bands]), (284, SHORT, [1]),
+        (322, SHORT, [TILE]), (323, SHORT, [TILE]),
+        # Offsets are not real: the parser must never need them
+        (324, LONG, [data_offset] * tiles), (325, LONG, [tile_bytes] * tiles),
+    ]
+    if overview:
+        entries.append((254, LONG, [1]))
+    return entries
+
+
+def build_geotiff(size: int, bands: int = 4, layout: str = "cog", georeferenced: bool = True,
+                  overviews: int = 3) -> bytes:
+    """A TIFF of about `size` bytes: UTM 37S (EPSG:32737) tiles around Nairobi, filler pixel data"""
+    width = height = max(int((size / bands) ** 0.5), TILE)
+    geo = [
+        (33550, DOUBLE, [0.5, 0.5, 0.0]),
+        (33922, DOUBLE, [0.0, 0.0, 0.0, 256000.0, 9860000.0, 0.0]),
+        (34735, SHORT, [1, 1, 0, 3, 1024, 0, 1, 1, 1025, 0, 1, 1, 3072, 0, 1, 32737]),
+    ] if georeferenced else []
+
+    def directories(start: int, data_offset: int) -> bytes:
+        levels = [(width, height, False)] + [(width >> level, height >> level, True)
+                                             for level in range(1, overviews + 1)]
+        blob = b""
+        for index, (w, h, overview) in enumerate(levels):
+            entries = _image_entries(w, h, bands, data_offset, overview) + ([] if overview else geo)
+            # Lay out once to learn the size, then again with the real next offset
+            draft = _ifd(entries, start + len(blob), 0)
+            last = index == len(levels) - 1
+            blob += _ifd(entries, start + len(blob), 0 if last else start + len(blob) + len(draft))
+        return blob
+
+    pixels = bytes(range(256)) * (max(size, 0) // 256 + 1)
+    if layout == "cog":
+        draft = directories(8, 0)
+        data_offset = 8 + len(draft)
+        header = b"II" + struct.pack("<HI", 42, 8)
+        return header + directories(8, data_offset) + pixels[:size]
+    # Pixel data first, IFDs at the end of the file
+    data_offset = 8
+    ifd_offset = 8 + size + size % 2
+    header = b"II" + struct.pack("<HI", 42, ifd_offset)
+    return header + pixels[:size] + b"\0" * (size % 2) + directories(ifd_offset, data_offset)
+
+
+def invalid_uploads() -> dict:
+    return {
+        "png": b"\x89PNG\r\n\x1a\n" + b"\0" * 4096,
+        "not_georeferenced": build_geotiff(1024 * 1024, georeferenced=False),
+        "truncated": build_geotiff(1024 * 1024)[:200],
+        "empty": b"",
+    }
+
+
+async def main(args):
+    store = FakeS3Store()
+    s3 = await BackgroundServer(create_fake_s3_app(FaultConfig(latency=args.s3_latency), store)).start()
+    os.environ["S3_ENDPOINT_URL"] = s3.url
+    os.environ["S3_BUCKET_NAME"] = BUCKET
+
+    from app.services.raster_service import inspect_aerial_photo
+    from app.services.s3_service import StorageService
+    from app.utils.geotiff import InvalidGeoTIFF, RangeReader, read_geotiff
+
+    logging.getLogger().setLevel(logging.WARNING)
+    storage = StorageService()
+
+    async def download_and_parse(key: str) -> Optional[int]:
+        """Baseline: fetch the whole object, then parse it from memory"""
+        body = await asyncio.to_thread(
+            lambda: storage.s3_client.get_object(Bucket=BUCKET, Key=key)["Body"].read()
+        )
+
+        async def local(offset: int, length: int):
+            return body[offset:offset + length], len(body)
+
+        try:
+            await read_geotiff(RangeReader(local, block_size=len(body) or 1, max_requests=1))
+        except InvalidGeoTIFF:
+            pass
+        return len(body)
+
+    results = {}
+    try:
+        for size_mb in args.sizes_mb:
+            for layout in ("cog", "trailing"):
+                key = f"aerial_photo-bench-{size_mb}mb-{layout}"
+                store.put(BUCKET, key, build_geotiff(int(size_mb * 1024 * 1024), layout=layout), "image/tiff")
+                metadata = await inspect_aerial_photo(storage, key)
+                assert metadata.valid, metadata.error
+
+                async def ranged(i):
+                    await inspect_aerial_photo(storage, key)
+
+                async def full(i):
+                    await download_and_parse(key)
+
+                label = f"{size_mb:g}MB,{layout}"
+                results[f"ranged[{label}]"] = await measure(ranged, args.iterations, args.concurrency)
+                results[f"ranged[{label}]"]["bytes_read"] = metadata.bytes_read
+                results[f"full_get[{label}]"] = await measure(full, max(args.iterations // 10, 1), args.concurrency)
+                results[f"full_get[{label}]"]["bytes_read"] = metadata.size
+
+        rejected = {}
+        for name, body in invalid_uploads().items():
+            key = f"aerial_photo-bench-{name}"
+            store.put(BUCKET, key, body, "image/tiff")
+            metadata = await inspect_aerial_photo(storage, key)
+            rejected[name] = metadata.error if not metadata.valid else "ACCEPTED"
+    finally:
+        await s3.stop()
+
+    metadata = run_metadata(
+        "geotiff",
+        sizes_mb=args.sizes_mb,
+        s3_latency=args.s3_latency,
+        iterations=args.iterations,
+        concurrency=args.concurrency,
+    )
+    document = write_results(args.output, metadata, results)
+    print_table(results, columns=("ops", "throughput_ops_per_sec", "mean_ms", "p99_ms", "bytes_read"))
+    for name, outcome in rejected.items():
+        print(f"{name:>18}: {outcome}")
+    if args.compare:
+        compare(args.compare, document, metric="p99_ms")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Ranged GeoTIFF header inspection vs. full downloads")
+    parser.add_argument("--sizes-mb", type=float, nargs="+", default=[10, 100])
+    parser.add_argument("--s3-latency", type=float, default=0.0, help="added latency per S3 request (seconds)")
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--output", help="write JSON results to this path")
+    parser.add_argument("--compare", help="earlier JSON result file to compare p99 latency against")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
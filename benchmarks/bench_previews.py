@@ -0,0 +1,172 @@
+"""
+Photo preview rendering: bounded decoding vs. decoding the full image.
+
+For synthetic photos of a few sizes (a JPEG, a tiled TIFF with overviews
+like a COG, and a plain TIFF) this compares app.services.preview_service's
+render_previews with a baseline that decodes the whole image before
+downscaling. Each render runs in a fresh process so its peak RSS can be
+reported. It then measures event loop lag (the longest a 5ms timer fires
+late) while previews render inline on the loop vs. in the process pool.
+
+    python -m benchmarks.bench_previews --megapixels 12 48 --output results/previews.json
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Read by Settings when app.config is first imported, below
+os.environ.setdefault("AWS_REGION", "us-east-1")
+
+from benchmarks.common import compare, print_table, run_metadata, write_results
+
+
+def make_photo(path: str, kind: str, megapixels: float):
+    from PIL import Image
+
+    width = int((megapixels * 1_000_000 * 1.5) ** 0.5)
+    height = int(width / 1.5)
+    # Noise over a gradient, so JPEG and TIFF sizes are realistic rather than tiny
+    base = Image.merge("RGB", [
+        Image.linear_gradient("L").resize((width, height)),
+        Image.effect_noise((width, height), 40),
+        Image.radial_gradient("L").resize((width, height)),
+    ])
+    if kind == "jpeg":
+        base.save(path, "JPEG", quality=90)
+    elif kind == "cog":
+        overviews = [base.reduce(2 ** level) for level in range(1, 5)]
+        base.save(path, "TIFF", save_all=True, append_images=overviews, tiled=True, compression="tiff_deflate")
+    else:
+        base.save(path, "TIFF", compression="tiff_deflate")
+
+
+def _peak_rss_mb() -> float:
+    # VmHWM, unlike ru_maxrss, is not inherited from the parent across fork/exec
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def render(source: str, bounded: bool) -> dict:
+    """One render in this (fresh) process: wall time and peak memory. Linux only (/proc)"""
+    output_dir = tempfile.mkdtemp(prefix="bench-previews-")
+    start = time.perf_counter()
+    try:
+        _render(source, output_dir, bounded)
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+    return {"ms": (time.perf_counter() - start) * 1000, "peak_rss_mb": _peak_rss_mb()}
+
+
+def _render(source: str, output_dir: str, bounded: bool):
+    from app.config.config import settings
+    from app.services.preview_service import _write_renditions, render_previews
+
+    if bounded:
+        render_previews(source, output_dir, dict(settings.PREVIEW_SIZES), settings.PREVIEW_TILE_SIZE,
+                        settings.PREVIEW_PYRAMID_MAX_SIZE, settings.PREVIEW_MAX_SOURCE_PIXELS,
+                        settings.PREVIEW_JPEG_QUALITY)
+    else:
+        from PIL import Image
+
+        Image.MAX_IMAGE_PIXELS = None
+        with Image.open(source) as image:
+            image.load()  # the whole image at full resolution
+            full = image.convert("RGB")
+        full.thumbnail((settings.PREVIEW_PYRAMID_MAX_SIZE,) * 2, Image.LANCZOS)
+        _write_renditions(full, output_dir, dict(settings.PREVIEW_SIZES), settings.PREVIEW_TILE_SIZE,
+                          settings.PREVIEW_JPEG_QUALITY)
+
+
+async def loop_lag(work) -> float:
+    """Worst lateness (ms) of a 5ms timer while `work` runs"""
+    worst = 0.0
+    done = asyncio.Event()
+
+    async def probe():
+        nonlocal worst
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.005)
+            worst = max(worst, time.perf_counter() - start - 0.005)
+
+    prober = asyncio.create_task(probe())
+    await asyncio.sleep(0.01)
+    await work()
+    done.set()
+    await prober
+    return round(worst * 1000, 2)
+
+
+async def main(args):
+    spawn = multiprocessing.get_context("spawn")
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="bench-photos-") as workdir:
+        sources = {}
+        for megapixels in args.megapixels:
+            for kind in args.kinds:
+                path = os.path.join(workdir, f"{kind}-{megapixels:g}mp")
+                # In a child process, so the parent doesn't hold the decoded photos
+                with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as pool:
+                    pool.submit(make_photo, path, kind, megapixels).result()
+                sources[(kind, megapixels)] = path
+
+        for (kind, megapixels), path in sources.items():
+            size_mb = round(os.path.getsize(path) / 1024 / 1024, 1)
+            for bounded in (False, True):
+                samples = []
+                for _ in range(args.runs):
+                    # A fresh process per run, so peak RSS is this render's alone
+                    with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as pool:
+                        samples.append(pool.submit(render, path, bounded).result())
+                label = f"{'bounded' if bounded else 'full_decode'}[{kind},{megapixels:g}MP]"
+                results[label] = {
+                    "file_mb": size_mb,
+                    "mean_ms": round(sum(s["ms"] for s in samples) / len(samples), 2),
+                    "peak_rss_mb": round(max(s["peak_rss_mb"] for s in samples), 1),
+                }
+
+        from app.services.preview_service import _preview_executor, shutdown_preview_executor
+
+        path = sources[(args.kinds[0], args.megapixels[-1])]
+        loop = asyncio.get_running_loop()
+        pool = _preview_executor()
+        # Start the pool's processes before measuring
+        await loop.run_in_executor(pool, _peak_rss_mb)
+
+        async def inline():
+            render(path, True)
+
+        async def pooled():
+            await loop.run_in_executor(pool, render, path, True)
+
+        results["loop_lag[inline]"] = {"max_lag_ms": await loop_lag(inline)}
+        results["loop_lag[process_pool]"] = {"max_lag_ms": await loop_lag(pooled)}
+        shutdown_preview_executor()
+
+    metadata = run_metadata("previews", megapixels=args.megapixels, kinds=args.kinds, runs=args.runs)
+    document = write_results(args.output, metadata, results)
+    print_table(results, columns=("file_mb", "mean_ms", "peak_rss_mb", "max_lag_ms"))
+    if args.compare:
+        compare(args.compare, document, metric="mean_ms")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Preview rendering time, memory and event loop impact")
+    parser.add_argument("--megapixels", type=float, nargs="+", default=[12, 48])
+    parser.add_argument("--kinds", nargs="+", choices=["jpeg", "cog", "tiff"], default=["jpeg", "cog", "tiff"])
+    parser.add_argument("--runs", type=int, default=2)
+    parser.add_argument("--output", help="write JSON results to this path")
+    parser.add_argument("--compare", help="earlier JSON result file to compare render time against")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,165 @@
+"""
+Bytes over the wire and latency of user reads with and without projection.
+
+Seeds users carrying a realistic carbon_journey and notification_preferences,
+then reads them three ways: the full document (the old behaviour), the
+projection derived from UserResponse, and a narrow fields= selection. Reports
+BSON bytes per document returned by the repository (savings against the full
+document) and JSON bytes per GET /api/users/{id} response (savings against the
+plain UserResponse).
+
+    python -m benchmarks.bench_projection --users 10000 --journey-entries 365 --output results/projection.json
+    python -m benchmarks.bench_projection --backend mongo --mongo-uri mongodb://localhost:27017
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+from datetime import datetime, timedelta
+from typing import List
+
+# Read by Settings when app.config is first imported, below
+os.environ.setdefault("AWS_REGION", "us-east-1")
+# Every read comes from one client address; keep the per-client buckets out of the numbers
+os.environ.setdefault("ADMISSION_ENABLED", "false")
+
+import bson
+import httpx
+from bson import ObjectId
+
+from benchmarks.bench_user_repository import measure, use_backend, _user_template
+from benchmarks.common import compare, print_table, run_metadata, write_results
+
+
+def _journey(entries: int, rng: random.Random) -> dict:
+    start = datetime(2024, 1, 1)
+    return {
+        (start + timedelta(days=day)).strftime("%Y-%m-%d"): {
+            "carbon_score": round(rng.uniform(0, 100), 2),
+            "credits": round(rng.uniform(0, 5), 3),
+            "note": "monthly verification" if day % 30 == 0 else "",
+        }
+        for day in range(entries)
+    }
+
+
+async def seed(size: int, journey_entries: int, rng: random.Random) -> List[str]:
+    from app.db.database import db
+
+    users = db.get_collection("users")
+    await users.drop()
+    template = _user_template()
+    batch = []
+    for i in range(size):
+        batch.append(dict(
+            template,
+            _id=ObjectId(),
+            email=f"proj-{i}@example.com",
+            username=f"proj-{i}",
+            ground_photo=f"ground_photo-{i}",
+            aerial_photo=f"aerial_photo-{i}",
+            notification_preferences={"email": True, "sms": False, "push": {"weekly": True, "credits": True}},
+            carbon_journey=_journey(journey_entries, rng),
+        ))
+    result = await users.insert_many(batch, ordered=False)
+    return [str(_id) for _id in result.inserted_ids]
+
+
+def bson_bytes(documents) -> int:
+    return sum(len(bson.encode(document)) for document in documents)
+
+
+async def main(args):
+    from app.db import user_repository
+    from app.main import app
+    from app.requests.user import UserResponse
+    from app.utils.projection import model_fields
+
+    logging.getLogger().setLevel(logging.WARNING)
+    await use_backend(args)
+    rng = random.Random(args.seed)
+    print(f"Seeding {args.users} users with {args.journey_entries} journey entries each...")
+    ids = await seed(args.users, args.journey_entries, rng)
+
+    variants = {
+        "full": (None, None),
+        "response_model": (model_fields(UserResponse), ""),
+        "narrow": (tuple(args.fields.split(",")), args.fields),
+    }
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://testserver")
+
+    results = {}
+    try:
+        for name, (fields, query) in variants.items():
+            sizes = {"get_user": [], "get_users": [], "http_user": []}
+
+            async def get_user(i):
+                sizes["get_user"].append(bson_bytes([await user_repository.get_user(rng.choice(ids), fields=fields)]))
+
+            async def get_users(i):
+                page = await user_repository.get_users(
+                    skip=rng.randrange(max(args.users - args.page_size, 1)), limit=args.page_size, fields=fields)
+                sizes["get_users"].append(bson_bytes(page) / max(len(page), 1))
+
+            params = {"fields": query} if query else {}
+
+            async def http_user(i):
+                response = await client.get(f"/api/users/{rng.choice(ids)}", params=params)
+                response.raise_for_status()
+                sizes["http_user"].append(len(response.content))
+
+            operations = [("get_user", get_user), ("get_users", get_users)]
+            if name != "full":
+                # The endpoint always answered with UserResponse; only fields= narrows it further
+                operations.append(("http_user", http_user))
+            for operation_name, operation in operations:
+                result = await measure(operation, args.iterations, args.concurrency)
+                samples = sizes[operation_name]
+                result["bytes_per_doc"] = round(sum(samples) / len(samples)) if samples else 0
+                results[f"{operation_name}[{name}]"] = result
+    finally:
+        await client.aclose()
+
+    for operation_name, baseline in (("get_user", "full"), ("get_users", "full"), ("http_user", "response_model")):
+        base = results[f"{operation_name}[{baseline}]"]["bytes_per_doc"]
+        for key, entry in results.items():
+            if key.startswith(f"{operation_name}["):
+                entry["bytes_saved_pct"] = round((1 - entry["bytes_per_doc"] / base) * 100, 1) if base else 0.0
+
+    metadata = run_metadata(
+        "projection",
+        backend=args.backend,
+        users=args.users,
+        journey_entries=args.journey_entries,
+        iterations=args.iterations,
+        concurrency=args.concurrency,
+        page_size=args.page_size,
+        fields=args.fields,
+    )
+    document = write_results(args.output, metadata, results)
+    print_table(results, columns=("ops", "mean_ms", "p99_ms", "bytes_per_doc", "bytes_saved_pct"))
+    if args.compare:
+        compare(args.compare, document, metric="mean_ms")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Bytes and latency of projected versus full user reads")
+    parser.add_argument("--backend", choices=["fake", "mongo"], default="fake")
+    parser.add_argument("--mongo-uri", default="mongodb://localhost:27017")
+    parser.add_argument("--db-name", default="earth_ai_bench")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--journey-entries", type=int, default=365, help="carbon_journey entries per user")
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--fields", default="id,username,is_verified", help="the narrow fields= selection")
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated round trip for the fake (seconds)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write JSON results to this path")
+    parser.add_argument("--compare", help="earlier JSON result file to compare mean latency against")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
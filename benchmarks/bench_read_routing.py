@@ -0,0 +1,111 @@
+"""
+List reads on the primary vs. routed to secondaries, under registration load.
+
+Seeds users, then runs get_users pages (the GET /api/users read) concurrently
+with batch registrations (create_users), once with the "users.list" route on
+the primary and once on secondaries with bounded staleness. Reports list
+latency and registrations per second for each. Against a single node (or the
+fake) both runs read the same server; use a replica set with secondaries:
+
+    python -m benchmarks.bench_read_routing --backend mongo \
+        --mongo-uri "mongodb://host1,host2,host3/?replicaSet=rs0" --size 100000
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import time
+import uuid
+
+# Read by Settings when app.config is first imported, below
+os.environ.setdefault("AWS_REGION", "us-east-1")
+
+from benchmarks.bench_user_repository import measure, seed, use_backend
+from benchmarks.common import compare, print_table, run_metadata, write_results
+
+
+async def run(mode: str, ids, args) -> dict:
+    from app.config.config import settings
+    from app.db import user_repository
+    from app.db.read_routing import read_preference
+    from app.requests.user import UserCreate
+
+    settings.READ_ROUTES["users.list"] = f"{mode}:{args.max_staleness}" if mode != "primary" else mode
+    read_preference.cache_clear()
+    rng = random.Random(args.seed)
+    run_id = uuid.uuid4().hex[:6]
+    registered = 0
+    done = asyncio.Event()
+
+    async def register():
+        nonlocal registered
+        batch = 0
+        while not done.is_set():
+            users = [UserCreate(email=f"route-{run_id}-{batch}-{i}@example.com",
+                                username=f"route-{run_id}-{batch}-{i}", avatar_url=None)
+                     for i in range(args.batch_size)]
+            outcomes = await user_repository.create_users(users)
+            registered += sum(1 for user, _ in outcomes if user)
+            batch += 1
+
+    async def list_users(i):
+        await user_repository.get_users(skip=rng.randrange(max(len(ids) - args.page_size, 1)), limit=args.page_size)
+
+    writers = [asyncio.create_task(register()) for _ in range(args.writers)]
+    start = time.perf_counter()
+    try:
+        result = await measure(list_users, args.iterations, args.concurrency)
+    finally:
+        done.set()
+        await asyncio.gather(*writers)
+    result["registrations_per_s"] = round(registered / (time.perf_counter() - start), 1)
+    return result
+
+
+async def main(args):
+    logging.getLogger().setLevel(logging.WARNING)
+    await use_backend(args)
+    print(f"Seeding {args.size} users...")
+    ids = await seed(args.size, with_indexes=True)
+
+    results = {}
+    for mode in ("primary", "secondaryPreferred"):
+        results[f"get_users[{mode}]"] = await run(mode, ids, args)
+
+    metadata = run_metadata(
+        "read_routing",
+        backend=args.backend,
+        size=args.size,
+        iterations=args.iterations,
+        concurrency=args.concurrency,
+        writers=args.writers,
+        max_staleness=args.max_staleness,
+    )
+    document = write_results(args.output, metadata, results)
+    print_table(results, columns=("ops", "mean_ms", "p50_ms", "p99_ms", "registrations_per_s"))
+    if args.compare:
+        compare(args.compare, document, metric="p99_ms")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="List read latency and write throughput by read preference")
+    parser.add_argument("--backend", choices=["fake", "mongo"], default="fake")
+    parser.add_argument("--mongo-uri", default="mongodb://localhost:27017/?replicaSet=rs0")
+    parser.add_argument("--db-name", default="earth_ai_bench")
+    parser.add_argument("--size", type=int, default=10_000)
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--writers", type=int, default=4, help="concurrent batch registrations")
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--max-staleness", type=int, default=90, help="maxStalenessSeconds for secondary reads")
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated round trip for the fake (seconds)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write JSON results to this path")
+    parser.add_argument("--compare", help="earlier JSON result file to compare p99 latency against")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
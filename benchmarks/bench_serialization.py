@@ -0,0 +1,141 @@
+"""
+Serialization cost per user for the list endpoints.
+
+Encodes pages of user documents, as get_users returns them, three ways:
+through the response model (validate, dump, json.dumps; what FastAPI does for
+a returned list), and through the codec with the standard library encoder and
+with orjson. Then measures GET /api/users end to end against the in-process
+Mongo fake. Reports microseconds per user.
+
+    python -m benchmarks.bench_serialization --page-sizes 10 100 1000 --output results/serialization.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import List
+
+# Read by Settings when app.config is first imported, below
+os.environ.setdefault("AWS_REGION", "us-east-1")
+# Every request comes from one client address; keep the per-client buckets out of the numbers
+os.environ.setdefault("ADMISSION_ENABLED", "false")
+
+import httpx
+from bson import ObjectId
+
+from benchmarks.bench_user_repository import use_backend, _user_template
+from benchmarks.common import compare, print_table, run_metadata, summarize, write_results
+
+
+def stored_users(count: int) -> List[dict]:
+    template = _user_template()
+    return [
+        dict(template, _id=ObjectId(), email=f"codec-{i}@example.com", username=f"codec-{i}",
+             ground_photo=f"users/{i}/ground_photo.jpg", aerial_photo=f"users/{i}/aerial_photo.tiff")
+        for i in range(count)
+    ]
+
+
+def time_per_user(encode, documents: List[dict], iterations: int) -> dict:
+    latencies = []
+    body = b""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        began = time.perf_counter()
+        body = encode(documents)
+        latencies.append(time.perf_counter() - began)
+    result = summarize(latencies, time.perf_counter() - start)
+    result["us_per_user"] = round(result["mean_ms"] * 1000 / len(documents), 3)
+    result["bytes_per_user"] = round(len(body) / len(documents))
+    return result
+
+
+async def main(args):
+    from fastapi.encoders import jsonable_encoder
+    from pydantic import TypeAdapter
+
+    from app.db.database import db
+    from app.db.user_repository import serialize_user
+    from app.main import app
+    from app.requests.user import UserResponse
+    from app.utils import codec
+    from app.utils.projection import model_fields, mongo_projection
+
+    logging.getLogger().setLevel(logging.WARNING)
+    adapter = TypeAdapter(List[UserResponse])
+    user_codec = codec.codec_for(UserResponse)
+    fields = model_fields(UserResponse)
+    projection = mongo_projection(fields)
+    has_orjson = codec.orjson is not None
+
+    def response_model(documents):
+        users = [serialize_user(dict(document)) for document in documents]
+        content = jsonable_encoder(adapter.dump_python(adapter.validate_python(users), mode="json"))
+        return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def codec_encode(documents):
+        return user_codec.encode([serialize_user(dict(document)) for document in documents], fields)
+
+    results = {}
+    for size in args.page_sizes:
+        documents = [{key: value for key, value in user.items() if key in projection} for user in stored_users(size)]
+        results[f"response_model[{size}]"] = time_per_user(response_model, documents, args.iterations)
+        orjson_module, codec.orjson = codec.orjson, None
+        try:
+            results[f"codec_json[{size}]"] = time_per_user(codec_encode, documents, args.iterations)
+        finally:
+            codec.orjson = orjson_module
+        if has_orjson:
+            results[f"codec_orjson[{size}]"] = time_per_user(codec_encode, documents, args.iterations)
+
+    await use_backend(args)
+    users = db.get_collection("users")
+    await users.drop()
+    await users.insert_many(stored_users(max(args.page_sizes)), ordered=False)
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://testserver")
+    try:
+        for size in args.page_sizes:
+            latencies = []
+            start = time.perf_counter()
+            for _ in range(args.iterations):
+                began = time.perf_counter()
+                response = await client.get("/api/users", params={"limit": size})
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - began)
+            result = summarize(latencies, time.perf_counter() - start)
+            result["us_per_user"] = round(result["mean_ms"] * 1000 / size, 3)
+            result["bytes_per_user"] = round(len(response.content) / size)
+            results[f"http_list[{size}]"] = result
+    finally:
+        await client.aclose()
+
+    metadata = run_metadata(
+        "serialization",
+        backend=args.backend,
+        page_sizes=args.page_sizes,
+        iterations=args.iterations,
+        orjson=has_orjson,
+    )
+    document = write_results(args.output, metadata, results)
+    print_table(results, columns=("ops", "mean_ms", "p99_ms", "us_per_user", "bytes_per_user"))
+    if args.compare:
+        compare(args.compare, document, metric="us_per_user")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Serialization cost per user of the list endpoints")
+    parser.add_argument("--backend", choices=["fake", "mongo"], default="fake")
+    parser.add_argument("--mongo-uri", default="mongodb://localhost:27017")
+    parser.add_argument("--db-name", default="earth_ai_bench")
+    parser.add_argument("--page-sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated round trip for the fake (seconds)")
+    parser.add_argument("--output", help="write JSON results to this path")
+    parser.add_argument("--compare", help="earlier JSON result file to compare per-user cost against")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,196 @@
+"""
+Throughput and latency of the user repository (app/db/user_repository.py).
+
+Seeds the users collection at one or more sizes, then measures create_user,
+get_user, get_users, update_user and delete_user. Runs against the in-process
+fake by default, or a real mongod with --backend mongo.
+
+    python -m benchmarks.bench_user_repository --sizes 10000 1000000 --output results/repo.json
+    python -m benchmarks.bench_user_repository --backend mongo --mongo-uri mongodb://localhost:27017
+    python -m benchmarks.bench_user_repository --compare results/repo.json
+"""
+import argparse
+import asyncio
+import logging
+import random
+import time
+import uuid
+from typing import Callable, List
+
+from bson import ObjectId
+
+from app.db.database import db
+from app.db import user_repository
+from app.models.user import UserBaseDB, VerificationStatusEnum
+from app.requests.user import UserCreate, UserUpdate
+from benchmarks.common import compare, print_table, run_metadata, summarize, write_results
+from benchmarks.fake_mongo import FakeDatabase
+
+SEED_BATCH_SIZE = 10_000
+
+
+def _user_template() -> dict:
+    return UserBaseDB(
+        email="template@example.com",
+        username="template",
+        ground_photo="",
+        aerial_photo="",
+        avatar_url="",
+        carbon_score=0,
+        potential_earnings=None,
+        interested_companies=0,
+        verification_status=VerificationStatusEnum.PENDING,
+        notification_preferences={"email": True, "sms": False},
+        is_verified=False,
+        is_active=True
+    ).model_dump()
+
+
+async def use_backend(args):
+    """Point the app's db singleton at the benchmark database"""
+    if args.backend == "fake":
+        db.client = None
+        db.db = FakeDatabase(latency=args.latency)
+    else:
+        from motor.motor_asyncio import AsyncIOMotorClient
+
+        db.client = AsyncIOMotorClient(args.mongo_uri, serverSelectionTimeoutMS=5000)
+        db.db = db.client[args.db_name]
+    db.is_connected = True
+
+
+async def seed(size: int, with_indexes: bool) -> List[str]:
+    users = db.get_collection("users")
+    await users.drop()
+    if with_indexes:
+        await users.create_index("email", unique=True)
+        await users.create_index("username", unique=True)
+
+    template = _user_template()
+    ids: List[str] = []
+    for start in range(0, size, SEED_BATCH_SIZE):
+        batch = []
+        for i in range(start, min(start + SEED_BATCH_SIZE, size)):
+            doc = dict(template, _id=ObjectId(), email=f"seed-{i}@example.com", username=f"seed-{i}")
+            doc["carbon_score"] = i % 100
+            batch.append(doc)
+        result = await users.insert_many(batch, ordered=False)
+        ids.extend(str(_id) for _id in result.inserted_ids)
+    return ids
+
+
+async def measure(operation: Callable, iterations: int, concurrency: int) -> dict:
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(iterations))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            start = time.perf_counter()
+            try:
+                await operation(i)
+            except Exception:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - start, errors)
+
+
+async def bench_size(size: int, args) -> dict:
+    print(f"Seeding {size} users...")
+    seed_start = time.perf_counter()
+    ids = await seed(size, with_indexes=not args.no_indexes)
+    print(f"Seeded in {time.perf_counter() - seed_start:.1f}s")
+
+    run_id = uuid.uuid4().hex[:6]
+    created: List[str] = []
+    rng = random.Random(args.seed)
+
+    async def create_user(i):
+        user = await user_repository.create_user(UserCreate(
+            email=f"new-{run_id}-{i}@example.com",
+            username=f"new-{run_id}-{i}",
+            avatar_url=None,
+        ))
+        created.append(user["id"])
+
+    async def get_user(i):
+        if await user_repository.get_user(rng.choice(ids)) is None:
+            raise LookupError("user not found")
+
+    async def get_users(i):
+        await user_repository.get_users(skip=rng.randrange(max(size - args.page_size, 1)), limit=args.page_size)
+
+    async def update_user(i):
+        await user_repository.update_user(rng.choice(ids), UserUpdate(carbon_score=float(i)))
+
+    async def delete_user(i):
+        await user_repository.delete_user(created[i])
+
+    operations = [
+        ("create_user", create_user),
+        ("get_user", get_user),
+        ("get_users", get_users),
+        ("update_user", update_user),
+        # Deletes the users created above, so the collection ends at its seeded size
+        ("delete_user", delete_user),
+    ]
+
+    results = {}
+    for name, operation in operations:
+        iterations = min(args.iterations, len(created)) if name == "delete_user" else args.iterations
+        results[f"{name}[{size}]"] = await measure(operation, iterations, args.concurrency)
+    return results
+
+
+async def main(args):
+    logging.getLogger().setLevel(logging.WARNING)
+    await use_backend(args)
+
+    results = {}
+    for size in args.sizes:
+        results.update(await bench_size(size, args))
+
+    metadata = run_metadata(
+        "user_repository",
+        backend=args.backend,
+        sizes=args.sizes,
+        iterations=args.iterations,
+        concurrency=args.concurrency,
+        page_size=args.page_size,
+        indexes=not args.no_indexes,
+        latency=args.latency,
+    )
+    document = write_results(args.output, metadata, results)
+    print()
+    print_table(results)
+    if args.compare:
+        compare(args.compare, document)
+
+    if db.client is not None:
+        db.client.close()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the user repository")
+    parser.add_argument("--backend", choices=["fake", "mongo"], default="fake")
+    parser.add_argument("--mongo-uri", default="mongodb://localhost:27017")
+    parser.add_argument("--db-name", default="earth_ai_bench")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000])
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated round trip for the fake (seconds)")
+    parser.add_argument("--no-indexes", action="store_true", help="do not create email/username indexes")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write JSON results to this path")
+    parser.add_argument("--compare", help="earlier JSON result file to compare p99 against")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,141 @@
+"""
+Requests per second of the production launcher (python -m app.server) as the
+worker count grows.
+
+For each worker count the launcher is started as a subprocess, polled until it
+answers, loaded for --duration seconds by several client processes, then sent
+SIGTERM to measure how long it takes to drain and exit.
+
+    python -m benchmarks.bench_workers --workers 1 2 4 8 --duration 10 --output results/workers.json
+
+Keep an eye on client CPU: if the client processes saturate, add --clients.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import subprocess
+import sys
+import time
+from typing import List
+
+import httpx
+
+from benchmarks.common import compare, print_table, run_metadata, summarize, write_results
+from benchmarks.fake_services import free_port
+
+
+def _client_process(url: str, duration: float, concurrency: int):
+    async def run():
+        latencies: List[float] = []
+        errors = 0
+        deadline = time.perf_counter() + duration
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(limits=limits, timeout=10.0) as client:
+            async def worker():
+                nonlocal errors
+                while time.perf_counter() < deadline:
+                    start = time.perf_counter()
+                    try:
+                        response = await client.get(url)
+                        if response.status_code != 200:
+                            errors += 1
+                            continue
+                    except Exception:
+                        errors += 1
+                        continue
+                    latencies.append(time.perf_counter() - start)
+
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return latencies, errors
+
+    return asyncio.run(run())
+
+
+def wait_until_ready(base_url: str, process: subprocess.Popen, timeout: float) -> float:
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        if process.poll() is not None:
+            raise RuntimeError(f"Launcher exited with code {process.returncode}")
+        try:
+            if httpx.get(f"{base_url}/health", timeout=1.0).status_code == 200:
+                return time.perf_counter() - start
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"Server not ready after {timeout}s")
+
+
+def bench_workers(workers: int, args) -> dict:
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), PORT=str(port), HOST="127.0.0.1", ACCESS_LOG="false")
+    process = subprocess.Popen([sys.executable, "-m", "app.server"], env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        startup = wait_until_ready(base_url, process, args.startup_timeout)
+        # Give every worker time to finish its own startup before measuring
+        time.sleep(args.settle)
+
+        per_client = max(args.concurrency // args.clients, 1)
+        start = time.perf_counter()
+        with multiprocessing.Pool(args.clients) as pool:
+            outcomes = pool.starmap(_client_process, [(f"{base_url}{args.path}", args.duration, per_client)] * args.clients)
+        wall = time.perf_counter() - start
+
+        latencies = [latency for client_latencies, _ in outcomes for latency in client_latencies]
+        errors = sum(client_errors for _, client_errors in outcomes)
+        result = summarize(latencies, wall, errors)
+        result["startup_seconds"] = round(startup, 3)
+    finally:
+        drain_start = time.perf_counter()
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(timeout=60)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+    result["shutdown_seconds"] = round(time.perf_counter() - drain_start, 3)
+    return result
+
+
+def main(args):
+    results = {}
+    for workers in args.workers:
+        print(f"Benchmarking {workers} worker(s)...")
+        results[f"workers={workers}"] = bench_workers(workers, args)
+
+    metadata = run_metadata(
+        "workers",
+        workers=args.workers,
+        duration=args.duration,
+        concurrency=args.concurrency,
+        clients=args.clients,
+        path=args.path,
+    )
+    document = write_results(args.output, metadata, results)
+    print()
+    print_table(results, columns=("ops", "throughput_ops_per_sec", "p50_ms", "p99_ms", "errors", "shutdown_seconds"))
+    if args.compare:
+        compare(args.compare, document, metric="throughput_ops_per_sec")
+
+
+def parse_args():
+    cpus = os.cpu_count() or 1
+    default_workers = sorted({1, 2, 4, cpus} & set(range(1, cpus + 1)))
+    parser = argparse.ArgumentParser(description="Requests per second versus worker count")
+    parser.add_argument("--workers", type=int, nargs="+", default=default_workers)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=64, help="total in-flight requests across clients")
+    parser.add_argument("--clients", type=int, default=min(cpus, 4), help="client processes generating load")
+    parser.add_argument("--path", default="/health")
+    parser.add_argument("--settle", type=float, default=1.0)
+    parser.add_argument("--startup-timeout", type=float, default=120.0)
+    parser.add_argument("--output", help="write JSON results to this path")
+    parser.add_argument("--compare", help="earlier JSON result file to compare throughput against")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    main(parse_args())
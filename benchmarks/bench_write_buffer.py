@@ -0,0 +1,110 @@
+"""
+Status update bursts: update_user per event vs. the user write buffer.
+
+Seeds users, then replays bursts of status/thread-id events, each for one of
+a few active users (as webhook bursts and result ingestion produce them),
+through update_user, through buffer_user_update without waiting, and through
+buffer_user_update with wait=True. Reports event latency, events per second
+(buffered runs include the final flush) and how many documents were written
+for the events, i.e. the coalescing ratio.
+
+    python -m benchmarks.bench_write_buffer --latency 0.002
+    python -m benchmarks.bench_write_buffer --backend mongo --mongo-uri "mongodb://localhost:27017/?replicaSet=rs0"
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import time
+
+# Read by Settings when app.config is first imported, below
+os.environ.setdefault("AWS_REGION", "us-east-1")
+
+from benchmarks.bench_user_repository import measure, seed, use_backend
+from benchmarks.common import compare, print_table, run_metadata, write_results
+
+
+async def run(mode: str, ids, args) -> dict:
+    from app.db import user_repository
+    from app.db.write_buffer import BUFFERED_WRITES
+    from app.requests.user import UserUpdate
+    from app.utils.Enums import VerificationStatusEnum
+
+    rng = random.Random(args.seed)
+    active = rng.sample(ids, min(args.active_users, len(ids)))
+    statuses = list(VerificationStatusEnum)
+    written = BUFFERED_WRITES.labels("users")
+    written_before = written.value
+
+    def event(i: int) -> UserUpdate:
+        if i % 2:
+            return UserUpdate(verification_thread_id=f"thread-{i}")
+        return UserUpdate(verification_status=statuses[i % len(statuses)])
+
+    async def apply(i):
+        user_id = rng.choice(active)
+        if mode == "update_user":
+            await user_repository.update_user(user_id, event(i))
+        else:
+            await user_repository.buffer_user_update(user_id, event(i), wait=mode == "buffered_wait")
+
+    start = time.perf_counter()
+    result = await measure(apply, args.events, args.concurrency)
+    await user_repository.user_writes.flush()
+    wall = time.perf_counter() - start
+    result["events_per_s"] = round(result["ops"] / wall, 1)
+    result["documents_written"] = result["ops"] if mode == "update_user" else int(written.value - written_before)
+    result["coalescing_ratio"] = round(result["ops"] / max(result["documents_written"], 1), 2)
+    return result
+
+
+async def main(args):
+    from app.config.config import settings
+    from app.db import user_repository
+
+    logging.getLogger().setLevel(logging.WARNING)
+    await use_backend(args)
+    print(f"Seeding {args.size} users...")
+    ids = await seed(args.size, with_indexes=True)
+    user_repository.user_writes.window = args.window
+
+    results = {}
+    for mode in ("update_user", "buffered", "buffered_wait"):
+        results[mode] = await run(mode, ids, args)
+
+    metadata = run_metadata(
+        "write_buffer",
+        backend=args.backend,
+        size=args.size,
+        events=args.events,
+        concurrency=args.concurrency,
+        active_users=args.active_users,
+        window=args.window,
+        max_users=settings.USER_WRITE_BUFFER_MAX_USERS,
+    )
+    document = write_results(args.output, metadata, results)
+    print_table(results, columns=("ops", "mean_ms", "p99_ms", "events_per_s", "documents_written", "coalescing_ratio"))
+    if args.compare:
+        compare(args.compare, document, metric="p99_ms")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="User status update bursts with and without write coalescing")
+    parser.add_argument("--backend", choices=["fake", "mongo"], default="fake")
+    parser.add_argument("--mongo-uri", default="mongodb://localhost:27017")
+    parser.add_argument("--db-name", default="earth_ai_bench")
+    parser.add_argument("--size", type=int, default=10_000)
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=32, help="events in flight at once")
+    parser.add_argument("--active-users", type=int, default=50, help="users the events are spread over")
+    parser.add_argument("--window", type=float, default=0.05, help="USER_WRITE_BUFFER_WINDOW (seconds)")
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated round trip for the fake (seconds)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write JSON results to this path")
+    parser.add_argument("--compare", help="earlier JSON result file to compare p99 latency against")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,104 @@
+"""Shared helpers for the benchmark scripts: timing, percentiles and result files"""
+import json
+import math
+import os
+import platform
+import subprocess
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def summarize(latencies: List[float], wall_seconds: float, errors: int = 0) -> Dict[str, float]:
+    """Throughput and latency summary (milliseconds) for one measured operation"""
+    ordered = sorted(latencies)
+    count = len(ordered)
+    return {
+        "ops": count,
+        "errors": errors,
+        "wall_seconds": round(wall_seconds, 6),
+        "throughput_ops_per_sec": round(count / wall_seconds, 2) if wall_seconds else 0.0,
+        "mean_ms": round(sum(ordered) / count * 1000, 4) if count else 0.0,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 4),
+        "p90_ms": round(percentile(ordered, 90) * 1000, 4),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 4),
+        "max_ms": round(ordered[-1] * 1000, 4) if count else 0.0,
+    }
+
+
+class Stopwatch:
+    """Context manager recording elapsed seconds into a list"""
+
+    def __init__(self, sink: List[float]):
+        self.sink = sink
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.sink.append(time.perf_counter() - self.start)
+        return False
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def run_metadata(benchmark: str, **params) -> dict:
+    return {
+        "benchmark": benchmark,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "params": params,
+    }
+
+
+def write_results(path: Optional[str], metadata: dict, results: dict) -> dict:
+    """Write a machine-readable result file (JSON) and return its content"""
+    document = {**metadata, "results": results}
+    if path:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(document, f, indent=2)
+    return document
+
+
+def print_table(results: Dict[str, Dict[str, float]], columns=("ops", "throughput_ops_per_sec", "p50_ms", "p99_ms")):
+    width = max([len(name) for name in results] + [10])
+    print(f"{'operation':<{width}} " + " ".join(f"{column:>22}" for column in columns))
+    for name, row in results.items():
+        print(f"{name:<{width}} " + " ".join(f"{row.get(column, ''):>22}" for column in columns))
+
+
+def compare(baseline_path: str, current: dict, metric: str = "p99_ms"):
+    """Print the relative change of a metric against an earlier result file"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {baseline_path} ({baseline.get('git_commit')}), {metric}:")
+    for name, row in current["results"].items():
+        before = baseline.get("results", {}).get(name, {}).get(metric)
+        after = row.get(metric)
+        if before is None or after is None:
+            continue
+        change = (after - before) / before * 100 if before else 0.0
+        print(f"  {name:<24} {before:>10} -> {after:>10} ({change:+.1f}%)")
@@ -0,0 +1,718 @@
+"""
+In-process stand-in for a Motor database, good enough to drive the repository
+layer in benchmarks without a running mongod.
+
+Supports the subset of the Motor collection API the app uses: equality and
+simple comparison filters, $set/$unset/$inc/$min/$max updates (dotted paths included), projections, skip/limit
+cursors, bulk writes, hash indexes (unique or not) and aggregation pipelines
+of $geoNear/$match/$group/$sort/$skip/$limit/$project ($group keys may be a
+field or $dateTrunc). Time-series collections are plain collections here.
+Writes feed database-level change streams (watch) that resume from a token.
+A 2dsphere index only marks
+the field as geo-indexed; $geoNear scans every document. Documents are
+deep-copied on the way in and out, which roughly mimics BSON encode/decode cost.
+"""
+import asyncio
+import copy
+import math
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import DeleteMany, DeleteOne, InsertOne, ReplaceOne, UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError, CollectionInvalid, ConnectionFailure, DuplicateKeyError, OperationFailure
+
+from app.utils.metrics import track_dependency
+
+_MISSING = object()
+
+
+def _get(doc: dict, path: str):
+    value = doc
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def _matches_condition(value, condition) -> bool:
+    if isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+        for op, arg in condition.items():
+            if op == "$in" and value not in arg:
+                return False
+            if op == "$nin" and value in arg:
+                return False
+            if op == "$ne" and value == arg:
+                return False
+            if op == "$exists" and (value is not _MISSING) != bool(arg):
+                return False
+            if op in ("$gt", "$gte", "$lt", "$lte"):
+                if value is _MISSING or value is None:
+                    return False
+                if op == "$gt" and not value > arg:
+                    return False
+                if op == "$gte" and not value >= arg:
+                    return False
+                if op == "$lt" and not value < arg:
+                    return False
+                if op == "$lte" and not value <= arg:
+                    return False
+        return True
+    if value is _MISSING:
+        return condition is None
+    return value == condition
+
+
+def matches(doc: dict, query: Optional[dict]) -> bool:
+    if not query:
+        return True
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(matches(doc, sub) for sub in condition):
+                return False
+        elif key == "$and":
+            if not all(matches(doc, sub) for sub in condition):
+                return False
+        elif not _matches_condition(_get(doc, key), condition):
+            return False
+    return True
+
+
+def apply_projection(doc: dict, projection) -> dict:
+    if not projection:
+        return copy.deepcopy(doc)
+    if isinstance(projection, (list, tuple)):
+        projection = {field: 1 for field in projection}
+    include = {k for k, v in projection.items() if v and k != "_id"}
+    if include:
+        result = {k: copy.deepcopy(doc[k]) for k in include if k in doc}
+        if projection.get("_id", 1) and "_id" in doc:
+            result["_id"] = doc["_id"]
+        return result
+    return {k: copy.deepcopy(v) for k, v in doc.items() if projection.get(k, 1)}
+
+
+def _parent(doc: dict, path: str):
+    """(containing dict, last key) of a dotted path, creating intermediate documents"""
+    *parents, key = path.split(".")
+    for part in parents:
+        doc = doc.setdefault(part, {})
+    return doc, key
+
+
+def apply_update(doc: dict, update: dict):
+    for op, fields in update.items():
+        if op == "$set":
+            for path, value in fields.items():
+                parent, key = _parent(doc, path)
+                parent[key] = copy.deepcopy(value)
+        elif op == "$unset":
+            for path in fields:
+                parent, key = _parent(doc, path)
+                parent.pop(key, None)
+        elif op == "$inc":
+            for path, value in fields.items():
+                parent, key = _parent(doc, path)
+                parent[key] = parent.get(key, 0) + value
+        elif op in ("$min", "$max"):
+            for path, value in fields.items():
+                parent, key = _parent(doc, path)
+                current = parent.get(key)
+                if key not in parent or (value < current if op == "$min" else value > current):
+                    parent[key] = copy.deepcopy(value)
+        elif op == "$setOnInsert":
+            continue
+        else:
+            raise NotImplementedError(f"Update operator {op} is not supported by the fake")
+
+
+def _sorted(docs, sort) -> List[dict]:
+    docs = list(docs)
+    for key, direction in reversed(sort):
+        docs.sort(key=lambda d: (_get(d, key) is _MISSING, _get(d, key)), reverse=direction < 0)
+    return docs
+
+
+def _date_trunc(spec: dict, doc: dict) -> datetime:
+    value = _get(doc, spec["date"][1:])
+    unit = spec["unit"]
+    if unit == "hour":
+        return value.replace(minute=0, second=0, microsecond=0)
+    day = value.replace(hour=0, minute=0, second=0, microsecond=0)
+    if unit == "day":
+        return day
+    if unit == "week":
+        first = 0 if spec.get("startOfWeek", "sunday").lower() in ("monday", "mon") else 6
+        return day - timedelta(days=(day.weekday() - first) % 7)
+    if unit == "month":
+        return day.replace(day=1)
+    if unit == "year":
+        return day.replace(month=1, day=1)
+    raise NotImplementedError(f"$dateTrunc unit {unit} is not supported by the fake")
+
+
+def _evaluate(expression, doc: dict):
+    if isinstance(expression, str) and expression.startswith("$"):
+        value = _get(doc, expression[1:])
+        return None if value is _MISSING else value
+    if isinstance(expression, dict) and "$dateTrunc" in expression:
+        return _date_trunc(expression["$dateTrunc"], doc)
+    return expression
+
+
+def _accumulate(op: str, values: list):
+    present = [value for value in values if isinstance(value, (int, float, datetime)) and not isinstance(value, bool)]
+    if op == "$sum":
+        return sum(value for value in present if not isinstance(value, datetime))
+    if op == "$avg":
+        return sum(present) / len(present) if present else None
+    if op == "$min":
+        return min(present) if present else None
+    if op == "$max":
+        return max(present) if present else None
+    if op == "$first":
+        return values[0] if values else None
+    if op == "$last":
+        return values[-1] if values else None
+    raise NotImplementedError(f"Accumulator {op} is not supported by the fake")
+
+
+def _group(docs: List[dict], spec: dict) -> List[dict]:
+    groups: Dict[Any, List[dict]] = {}
+    for doc in docs:
+        groups.setdefault(_evaluate(spec["_id"], doc), []).append(doc)
+    results = []
+    for key, members in groups.items():
+        result = {"_id": key}
+        for field, accumulator in spec.items():
+            if field == "_id":
+                continue
+            (op, expression), = accumulator.items()
+            result[field] = _accumulate(op, [_evaluate(expression, doc) for doc in members])
+        results.append(result)
+    return results
+
+
+# Radius Mongo uses for spherical distances, in meters
+EARTH_RADIUS_M = 6378100.0
+
+
+def _haversine_m(a, b) -> float:
+    """Great-circle distance between two [longitude, latitude] pairs"""
+    lon1, lat1, lon2, lat2 = map(math.radians, (a[0], a[1], b[0], b[1]))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(h)))
+
+
+class InsertOneResult:
+    def __init__(self, inserted_id):
+        self.inserted_id = inserted_id
+
+
+class InsertManyResult:
+    def __init__(self, inserted_ids):
+        self.inserted_ids = inserted_ids
+
+
+class UpdateResult:
+    def __init__(self, matched_count: int, modified_count: int, upserted_id=None):
+        self.matched_count = matched_count
+        self.modified_count = modified_count
+        self.upserted_id = upserted_id
+
+
+class DeleteResult:
+    def __init__(self, deleted_count: int):
+        self.deleted_count = deleted_count
+
+
+class BulkWriteResult:
+    def __init__(self, bulk_api_result: dict):
+        self.bulk_api_result = bulk_api_result
+        self.inserted_count = bulk_api_result["nInserted"]
+        self.matched_count = bulk_api_result["nMatched"]
+        self.modified_count = bulk_api_result["nModified"]
+        self.deleted_count = bulk_api_result["nRemoved"]
+        self.upserted_count = bulk_api_result["nUpserted"]
+
+
+class FakeCursor:
+    def __init__(self, collection: "FakeCollection", query: Optional[dict], projection=None):
+        self._collection = collection
+        self._query = query
+        self._projection = projection
+        self._skip = 0
+        self._limit = 0
+        self._sort = None
+        self._iter = None
+
+    def skip(self, count: int):
+        self._skip = count
+        return self
+
+    def limit(self, count: int):
+        self._limit = count
+        return self
+
+    def sort(self, key, direction: int = 1):
+        self._sort = [(key, direction)] if isinstance(key, str) else list(key)
+        return self
+
+    def _results(self) -> List[dict]:
+        docs = self._collection._candidates(self._query)
+        if self._sort:
+            docs = _sorted(docs, self._sort)
+        results = []
+        skipped = 0
+        for doc in docs:
+            if skipped < self._skip:
+                skipped += 1
+                continue
+            results.append(apply_projection(doc, self._projection))
+            if self._limit and len(results) >= self._limit:
+                break
+        return results
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._iter is None:
+            await self._collection._io("find")
+            self._iter = iter(self._results())
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    async def to_list(self, length: Optional[int] = None):
+        await self._collection._io("find")
+        results = self._results()
+        return results[:length] if length else results
+
+
+class FakeAggregateCursor:
+    def __init__(self, collection: "FakeCollection", pipeline: List[dict]):
+        self._collection = collection
+        self._pipeline = pipeline
+        self._iter = None
+
+    def _geo_near(self, spec: dict) -> List[dict]:
+        key = spec.get("key")
+        if key not in self._collection._geo_indexes:
+            raise OperationFailure("$geoNear requires a 2d or 2dsphere index")
+        near = spec["near"]["coordinates"]
+        max_distance = spec.get("maxDistance", math.inf)
+        results = []
+        for doc in self._collection._candidates(spec.get("query")):
+            point = _get(doc, key)
+            if point is _MISSING or not point:
+                continue
+            distance = _haversine_m(near, point["coordinates"])
+            if distance <= max_distance:
+                results.append(dict(doc, **{spec["distanceField"]: distance}))
+        results.sort(key=lambda doc: doc[spec["distanceField"]])
+        return results
+
+    def _results(self) -> List[dict]:
+        docs = None
+        for position, stage in enumerate(self._pipeline):
+            (name, spec), = stage.items()
+            if name == "$geoNear":
+                if position != 0:
+                    raise OperationFailure("$geoNear is only valid as the first stage in a pipeline")
+                docs = self._geo_near(spec)
+                continue
+            if docs is None:
+                # A leading $match can use an index, as it would on the server
+                docs = list(self._collection._candidates(spec if name == "$match" else None))
+            if name == "$match":
+                docs = [doc for doc in docs if matches(doc, spec)]
+            elif name == "$group":
+                docs = _group(docs, spec)
+            elif name == "$sort":
+                docs = _sorted(docs, list(spec.items()))
+            elif name == "$skip":
+                docs = docs[spec:]
+            elif name == "$limit":
+                docs = docs[:spec]
+            elif name == "$project":
+                docs = [apply_projection(doc, spec) for doc in docs]
+            else:
+                raise NotImplementedError(f"Aggregation stage {name} is not supported by the fake")
+        if docs is None:
+            docs = list(self._collection._docs.values())
+        return [copy.deepcopy(doc) for doc in docs]
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._iter is None:
+            await self._collection._io("aggregate")
+            self._iter = iter(self._results())
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    async def to_list(self, length: Optional[int] = None):
+        await self._collection._io("aggregate")
+        results = self._results()
+        return results[:length] if length else results
+
+
+class FakeCollection:
+    def __init__(self, name: str, latency: float = 0.0, database: "FakeDatabase" = None):
+        self.name = name
+        self.latency = latency
+        self._database = database
+        self._docs: Dict[Any, dict] = {}
+        # field -> {value: set(_id)}; unique fields listed separately
+        self._indexes: Dict[str, Dict[Any, set]] = {}
+        self._unique: set = set()
+        # fields with a 2d/2dsphere index; $geoNear refuses to run without one
+        self._geo_indexes: set = set()
+
+    async def _io(self, operation: str):
+        # Always yield to the loop, like a real network round trip would, and
+        # report it under "mongo" the way the real client's command listener does
+        with track_dependency("mongo", operation):
+            await asyncio.sleep(self.latency)
+
+    def with_options(self, **kwargs) -> "FakeCollection":
+        # One node: every read preference reads the same documents
+        return self
+
+    # Indexes
+    async def create_index(self, keys, unique: bool = False, **kwargs):
+        field = keys if isinstance(keys, str) else keys[0][0]
+        if not isinstance(keys, str) and isinstance(keys[0][1], str):
+            self._geo_indexes.add(field)
+            return f"{field}_{keys[0][1]}"
+        index: Dict[Any, set] = {}
+        for _id, doc in self._docs.items():
+            value = _get(doc, field)
+            if value is not _MISSING:
+                index.setdefault(value, set()).add(_id)
+        self._indexes[field] = index
+        if unique:
+            self._unique.add(field)
+        return f"{field}_1"
+
+    def _index_add(self, doc: dict):
+        # Check every unique index before touching any, so a rejected write leaves none behind
+        for field in self._unique:
+            value = _get(doc, field)
+            if value is not _MISSING and self._indexes[field].get(value, set()) - {doc["_id"]}:
+                raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: {field}_1")
+        for field, index in self._indexes.items():
+            value = _get(doc, field)
+            if value is not _MISSING:
+                index.setdefault(value, set()).add(doc["_id"])
+
+    def _publish(self, operation: str, document_id=_MISSING):
+        if self._database is not None:
+            self._database._publish(self.name, operation, document_id)
+
+    def _remove(self, doc: dict):
+        self._index_remove(doc)
+        del self._docs[doc["_id"]]
+        self._publish("delete", doc["_id"])
+
+    def _index_remove(self, doc: dict):
+        for field, index in self._indexes.items():
+            value = _get(doc, field)
+            ids = index.get(value) if value is not _MISSING else None
+            if ids:
+                ids.discard(doc["_id"])
+                if not ids:
+                    del index[value]
+
+    def _candidates(self, query: Optional[dict]):
+        """Use the _id or a hash index for equality lookups, else scan"""
+        query = query or {}
+        _id = query.get("_id")
+        if _id is not None and not isinstance(_id, dict):
+            doc = self._docs.get(_id)
+            return [doc] if doc is not None and matches(doc, query) else []
+        for field, condition in query.items():
+            if field in self._indexes and not isinstance(condition, dict):
+                ids = self._indexes[field].get(condition, ())
+                return [d for d in (self._docs[i] for i in sorted(ids)) if matches(d, query)]
+        return (doc for doc in self._docs.values() if matches(doc, query))
+
+    # Reads
+    async def find_one(self, query: Optional[dict] = None, projection=None, **kwargs):
+        await self._io("find")
+        for doc in self._candidates(query):
+            return apply_projection(doc, projection)
+        return None
+
+    def find(self, query: Optional[dict] = None, projection=None, **kwargs):
+        return FakeCursor(self, query, projection)
+
+    def aggregate(self, pipeline: List[dict], **kwargs):
+        return FakeAggregateCursor(self, pipeline)
+
+    async def count_documents(self, query: Optional[dict] = None, **kwargs) -> int:
+        await self._io("aggregate")
+        if not query:
+            return len(self._docs)
+        return sum(1 for _ in self._candidates(query))
+
+    async def estimated_document_count(self) -> int:
+        return len(self._docs)
+
+    # Writes
+    def _insert(self, document: dict):
+        document.setdefault("_id", ObjectId())
+        if document["_id"] in self._docs:
+            raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: _id_")
+        stored = copy.deepcopy(document)
+        self._index_add(stored)
+        self._docs[stored["_id"]] = stored
+        self._publish("insert", stored["_id"])
+        return stored["_id"]
+
+    async def insert_one(self, document: dict, **kwargs):
+        await self._io("insert")
+        return InsertOneResult(self._insert(document))
+
+    async def insert_many(self, documents: List[dict], ordered: bool = True, **kwargs):
+        await self._io("insert")
+        inserted_ids, errors = [], []
+        for index, document in enumerate(documents):
+            try:
+                inserted_ids.append(self._insert(document))
+            except DuplicateKeyError as e:
+                errors.append({"index": index, "code": 11000, "errmsg": str(e), "op": document})
+                if ordered:
+                    break
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(inserted_ids), "nMatched": 0,
+                                  "nModified": 0, "nRemoved": 0, "nUpserted": 0, "upserted": []})
+        return InsertManyResult(inserted_ids)
+
+    def _apply(self, doc: dict, update: dict) -> dict:
+        """Update a stored document in place, keeping indexes in step; returns the old version"""
+        before = copy.deepcopy(doc)
+        self._index_remove(doc)
+        apply_update(doc, update)
+        try:
+            self._index_add(doc)
+        except DuplicateKeyError:
+            doc.clear()
+            doc.update(before)
+            self._index_add(doc)
+            raise
+        if before != doc:
+            # No-op updates aren't written to the oplog, so streams don't see them
+            self._publish("update", doc["_id"])
+        return before
+
+    def _update(self, query: dict, update: dict, many: bool, upsert: bool = False) -> UpdateResult:
+        matched = modified = 0
+        for doc in list(self._candidates(query)):
+            before = self._apply(doc, update)
+            matched += 1
+            modified += int(before != doc)
+            if not many:
+                break
+        if matched == 0 and upsert:
+            doc = {k: v for k, v in query.items() if not k.startswith("$") and not isinstance(v, dict)}
+            apply_update(doc, update)
+            for key, value in update.get("$setOnInsert", {}).items():
+                doc[key] = copy.deepcopy(value)
+            return UpdateResult(0, 0, self._insert(doc))
+        return UpdateResult(matched, modified)
+
+    async def update_one(self, query: dict, update: dict, upsert: bool = False, **kwargs):
+        await self._io("update")
+        return self._update(query, update, many=False, upsert=upsert)
+
+    async def update_many(self, query: dict, update: dict, upsert: bool = False, **kwargs):
+        await self._io("update")
+        return self._update(query, update, many=True, upsert=upsert)
+
+    async def find_one_and_update(self, query: dict, update: dict, projection=None, sort=None,
+                                  upsert: bool = False, return_document: bool = False, **kwargs):
+        """Atomic like the real thing: nothing else runs between the match and the update"""
+        await self._io("findAndModify")
+        docs = self._candidates(query)
+        if sort:
+            docs = _sorted(docs, sort)
+        for doc in docs:
+            before = self._apply(doc, update)
+            # ReturnDocument.AFTER is True
+            return apply_projection(doc if return_document else before, projection)
+        if upsert:
+            outcome = self._update(query, update, many=False, upsert=True)
+            return apply_projection(self._docs[outcome.upserted_id], projection) if return_document else None
+        return None
+
+    async def delete_one(self, query: dict, **kwargs):
+        await self._io("delete")
+        for doc in list(self._candidates(query)):
+            self._remove(doc)
+            return DeleteResult(1)
+        return DeleteResult(0)
+
+    async def delete_many(self, query: dict, **kwargs):
+        await self._io("delete")
+        docs = list(self._candidates(query))
+        for doc in docs:
+            self._remove(doc)
+        return DeleteResult(len(docs))
+
+    async def bulk_write(self, requests: list, ordered: bool = True, **kwargs):
+        """InsertOne/UpdateOne/UpdateMany/ReplaceOne/DeleteOne/DeleteMany in one round trip"""
+        await self._io("bulk_write")
+        result = {"writeErrors": [], "nInserted": 0, "nMatched": 0, "nModified": 0, "nRemoved": 0,
+                  "nUpserted": 0, "upserted": []}
+        for index, request in enumerate(requests):
+            try:
+                if isinstance(request, InsertOne):
+                    self._insert(request._doc)
+                    result["nInserted"] += 1
+                elif isinstance(request, (UpdateOne, UpdateMany, ReplaceOne)):
+                    update = request._doc
+                    if isinstance(request, ReplaceOne):
+                        update = {"$set": update}
+                    outcome = self._update(request._filter, update, many=isinstance(request, UpdateMany),
+                                           upsert=bool(request._upsert))
+                    result["nMatched"] += outcome.matched_count
+                    result["nModified"] += outcome.modified_count
+                    if outcome.upserted_id is not None:
+                        result["nUpserted"] += 1
+                        result["upserted"].append({"index": index, "_id": outcome.upserted_id})
+                elif isinstance(request, (DeleteOne, DeleteMany)):
+                    docs = list(self._candidates(request._filter))
+                    if isinstance(request, DeleteOne):
+                        docs = docs[:1]
+                    for doc in docs:
+                        self._remove(doc)
+                    result["nRemoved"] += len(docs)
+                else:
+                    raise NotImplementedError(f"{type(request).__name__} is not supported by the fake")
+            except DuplicateKeyError as e:
+                result["writeErrors"].append({"index": index, "code": 11000, "errmsg": str(e)})
+                if ordered:
+                    break
+        if result["writeErrors"]:
+            raise BulkWriteError(result)
+        return BulkWriteResult(result)
+
+    async def drop(self):
+        self._docs.clear()
+        for index in self._indexes.values():
+            index.clear()
+        self._publish("drop")
+
+
+class FakeChangeStream:
+    """
+    Database-level change stream: events carry _id (the resume token),
+    operationType, ns and documentKey, never the documents. Resuming from a
+    token older than the database's change log fails like a rolled-over oplog.
+    """
+
+    def __init__(self, database: "FakeDatabase", pipeline: List[dict], resume_after: Optional[dict]):
+        self._database = database
+        self._pipeline = pipeline
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self.resume_token = resume_after
+
+    async def __aenter__(self):
+        await asyncio.sleep(self._database.latency)
+        changes = self._database._changes
+        if self.resume_token is not None:
+            resume_from = int(self.resume_token["_data"], 16)
+            if changes and resume_from < changes[0][0] - 1:
+                raise OperationFailure("Resume point may no longer be in the oplog", code=286)
+            for sequence, event in changes:
+                if sequence > resume_from:
+                    self._push(event)
+        self._database._streams.append(self)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self in self._database._streams:
+            self._database._streams.remove(self)
+
+    def _push(self, event: dict):
+        for stage in self._pipeline:
+            (name, spec), = stage.items()
+            if name == "$match" and not matches(event, spec):
+                return
+            if name == "$project":
+                event = apply_projection(event, spec)
+        self._queue.put_nowait(copy.deepcopy(event))
+
+    def _fail(self, error: Exception):
+        self._queue.put_nowait(error)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        event = await self._queue.get()
+        if isinstance(event, Exception):
+            self.close()
+            raise event
+        self.resume_token = event["_id"]
+        return event
+
+
+class FakeDatabase:
+    def __init__(self, name: str = "earth_ai_bench", latency: float = 0.0, change_log_size: int = 100_000):
+        self.name = name
+        self.latency = latency
+        self._collections: Dict[str, FakeCollection] = {}
+        # (sequence, event) of recent writes, like the oplog window change streams resume from
+        self._changes: deque = deque(maxlen=change_log_size)
+        self._sequence = 0
+        self._streams: List[FakeChangeStream] = []
+
+    def __getitem__(self, name: str) -> FakeCollection:
+        if name not in self._collections:
+            self._collections[name] = FakeCollection(name, self.latency, self)
+        return self._collections[name]
+
+    def _publish(self, collection: str, operation: str, document_id=_MISSING):
+        self._sequence += 1
+        event = {"_id": {"_data": f"{self._sequence:016x}"}, "operationType": operation,
+                 "ns": {"db": self.name, "coll": collection}}
+        if document_id is not _MISSING:
+            event["documentKey"] = {"_id": document_id}
+        self._changes.append((self._sequence, event))
+        for stream in list(self._streams):
+            stream._push(event)
+
+    def watch(self, pipeline: Optional[List[dict]] = None, resume_after: Optional[dict] = None,
+              start_after: Optional[dict] = None, **kwargs) -> FakeChangeStream:
+        return FakeChangeStream(self, pipeline or [], resume_after or start_after)
+
+    def interrupt_change_streams(self):
+        """Fail every open change stream, as a dropped connection or failover would"""
+        for stream in list(self._streams):
+            stream._fail(ConnectionFailure("change stream interrupted"))
+
+    def get_collection(self, name: str, **kwargs) -> FakeCollection:
+        return self[name]
+
+    async def create_collection(self, name: str, **kwargs) -> FakeCollection:
+        if name in self._collections:
+            raise CollectionInvalid(f"collection {name} already exists")
+        return self[name]
+
+    async def list_collection_names(self) -> List[str]:
+        return list(self._collections)
+
+    async def command(self, name, *args, **kwargs):
+        return {"ok": 1.0}
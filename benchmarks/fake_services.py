@@ -0,0 +1,272 @@
+"""
+In-process HTTP stand-ins for the LangGraph API and S3, with configurable
+latency and error injection. Both are plain Starlette apps served by uvicorn
+on a local port, so the real langgraph_sdk and boto3 clients talk to them
+unmodified.
+"""
+import asyncio
+import hashlib
+import random
+import socket
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+from xml.sax.saxutils import escape
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+
+@dataclass
+class FaultConfig:
+    """Latency and error injection applied to every request a stand-in serves"""
+    latency: float = 0.0  # mean added latency in seconds
+    jitter: float = 0.0  # +/- uniform jitter in seconds
+    error_rate: float = 0.0  # fraction of requests answered with error_status
+    error_status: int = 503
+
+    async def apply(self) -> Optional[Response]:
+        delay = self.latency + (random.uniform(-self.jitter, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if self.error_rate and random.random() < self.error_rate:
+            return JSONResponse({"detail": "injected failure"}, status_code=self.error_status)
+        return None
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def create_fake_langgraph_app(faults: FaultConfig = None) -> Starlette:
+    """Serves the handful of LangGraph endpoints AIEngine uses"""
+    faults = faults or FaultConfig()
+    assistant_id = str(uuid.uuid4())
+    threads: Dict[str, dict] = {}
+    runs: Dict[str, list] = {}
+
+    async def search_assistants(request: Request):
+        return (await faults.apply()) or JSONResponse([{
+            "assistant_id": assistant_id,
+            "graph_id": "agent",
+            "name": "fake-assistant",
+            "metadata": {},
+            "created_at": _now(),
+        }])
+
+    async def create_thread(request: Request):
+        if (failure := await faults.apply()) is not None:
+            return failure
+        thread_id = str(uuid.uuid4())
+        threads[thread_id] = {"thread_id": thread_id, "created_at": _now(), "status": "idle", "values": {}}
+        runs[thread_id] = []
+        return JSONResponse(threads[thread_id])
+
+    async def get_thread(request: Request):
+        if (failure := await faults.apply()) is not None:
+            return failure
+        thread = threads.get(request.path_params["thread_id"])
+        if thread is None:
+            return JSONResponse({"detail": "Thread not found"}, status_code=404)
+        return JSONResponse(thread)
+
+    async def list_runs(request: Request):
+        return (await faults.apply()) or JSONResponse(runs.get(request.path_params["thread_id"], []))
+
+    async def create_run(request: Request):
+        if (failure := await faults.apply()) is not None:
+            return failure
+        thread_id = request.path_params["thread_id"]
+        if thread_id not in threads:
+            return JSONResponse({"detail": "Thread not found"}, status_code=404)
+        payload = await request.json()
+        user_input = payload.get("input") or {}
+        run = {
+            "run_id": str(uuid.uuid4()),
+            "thread_id": thread_id,
+            "assistant_id": payload.get("assistant_id"),
+            "status": "success",
+            "created_at": _now(),
+        }
+        runs[thread_id].append(run)
+        threads[thread_id]["values"] = {
+            "user_id": user_input.get("user_id"),
+            "aerial_result": {"input": user_input.get("aerial_key", ""), "output": "fake verification"},
+            "carbon_credits": 1.0,
+        }
+        return JSONResponse(run)
+
+    return Starlette(routes=[
+        Route("/assistants/search", search_assistants, methods=["POST"]),
+        Route("/threads", create_thread, methods=["POST"]),
+        Route("/threads/{thread_id}", get_thread, methods=["GET"]),
+        Route("/threads/{thread_id}/runs", list_runs, methods=["GET"]),
+        Route("/threads/{thread_id}/runs", create_run, methods=["POST"]),
+    ])
+
+
+def _xml(body: str, status_code: int = 200) -> Response:
+    return Response(f'<?xml version="1.0" encoding="UTF-8"?>\n{body}', status_code=status_code,
+                    media_type="application/xml")
+
+
+def _s3_error(code: str, message: str, status_code: int) -> Response:
+    return _xml(f"<Error><Code>{code}</Code><Message>{escape(message)}</Message></Error>", status_code)
+
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single 'bytes=start-end' range into inclusive offsets"""
+    unit, _, spec = header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        return None
+    start, _, end = spec.strip().partition("-")
+    if start == "":
+        length = int(end)
+        return max(size - length, 0), size - 1
+    end_offset = int(end) if end else size - 1
+    return int(start), min(end_offset, size - 1)
+
+
+class FakeS3Store:
+    """Objects and in-progress multipart uploads, keyed by (bucket, key)"""
+
+    def __init__(self):
+        self.objects: Dict[Tuple[str, str], dict] = {}
+        self.uploads: Dict[str, dict] = {}
+
+    def put(self, bucket: str, key: str, body: bytes, content_type: str = "binary/octet-stream",
+            etag: Optional[str] = None) -> str:
+        etag = etag or f'"{hashlib.md5(body).hexdigest()}"'
+        self.objects[(bucket, key)] = {"body": body, "content_type": content_type, "etag": etag,
+                                       "last_modified": datetime.now(timezone.utc)}
+        return etag
+
+
+def create_fake_s3_app(faults: FaultConfig = None, store: FakeS3Store = None) -> Starlette:
+    """
+    Path-style S3 subset: PUT/GET (with Range)/HEAD/DELETE objects and
+    multipart uploads. Signatures are not checked.
+    """
+    faults = faults or FaultConfig()
+    store = store or FakeS3Store()
+
+    async def object_handler(request: Request):
+        if (failure := await faults.apply()) is not None:
+            return failure
+        bucket = request.path_params["bucket"]
+        key = request.path_params["key"]
+        params = request.query_params
+        method = request.method
+
+        if method == "POST" and "uploads" in params:
+            upload_id = uuid.uuid4().hex
+            store.uploads[upload_id] = {"bucket": bucket, "key": key, "parts": {},
+                                        "content_type": request.headers.get("content-type", "binary/octet-stream")}
+            return _xml(
+                f"<InitiateMultipartUploadResult><Bucket>{escape(bucket)}</Bucket><Key>{escape(key)}</Key>"
+                f"<UploadId>{upload_id}</UploadId></InitiateMultipartUploadResult>"
+            )
+
+        if "uploadId" in params:
+            upload = store.uploads.get(params["uploadId"])
+            if upload is None:
+                return _s3_error("NoSuchUpload", "The specified upload does not exist", 404)
+            if method == "PUT":
+                body = await request.body()
+                etag = f'"{hashlib.md5(body).hexdigest()}"'
+                upload["parts"][int(params["partNumber"])] = (body, etag)
+                return Response(status_code=200, headers={"ETag": etag})
+            if method == "DELETE":
+                store.uploads.pop(params["uploadId"], None)
+                return Response(status_code=204)
+            if method == "POST":
+                parts = [upload["parts"][number] for number in sorted(upload["parts"])]
+                digest = hashlib.md5(b"".join(bytes.fromhex(etag.strip('"')) for _, etag in parts)).hexdigest()
+                etag = f'"{digest}-{len(parts)}"'
+                store.put(bucket, key, b"".join(body for body, _ in parts), upload["content_type"], etag)
+                store.uploads.pop(params["uploadId"], None)
+                return _xml(
+                    f"<CompleteMultipartUploadResult><Bucket>{escape(bucket)}</Bucket><Key>{escape(key)}</Key>"
+                    f"<ETag>{escape(etag)}</ETag></CompleteMultipartUploadResult>"
+                )
+
+        if method == "PUT":
+            body = await request.body()
+            etag = store.put(bucket, key, body, request.headers.get("content-type", "binary/octet-stream"))
+            return Response(status_code=200, headers={"ETag": etag})
+
+        obj = store.objects.get((bucket, key))
+        if obj is None:
+            if method == "HEAD":
+                return Response(status_code=404)
+            return _s3_error("NoSuchKey", "The specified key does not exist.", 404)
+
+        if method == "DELETE":
+            store.objects.pop((bucket, key), None)
+            return Response(status_code=204)
+
+        body = obj["body"]
+        headers = {
+            "ETag": obj["etag"],
+            "Last-Modified": obj["last_modified"].strftime("%a, %d %b %Y %H:%M:%S GMT"),
+            "Accept-Ranges": "bytes",
+        }
+        status_code = 200
+        range_header = request.headers.get("range")
+        if range_header:
+            offsets = _parse_range(range_header, len(body))
+            if offsets is None or offsets[0] >= len(body):
+                return _s3_error("InvalidRange", "The requested range is not satisfiable", 416)
+            start, end = offsets
+            headers["Content-Range"] = f"bytes {start}-{end}/{len(body)}"
+            body = body[start:end + 1]
+            status_code = 206
+
+        if method == "HEAD":
+            headers["Content-Length"] = str(len(body))
+            return Response(status_code=status_code, headers=headers, media_type=obj["content_type"])
+        return Response(body, status_code=status_code, headers=headers, media_type=obj["content_type"])
+
+    app = Starlette(routes=[
+        Route("/{bucket}/{key:path}", object_handler, methods=["GET", "HEAD", "PUT", "POST", "DELETE"]),
+    ])
+    app.state.store = store
+    return app
+
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class BackgroundServer:
+    """Runs an ASGI app with uvicorn as a task on the current event loop"""
+
+    def __init__(self, app, port: int = None, host: str = "127.0.0.1"):
+        self.host = host
+        self.port = port or free_port()
+        self.server = uvicorn.Server(uvicorn.Config(app, host=host, port=self.port, log_level="warning",
+                                                    lifespan="off", access_log=False))
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self):
+        self._task = asyncio.create_task(self.server.serve())
+        while not self.server.started:
+            if self._task.done():
+                self._task.result()
+            await asyncio.sleep(0.01)
+        return self
+
+    async def stop(self):
+        self.server.should_exit = True
+        if self._task is not None:
+            await self._task
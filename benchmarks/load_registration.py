@@ -0,0 +1,213 @@
+"""
+End-to-end load harness for POST /api/users/register.
+
+Starts an in-process S3 stand-in (benchmarks/fake_services.py),
+points the app at them and at the in-process Mongo fake (or a real mongod),
+then drives registrations with a concurrent async load generator. Reports
+throughput, latency percentiles, error rates and a per-stage breakdown taken
+from the dependency timers in app/utils/metrics.py.
+
+    python -m benchmarks.load_registration --requests 2000 --concurrency 50 \\
+        --s3-latency 0.02 --s3-error-rate 0.01 --output results/register.json
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+import uuid
+from collections import Counter
+from typing import List, Optional
+
+import httpx
+
+from benchmarks.common import compare, print_table, run_metadata, summarize, write_results
+from benchmarks.fake_mongo import FakeDatabase
+from benchmarks.fake_services import (
+    BackgroundServer, FaultConfig, FakeS3Store, create_fake_s3_app,
+)
+
+BUCKET = "earth-ai-bench"
+
+
+def configure_environment(s3_url: str, admission: bool = False, langgraph_url: Optional[str] = None):
+    """Must run before the app is imported: clients and middleware read these at construction"""
+    if langgraph_url is not None:
+        os.environ["LANGGRAPH_URL"] = langgraph_url
+    # All load comes from one client address, which the per-client buckets would throttle
+    os.environ["ADMISSION_ENABLED"] = "true" if admission else "false"
+    os.environ["S3_ENDPOINT_URL"] = s3_url
+    os.environ["S3_BUCKET_NAME"] = BUCKET
+    os.environ.setdefault("AWS_REGION", "us-east-1")
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "bench")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "bench")
+
+
+def stage_breakdown(before: dict, after: dict, registrations: int) -> dict:
+    """Per (dependency, operation) call counts and time, from the histogram diff"""
+    stages = {}
+    for (dependency, operation, outcome), (count, total) in after.items():
+        prev_count, prev_total = before.get((dependency, operation, outcome), (0, 0.0))
+        calls = count - prev_count
+        if calls <= 0:
+            continue
+        stage = stages.setdefault(f"{dependency}:{operation}", {"calls": 0, "errors": 0, "seconds": 0.0})
+        stage["calls"] += calls
+        stage["seconds"] += total - prev_total
+        if outcome != "success":
+            stage["errors"] += calls
+    for stage in stages.values():
+        stage["mean_ms"] = round(stage["seconds"] / stage["calls"] * 1000, 4)
+        stage["ms_per_registration"] = round(stage["seconds"] / max(registrations, 1) * 1000, 4)
+        stage["seconds"] = round(stage["seconds"], 6)
+    return dict(sorted(stages.items()))
+
+
+async def run_load(client: httpx.AsyncClient, upload_client: httpx.AsyncClient, args) -> dict:
+    latencies: List[float] = []
+    upload_latencies: List[float] = []
+    statuses: Counter = Counter()
+    run_id = uuid.uuid4().hex[:6]
+    counter = iter(range(args.requests))
+    deadline = time.perf_counter() + args.duration if args.duration else None
+    payload_bytes = os.urandom(args.upload_bytes) if args.upload_bytes else b""
+
+    async def upload(url: str, content_type: str):
+        start = time.perf_counter()
+        response = await upload_client.put(url, content=payload_bytes, headers={"Content-Type": content_type})
+        response.raise_for_status()
+        upload_latencies.append(time.perf_counter() - start)
+
+    async def worker():
+        for i in counter:
+            if deadline and time.perf_counter() > deadline:
+                break
+            body = {
+                "email": f"load-{run_id}-{i}@example.com",
+                "username": f"load-{run_id}-{i}",
+                "avatar_url": None,
+            }
+            start = time.perf_counter()
+            try:
+                response = await client.post("/api/users/register", json=body)
+            except Exception as e:
+                statuses[f"exception:{type(e).__name__}"] += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+            statuses[str(response.status_code)] += 1
+
+            if payload_bytes and response.status_code == 200:
+                urls = response.json()["upload_urls"]
+                try:
+                    await upload(urls["ground_photo_signed_url"], "image/jpeg")
+                    await upload(urls["aerial_photo_signed_url"], "image/tiff")
+                except Exception:
+                    statuses["upload_error"] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    wall = time.perf_counter() - start
+
+    errors = sum(count for status, count in statuses.items() if status not in ("200", "upload_error"))
+    total = sum(count for status, count in statuses.items() if status != "upload_error")
+    results = {"register": summarize(latencies, wall, errors)}
+    results["register"]["error_rate"] = round(errors / total, 4) if total else 0.0
+    if upload_latencies:
+        results["client_upload"] = summarize(upload_latencies, wall)
+    return {"results": results, "statuses": dict(statuses), "registrations": total}
+
+
+async def main(args):
+    s3 = await BackgroundServer(create_fake_s3_app(FaultConfig(
+        latency=args.s3_latency, jitter=args.s3_jitter, error_rate=args.s3_error_rate,
+    ), FakeS3Store())).start()
+    configure_environment(s3.url, admission=args.admission)
+
+    from app.db.database import db
+    from app.main import app
+    from app.utils.metrics import DEPENDENCY_CALL_DURATION
+
+    # The app configures INFO logging on import; per-request lines would drown the report
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    if args.backend == "fake":
+        db.db = FakeDatabase(latency=args.mongo_latency)
+    else:
+        from motor.motor_asyncio import AsyncIOMotorClient
+
+        db.client = AsyncIOMotorClient(args.mongo_uri, serverSelectionTimeoutMS=5000)
+        db.db = db.client[args.db_name]
+    db.is_connected = True
+
+    app_server = None
+    if args.http:
+        # Goes through uvicorn's HTTP stack instead of calling the ASGI app directly
+        app_server = await BackgroundServer(app).start()
+        client = httpx.AsyncClient(base_url=app_server.url, timeout=args.timeout,
+                                   limits=httpx.Limits(max_connections=args.concurrency))
+    else:
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://testserver",
+                                   timeout=args.timeout)
+    # Presigned uploads go straight to the S3 stand-in, as a real client's would
+    upload_client = httpx.AsyncClient(timeout=args.timeout)
+
+    before = DEPENDENCY_CALL_DURATION.snapshot()
+    try:
+        run = await run_load(client, upload_client, args)
+    finally:
+        await client.aclose()
+        await upload_client.aclose()
+        if app_server is not None:
+            await app_server.stop()
+        await s3.stop()
+    stages = stage_breakdown(before, DEPENDENCY_CALL_DURATION.snapshot(), run["registrations"])
+
+    metadata = run_metadata(
+        "register_load",
+        backend=args.backend,
+        transport="http" if args.http else "asgi",
+        requests=args.requests,
+        duration=args.duration,
+        concurrency=args.concurrency,
+        upload_bytes=args.upload_bytes,
+        admission=args.admission,
+        mongo_latency=args.mongo_latency,
+        s3=vars(FaultConfig(args.s3_latency, args.s3_jitter, args.s3_error_rate)),
+    )
+    metadata["statuses"] = run["statuses"]
+    metadata["stages"] = stages
+    document = write_results(args.output, metadata, run["results"])
+
+    print_table(run["results"], columns=("ops", "throughput_ops_per_sec", "p50_ms", "p99_ms", "error_rate"))
+    print(f"\nStatuses: {run['statuses']}")
+    print("\nStage breakdown:")
+    print_table(stages, columns=("calls", "errors", "mean_ms", "ms_per_registration"))
+    if args.compare:
+        compare(args.compare, document)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load test user registration against local stand-ins")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--duration", type=float, default=None, help="stop after this many seconds")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--http", action="store_true", help="serve the app with uvicorn instead of ASGI calls")
+    parser.add_argument("--admission", action="store_true",
+                        help="keep admission control on; shed requests show up as 429/503 statuses")
+    parser.add_argument("--upload-bytes", type=int, default=0, help="also PUT this many bytes to each signed URL")
+    parser.add_argument("--backend", choices=["fake", "mongo"], default="fake")
+    parser.add_argument("--mongo-uri", default="mongodb://localhost:27017")
+    parser.add_argument("--db-name", default="earth_ai_bench")
+    parser.add_argument("--mongo-latency", type=float, default=0.0005)
+    parser.add_argument("--s3-latency", type=float, default=0.005)
+    parser.add_argument("--s3-jitter", type=float, default=0.001)
+    parser.add_argument("--s3-error-rate", type=float, default=0.0)
+    parser.add_argument("--output", help="write JSON results to this path")
+    parser.add_argument("--compare", help="earlier JSON result file to compare p99 against")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))